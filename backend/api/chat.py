@@ -1,11 +1,14 @@
-from fastapi import APIRouter, HTTPException, Depends, status
+from fastapi import APIRouter, HTTPException, Depends, Query, status
+from fastapi.responses import StreamingResponse
 from typing import List, Optional
 from datetime import datetime
+import json
+from contextlib import aclosing
 import logging
 
 from models.chat import (
     ChatInitRequest, ChatMessageRequest, ChatResponse,
-    ChatSession, ChatSessionResponse, ChatHistoryResponse
+    ChatSession, ChatSessionSummary, ChatMessage, ChatSessionResponse, ChatHistoryResponse
 )
 from services.chat_service import get_chat_service, RAGChatService
 
@@ -79,6 +82,43 @@ async def send_message(
             detail=f"Failed to send message: {str(e)}"
         )
 
+@router.post("/sessions/{session_id}/messages/stream")
+async def send_message_stream(
+    session_id: str,
+    request: ChatMessageRequest,
+    chat_service: RAGChatService = Depends(get_chat_service_dependency)
+):
+    """Send a message and stream the response as server-sent events"""
+    # Ensure session_id matches request
+    if request.session_id != session_id:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Session ID in URL must match request body"
+        )
+    
+    # Check up front - errors can no longer change the status once streaming starts
+    if not await chat_service.get_chat_session(session_id):
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Chat session {session_id} not found"
+        )
+    
+    async def event_stream():
+        try:
+            # Settle the turn as soon as the client goes away instead of at garbage collection
+            async with aclosing(chat_service.send_message_stream(request)) as stream:
+                async for chunk in stream:
+                    yield f"data: {json.dumps({'delta': chunk})}\n\n"
+            yield f"event: done\ndata: {json.dumps({'session_id': session_id})}\n\n"
+        except Exception as e:
+            logger.error(f"Failed to stream message: {e}")
+            yield f"event: error\ndata: {json.dumps({'detail': f'Failed to send message: {str(e)}'})}\n\n"
+            # The status is already sent, so re-raise to let the server record the failure
+            raise
+    
+    logger.info(f"Streaming message to session {session_id}")
+    return StreamingResponse(event_stream(), media_type="text/event-stream")
+
 @router.get("/sessions/{session_id}", response_model=ChatSession)
 async def get_chat_session(
     session_id: str,
@@ -105,6 +145,33 @@ async def get_chat_session(
             detail=f"Failed to get chat session: {str(e)}"
         )
 
+@router.get("/sessions/{session_id}/messages", response_model=List[ChatMessage])
+async def get_chat_messages(
+    session_id: str,
+    limit: int = Query(50, ge=1, le=500),
+    offset: int = Query(0, ge=0),
+    chat_service: RAGChatService = Depends(get_chat_service_dependency)
+):
+    """Get a page of a chat session's messages, newest page first"""
+    try:
+        messages = await chat_service.get_session_messages(session_id, limit, offset)
+        if messages is None:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail=f"Chat session {session_id} not found"
+            )
+        
+        return messages
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Failed to get chat messages: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Failed to get chat messages: {str(e)}"
+        )
+
 @router.get("/users/{user_id}/sessions", response_model=List[ChatSession])
 async def get_user_chat_sessions(
     user_id: str,
@@ -124,6 +191,23 @@ async def get_user_chat_sessions(
             detail=f"Failed to get user chat sessions: {str(e)}"
         )
 
+@router.get("/users/{user_id}/sessions/summaries", response_model=List[ChatSessionSummary])
+async def get_user_chat_session_summaries(
+    user_id: str,
+    active_only: bool = True,
+    chat_service: RAGChatService = Depends(get_chat_service_dependency)
+):
+    """Get a user's chat sessions without their message history"""
+    try:
+        return await chat_service.load_user_chat_session_summaries(user_id, active_only)
+        
+    except Exception as e:
+        logger.error(f"Failed to get user chat session summaries: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Failed to get user chat session summaries: {str(e)}"
+        )
+
 @router.delete("/sessions/{session_id}")
 async def delete_chat_session(
     session_id: str,
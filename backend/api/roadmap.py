@@ -1,4 +1,4 @@
-from fastapi import APIRouter, HTTPException, Depends, status
+from fastapi import APIRouter, HTTPException, Depends, Path, Query, status
 from fastapi.responses import JSONResponse
 from typing import List, Dict, Optional, Any
 from datetime import datetime
@@ -342,24 +342,9 @@ async def get_user_roadmaps(user_id: str):
     
     try:
         roadmap_service = await get_roadmap_service()
-        roadmaps = await roadmap_service.load_user_roadmaps(user_id)
-        
-        # Convert to response format
-        roadmap_summaries = []
-        for roadmap in roadmaps:
-            roadmap_summaries.append({
-                "id": roadmap.id,
-                "title": roadmap.title,
-                "current_role": roadmap.current_role,
-                "target_role": roadmap.target_role,
-                "status": roadmap.status.value,
-                "total_estimated_weeks": roadmap.total_estimated_weeks,
-                "phase_count": len(roadmap.phases),
-                "overall_progress_percentage": roadmap.overall_progress_percentage,
-                "created_date": roadmap.created_date.isoformat(),
-                "updated_date": roadmap.updated_date.isoformat(),
-                "last_accessed_date": roadmap.last_accessed_date.isoformat() if roadmap.last_accessed_date else None
-            })
+        # The listing only needs summary columns, so skip loading the phases
+        roadmaps = await roadmap_service.load_user_roadmap_summaries(user_id)
+        roadmap_summaries = [roadmap.model_dump(mode="json") for roadmap in roadmaps]
         
         return {
             "success": True,
@@ -500,6 +485,41 @@ async def update_roadmap_progress(roadmap_id: str, progress_data: Dict[str, Any]
             detail=f"Failed to update roadmap progress: {str(e)}"
         )
 
+@router.put("/{roadmap_id}/phases/{phase_index}/progress")
+async def update_phase_progress(
+    roadmap_id: str,
+    patch: Dict[str, Any],
+    phase_index: int = Path(..., ge=0),
+    overall_progress_percentage: Optional[float] = Query(None, ge=0, le=100)
+):
+    """Update progress for a single roadmap phase, optionally with the roadmap's overall progress"""
+
+    try:
+        roadmap_service = await get_roadmap_service()
+        success = await roadmap_service.update_phase_progress(
+            roadmap_id, phase_index, patch, overall_progress_percentage
+        )
+
+        if not success:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Roadmap or phase not found"
+            )
+
+        return {
+            "success": True,
+            "message": "Phase progress updated successfully"
+        }
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error updating phase progress: {str(e)}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Failed to update phase progress: {str(e)}"
+        )
+
 @router.delete("/{roadmap_id}")
 async def delete_roadmap(roadmap_id: str):
     """Delete a roadmap"""
@@ -1,7 +1,7 @@
 from fastapi import FastAPI, Request, HTTPException, status
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.middleware.trustedhost import TrustedHostMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, ORJSONResponse
 from contextlib import asynccontextmanager
 import uvicorn
 import logging
@@ -23,6 +23,13 @@ for env_group in env_paths:
         if Path(env_path).exists():
             load_dotenv(env_path, override=True)  # Allow override for local files
 
+# Serialize API responses with orjson when it is installed
+try:
+    import orjson  # noqa: F401
+    DEFAULT_RESPONSE_CLASS = ORJSONResponse
+except ImportError:
+    DEFAULT_RESPONSE_CLASS = JSONResponse
+
 # Import security modules
 from security.rate_limiting import get_rate_limiter, create_rate_limit_middleware
 from security.input_validation import ValidationError
@@ -101,6 +108,11 @@ async def lifespan(app: FastAPI):
         await cleanup_performance_monitor()
         logger.info("Performance monitor cleaned up")
         
+        # Flush pending chat session writes
+        from services.chat_service import cleanup_chat_service
+        await cleanup_chat_service()
+        logger.info("Chat service cleaned up")
+        
         # Cleanup cache service
         from services.cache_service import cleanup_cache_service
         await cleanup_cache_service()
@@ -116,6 +128,11 @@ async def lifespan(app: FastAPI):
         await cleanup_multi_agent_service()
         logger.info("Multi-agent service cleaned up")
         
+        # Close shared Supabase REST connections
+        from services.database_service import cleanup_database_clients
+        await cleanup_database_clients()
+        logger.info("Database clients cleaned up")
+        
         logger.info("All services cleaned up successfully")
         
     except Exception as e:
@@ -125,6 +142,7 @@ app = FastAPI(
     title="Trajectory.AI Backend", 
     version="1.0.0", 
     lifespan=lifespan,
+    default_response_class=DEFAULT_RESPONSE_CLASS,
     docs_url="/docs" if os.getenv("ENVIRONMENT") != "production" else None,
     redoc_url="/redoc" if os.getenv("ENVIRONMENT") != "production" else None
 )
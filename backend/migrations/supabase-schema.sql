@@ -53,11 +53,16 @@ CREATE TABLE IF NOT EXISTS roadmaps (
   user_context_used JSONB DEFAULT '{}',
   created_date TIMESTAMP WITH TIME ZONE DEFAULT NOW(),
   updated_date TIMESTAMP WITH TIME ZONE DEFAULT NOW(),
-  last_accessed_date TIMESTAMP WITH TIME ZONE
+  last_accessed_date TIMESTAMP WITH TIME ZONE DEFAULT NOW()
 );
 
+-- Existing databases: stamp last_accessed_date on insert too
+ALTER TABLE roadmaps ALTER COLUMN last_accessed_date SET DEFAULT NOW();
+
 -- Create indexes for roadmaps
-CREATE INDEX IF NOT EXISTS roadmaps_user_id_idx ON roadmaps(user_id);
+-- user_id + updated_date serves load_user_roadmaps' filter and sort from one index scan
+DROP INDEX IF EXISTS roadmaps_user_id_idx;
+CREATE INDEX IF NOT EXISTS roadmaps_user_updated_idx ON roadmaps(user_id, updated_date DESC);
 CREATE INDEX IF NOT EXISTS roadmaps_status_idx ON roadmaps(status);
 CREATE INDEX IF NOT EXISTS roadmaps_created_date_idx ON roadmaps(created_date);
 
@@ -78,12 +83,27 @@ CREATE TABLE IF NOT EXISTS chat_sessions (
 CREATE INDEX IF NOT EXISTS chat_sessions_user_id_idx ON chat_sessions(user_id);
 CREATE INDEX IF NOT EXISTS chat_sessions_is_active_idx ON chat_sessions(is_active);
 CREATE INDEX IF NOT EXISTS chat_sessions_updated_at_idx ON chat_sessions(updated_at);
+-- Matches load_user_chat_sessions(active_only=True) exactly, rows come back already sorted
+CREATE INDEX IF NOT EXISTS chat_sessions_user_active_updated_idx ON chat_sessions(user_id, updated_at DESC) WHERE is_active;
+
+-- Roadmaps track their modification time in updated_date rather than updated_at,
+-- and every write through the API also counts as an access
+CREATE OR REPLACE FUNCTION update_roadmap_timestamps()
+RETURNS TRIGGER AS $$
+BEGIN
+  NEW.updated_date = NOW();
+  NEW.last_accessed_date = NOW();
+  RETURN NEW;
+END;
+$$ language 'plpgsql';
 
--- Create trigger to automatically update updated_at for roadmaps
+-- Create trigger to automatically update updated_date and last_accessed_date for roadmaps
+-- Existing databases still have the trigger on update_updated_at_column()
+DROP TRIGGER IF EXISTS update_roadmaps_updated_at ON roadmaps;
 CREATE TRIGGER update_roadmaps_updated_at
   BEFORE UPDATE ON roadmaps
   FOR EACH ROW
-  EXECUTE FUNCTION update_updated_at_column();
+  EXECUTE FUNCTION update_roadmap_timestamps();
 
 -- Create trigger to automatically update updated_at for chat_sessions
 CREATE TRIGGER update_chat_sessions_updated_at
@@ -91,6 +111,62 @@ CREATE TRIGGER update_chat_sessions_updated_at
   FOR EACH ROW
   EXECUTE FUNCTION update_updated_at_column();
 
+-- Append new messages to chat sessions without rewriting the stored history
+-- p_batch: [{"id": "<session uuid>", "messages": [...]}, ...]
+CREATE OR REPLACE FUNCTION append_chat_messages(p_batch JSONB)
+RETURNS TABLE(id UUID) AS $$
+BEGIN
+  RETURN QUERY
+  UPDATE chat_sessions AS c
+  SET messages = COALESCE(c.messages, '[]'::jsonb) || b.messages
+  FROM jsonb_to_recordset(p_batch) AS b(id UUID, messages JSONB)
+  WHERE c.id = b.id
+  RETURNING c.id;
+END;
+$$ language 'plpgsql';
+
+-- Page through a chat session's history without shipping the whole messages array
+-- Returns the p_limit messages ending p_offset messages before the newest, oldest first,
+-- or NULL when the session does not exist
+CREATE OR REPLACE FUNCTION chat_session_messages(p_session_id UUID, p_limit INT, p_offset INT DEFAULT 0)
+RETURNS JSONB AS $$
+  SELECT (
+    SELECT COALESCE(jsonb_agg(m.value ORDER BY m.idx), '[]'::jsonb)
+    FROM jsonb_array_elements(c.messages) WITH ORDINALITY AS m(value, idx)
+    WHERE m.idx > jsonb_array_length(c.messages) - p_offset - p_limit
+      AND m.idx <= jsonb_array_length(c.messages) - p_offset
+  )
+  FROM chat_sessions AS c
+  WHERE c.id = p_session_id;
+$$ language 'sql' STABLE;
+
+-- Patch a single roadmap phase in place instead of rewriting the whole phases array,
+-- optionally setting the overall progress in the same statement
+-- An out-of-range idx matches no row, so neither column is touched
+-- Returns false when the roadmap or phase does not exist
+DROP FUNCTION IF EXISTS update_phase_progress(UUID, INT, JSONB);
+CREATE OR REPLACE FUNCTION update_phase_progress(r UUID, idx INT, patch JSONB, overall_progress NUMERIC DEFAULT NULL)
+RETURNS BOOLEAN AS $$
+BEGIN
+  UPDATE roadmaps
+  SET phases = jsonb_set(phases, ARRAY[idx::text], (phases->idx) || patch),
+      overall_progress_percentage = COALESCE(overall_progress, overall_progress_percentage)
+  WHERE id = r AND idx >= 0 AND idx < jsonb_array_length(phases);
+  RETURN FOUND;
+END;
+$$ language 'plpgsql';
+
+-- Computed columns so listings can report array sizes without selecting the JSONB itself
+CREATE OR REPLACE FUNCTION phase_count(roadmaps)
+RETURNS INT AS $$
+  SELECT COALESCE(jsonb_array_length($1.phases), 0);
+$$ language 'sql' STABLE;
+
+CREATE OR REPLACE FUNCTION message_count(chat_sessions)
+RETURNS INT AS $$
+  SELECT COALESCE(jsonb_array_length($1.messages), 0);
+$$ language 'sql' STABLE;
+
 -- Create resumes table for resume data and processing
 CREATE TABLE IF NOT EXISTS resumes (
   id UUID DEFAULT gen_random_uuid() PRIMARY KEY,
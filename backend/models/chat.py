@@ -30,6 +30,16 @@ class ChatSession(BaseModel):
     is_active: bool = True
     metadata: Dict[str, Any] = Field(default_factory=dict)
 
+class ChatSessionSummary(BaseModel):
+    """Chat session listing entry without the message history"""
+    id: str
+    user_id: str
+    title: Optional[str] = None
+    created_at: datetime
+    updated_at: datetime
+    is_active: bool = True
+    message_count: int = 0
+
 class ChatInitRequest(BaseModel):
     """Request model for initializing a new chat session"""
     user_id: str
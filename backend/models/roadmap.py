@@ -120,6 +120,7 @@ class RoadmapResponse(BaseModel):
     overall_progress_percentage: float
     created_date: datetime
     updated_date: datetime
+    last_accessed_date: Optional[datetime] = None
 
 class RoadmapGenerationResult(BaseModel):
     """Result of roadmap generation operation"""
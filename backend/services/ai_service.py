@@ -2,7 +2,7 @@ import os
 import logging
 import asyncio
 import json
-from typing import List, Dict, Optional, Any, Union
+from typing import List, Dict, Optional, Any, Union, AsyncIterator
 from datetime import datetime, timedelta
 from dataclasses import dataclass, field
 from enum import Enum
@@ -387,6 +387,174 @@ class AIService:
                     self.metrics.total_requests += 1
                     raise primary_error
     
+    async def stream_text(
+        self,
+        prompt: str,
+        model_type: Optional[ModelType] = None,
+        max_tokens: Optional[int] = None,
+        temperature: Optional[float] = None,
+        **kwargs
+    ) -> AsyncIterator[str]:
+        """
+        Stream generated text chunks as the provider produces them
+        
+        Falls back to a single generate_text result if streaming fails
+        before the first chunk arrives.
+        
+        Args:
+            prompt: Input prompt for text generation
+            model_type: Specific model to use (optional)
+            max_tokens: Maximum tokens to generate
+            temperature: Sampling temperature
+            
+        Yields:
+            Generated text chunks
+        """
+        if model_type is None:
+            model_type = ModelType.GEMINI_FLASH
+        config = self._get_model_config(model_type)
+        
+        started = False
+        try:
+            async with self.throttler:
+                async with self.semaphore:
+                    if config.provider == AIProvider.GEMINI:
+                        stream = self._stream_with_gemini(prompt, model_type, max_tokens, temperature)
+                    else:
+                        stream = self._stream_with_openrouter(prompt, model_type, max_tokens, temperature)
+                    
+                    async for chunk in stream:
+                        started = True
+                        yield chunk
+            return
+        except Exception as e:
+            if started:
+                raise
+            logger.warning(f"Streaming from {config.provider.value} failed, falling back to generate_text: {e}")
+        
+        yield await self.generate_text(prompt, model_type, max_tokens, temperature, **kwargs)
+    
+    async def _stream_with_gemini(
+        self,
+        prompt: str,
+        model_type: ModelType,
+        max_tokens: Optional[int] = None,
+        temperature: Optional[float] = None
+    ) -> AsyncIterator[str]:
+        """Stream text chunks from the Gemini API"""
+        if not self.gemini_api_key:
+            raise Exception("Gemini API key not configured")
+        
+        config = self._get_model_config(model_type)
+        generation_config = genai.types.GenerationConfig(
+            max_output_tokens=max_tokens or config.max_tokens,
+            temperature=temperature or config.temperature,
+        )
+        model = genai.GenerativeModel(config.name)
+        
+        start_time = time.time()
+        estimated_tokens = 0
+        try:
+            response = await model.generate_content_async(
+                prompt,
+                generation_config=generation_config,
+                stream=True
+            )
+            async for chunk in response:
+                text = chunk.text
+                if text:
+                    estimated_tokens += len(text.split())
+                    yield text
+        except Exception as e:
+            logger.error(f"Gemini streaming failed: {str(e)}")
+            self._update_error_metrics("gemini_error")
+            raise
+        
+        response_time = time.time() - start_time
+        self.metrics.successful_requests += 1
+        self.metrics.total_requests += 1
+        self.metrics.provider_usage[AIProvider.GEMINI.value] = self.metrics.provider_usage.get(AIProvider.GEMINI.value, 0) + 1
+        self.metrics.total_tokens += estimated_tokens
+        self._update_response_time(response_time)
+        
+        performance_logger.info(
+            f"Gemini stream completed - Model: {model_type.value}, "
+            f"Response time: {response_time:.3f}s, Tokens: {estimated_tokens}, "
+            f"Prompt length: {len(prompt)}"
+        )
+    
+    async def _stream_with_openrouter(
+        self,
+        prompt: str,
+        model_type: ModelType,
+        max_tokens: Optional[int] = None,
+        temperature: Optional[float] = None
+    ) -> AsyncIterator[str]:
+        """Stream text chunks from the OpenRouter API (server-sent events)"""
+        if not self.openrouter_api_key:
+            raise Exception("OpenRouter API key not configured")
+        
+        if not self.session:
+            await self._init_session()
+        
+        config = self._get_model_config(model_type)
+        payload = {
+            "model": config.name,
+            "messages": [{"role": "user", "content": prompt}],
+            "max_tokens": max_tokens or config.max_tokens,
+            "temperature": temperature or config.temperature,
+            "stream": True,
+        }
+        headers = {
+            "Authorization": f"Bearer {self.openrouter_api_key}",
+            "Content-Type": "application/json",
+            "HTTP-Referer": "http://localhost:3000",  # Required by OpenRouter
+            "X-Title": "Trajectory AI"  # Optional but recommended
+        }
+        
+        start_time = time.time()
+        estimated_tokens = 0
+        try:
+            async with self.session.post(
+                "https://openrouter.ai/api/v1/chat/completions",
+                json=payload,
+                headers=headers
+            ) as response:
+                if response.status != 200:
+                    error_text = await response.text()
+                    raise Exception(f"OpenRouter error ({response.status}): {error_text}")
+                
+                async for raw_line in response.content:
+                    line = raw_line.decode("utf-8").strip()
+                    if not line.startswith("data:"):
+                        continue
+                    data = line[5:].strip()
+                    if data == "[DONE]":
+                        break
+                    
+                    choices = json.loads(data).get("choices") or [{}]
+                    text = choices[0].get("delta", {}).get("content")
+                    if text:
+                        estimated_tokens += len(text.split())
+                        yield text
+        except Exception as e:
+            logger.error(f"OpenRouter streaming failed: {str(e)}")
+            self._update_error_metrics("openrouter_error")
+            raise
+        
+        response_time = time.time() - start_time
+        self.metrics.successful_requests += 1
+        self.metrics.total_requests += 1
+        self.metrics.provider_usage[AIProvider.OPENROUTER.value] = self.metrics.provider_usage.get(AIProvider.OPENROUTER.value, 0) + 1
+        self.metrics.total_tokens += estimated_tokens
+        self._update_response_time(response_time)
+        
+        performance_logger.info(
+            f"OpenRouter stream completed - Model: {model_type.value}, "
+            f"Response time: {response_time:.3f}s, Tokens: {estimated_tokens}, "
+            f"Prompt length: {len(prompt)}"
+        )
+    
     async def generate_chat_response(
         self,
         messages: List[Dict[str, str]],
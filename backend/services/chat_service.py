@@ -1,19 +1,23 @@
 import os
 import logging
 import asyncio
-from typing import List, Dict, Optional, Any, Tuple
+import time
+from typing import List, Dict, Optional, Any, Tuple, Set, AsyncIterator
 from datetime import datetime, timedelta
+from collections import defaultdict, OrderedDict
+from itertools import islice
 import json
 import uuid
+import weakref
+from contextlib import aclosing
 
 from langchain.memory import ConversationBufferWindowMemory
-from langchain.schema import BaseMessage, HumanMessage, AIMessage, SystemMessage
-from langchain.prompts import ChatPromptTemplate, MessagesPlaceholder
+from langchain.schema import BaseMessage, HumanMessage, AIMessage, SystemMessage, get_buffer_string
 from langchain.schema.runnable import RunnablePassthrough
 from langchain.schema.output_parser import StrOutputParser
 
 from models.chat import (
-    ChatSession, ChatMessage, MessageRole, 
+    ChatSession, ChatSessionSummary, ChatMessage, MessageRole, 
     ChatInitRequest, ChatMessageRequest, ChatResponse
 )
 from services.ai_service import AIService, get_ai_service, ModelType
@@ -45,8 +49,53 @@ except ImportError:
     RequestType = None
     MULTI_AGENT_AVAILABLE = False
 
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    orjson = None
+    ORJSON_AVAILABLE = False
+
 logger = logging.getLogger(__name__)
 
+# Fields checked, in order, when extracting text from a multi-agent response
+_RESPONSE_FIELDS = ("content", "advice", "recommendation", "analysis", "response")
+_MISSING = object()
+# Max sessions (and conversation memories) kept in memory before LRU eviction
+ACTIVE_SESSION_CAP = 10_000
+# Placeholder body for old messages whose content lives only in the database
+_ARCHIVED_CONTENT = "[archived]"
+# Upper bound on formatted lines: skills (title + 3 + blank), resources (title + 3 + blank), metadata
+_MAX_FORMATTED_PARTS = 11
+# Acknowledgements that carry nothing worth a vector search
+_TRIVIAL_QUERIES = frozenset({"hi", "hello", "hey", "thanks", "thank you", "ok", "okay", "ack", "yes", "no"})
+
+# System instructions for career mentoring chats
+CHAT_SYSTEM_PROMPT = """You are an experienced career mentor and advisor. Your role is to provide personalized, actionable career guidance based on the user's background and goals.
+
+Key guidelines:
+- ALWAYS use the provided user background information to give personalized advice when available
+- Never ask users to re-share information that is already provided in their background
+- If you see profile information, resume content, or other background details, USE THEM immediately in your response
+- When a user asks about their strengths, weaknesses, or career advice, reference their specific background, education, experience, and goals
+- When analyzing their resume, provide specific examples from their actual experience, education, and skills
+- Never provide hypothetical examples when you have access to their real resume content
+- Be encouraging but realistic about career transitions and timelines
+- Provide specific, actionable steps when possible
+- Focus on practical skills, experiences, and strategies
+- Consider industry trends and market demands
+- Be supportive and understanding of career challenges
+- If background information is limited, ask targeted questions to fill specific gaps
+
+CRITICAL: The user background information provided contains their actual resume content and profile data. You have access to their real experience, education, skills, and career history. You must reference and use this specific information in your responses. Do not ask them to provide information that is already available in their background context. When they ask you to analyze or critique their resume, use their actual resume content, not hypothetical examples."""
+_MULTI_AGENT_FOOTER = "*This response was generated using our multi-agent analysis system.*"
+
+def _dumps_indent(obj: Any) -> str:
+    """Serialize to indented JSON, preferring orjson when installed"""
+    if ORJSON_AVAILABLE:
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2).decode()
+    return json.dumps(obj, indent=2)
+
 class RAGChatService:
     """RAG-enabled AI chat service with memory management using LangChain"""
     
@@ -61,19 +110,84 @@ class RAGChatService:
         # Multi-Agent System
         self.multi_agent_service: Optional[MultiAgentService] = None
         
-        # In-memory session storage for active sessions
-        self.active_sessions: Dict[str, ChatSession] = {}
+        # In-memory session storage for active sessions, least recently used first
+        self.active_sessions: "OrderedDict[str, ChatSession]" = OrderedDict()
+        self._max_active = ACTIVE_SESSION_CAP
         self.session_memories: Dict[str, ConversationBufferWindowMemory] = {}
         
+        # Cleared memories recycled for new sessions
+        self._memory_pool: List[ConversationBufferWindowMemory] = []
+        self.memory_pool_size = 128
+        
+        # Secondary indexes over active_sessions
+        self._user_sessions: Dict[str, Set[str]] = defaultdict(set)
+        self._active_ids: Set[str] = set()
+        
+        # Per-session (message_id -> position, role -> count), rebuilt lazily when stale
+        self._message_index: Dict[str, Tuple[Dict[str, int], Dict[MessageRole, int]]] = {}
+        
+        # Formatted profile blocks keyed by user_id: (block, profile_version)
+        self._profile_block_cache: Dict[str, Tuple[str, Any]] = {}
+        self._profile_context_cache: Dict[str, Tuple[int, str]] = {}
+        
+        # Stored profile context chunks per user: (fetched_at, chunks)
+        self._profile_chunk_cache: Dict[str, Tuple[float, List[Dict]]] = {}
+        self.profile_chunk_ttl = 300.0
+        
+        # Short-lived health result shared by concurrent pollers
+        self._health_cache: Optional[Tuple[float, Dict]] = None
+        self._health_ttl = 2.0
+        self._health_lock = asyncio.Lock()
+        
+        # Background persistence: sessions waiting to be written, latest state wins
+        self._dirty_sessions: Dict[str, ChatSession] = {}
+        self._persist_queue: asyncio.Queue = asyncio.Queue(maxsize=10_000)
+        self._persist_task: Optional[asyncio.Task] = None
+        self.persist_batch_size = 32       # Max sessions written per batch
+        self.persist_flush_interval = 0.05  # Seconds to wait for more sessions before flushing
+        
+        # Per-session (messages stored in the database, appends since last full snapshot)
+        self._persisted_state: Dict[str, Tuple[int, int]] = {}
+        self.checkpoint_every = 50  # Appends before a session is rewritten as a full snapshot
+        
+        # Profile context embeddings coalesced across users: (user_id, text, future)
+        self._embed_queue: asyncio.Queue = asyncio.Queue()
+        self._embed_task: Optional[asyncio.Task] = None
+        self.embed_batch_size = 32        # Max profiles embedded per batch
+        self.embed_flush_interval = 0.02  # Seconds to wait for more profiles before embedding
+        
+        # Resume context searches coalesced into one embedding batch
+        self._search_queue: asyncio.Queue = asyncio.Queue()
+        self._search_task: Optional[asyncio.Task] = None
+        self.search_batch_size = 16          # Max queries embedded per batch
+        self.search_flush_interval = 0.005   # Seconds to wait for more queries before searching
+        
         # Configuration
         self.max_memory_messages = 10  # Keep last 10 messages in memory
+        self.max_history_messages = 20  # Prompt history grows to this, then drops back to max_memory_messages
         self.max_context_chunks = 5    # Max RAG context chunks to include
+        self.min_search_query_length = 20  # Shorter queries skip the vector search
         self.context_similarity_threshold = 0.7  # Minimum similarity for context inclusion
         
+        # Old message bodies are dropped from memory once stored; session_id -> archived prefix length
+        self._archived_upto: Dict[str, int] = {}
+        self.archive_after_messages = 30
+        self.archive_keep_recent = 2 * self.max_memory_messages  # Window memory keeps k exchanges
+        
         # Workflow routing patterns
         self.workflow_patterns = self._initialize_workflow_patterns()
         
-        logger.info(f"RAG Chat Service initialized (Embedding: {EMBEDDING_AVAILABLE}, Resume: {RESUME_AVAILABLE}, MultiAgent: {MULTI_AGENT_AVAILABLE})")
+        # Static prompt prefix, built once; stable parts come first (instructions,
+        # user background, history) so successive turns share a prompt prefix
+        self._system_prefix = "System: " + CHAT_SYSTEM_PROMPT
+        
+        # Per-session turn locks, dropped once no turn holds them
+        self._session_locks: "weakref.WeakValueDictionary[str, asyncio.Lock]" = weakref.WeakValueDictionary()
+        
+        # Formatted prompt history per session: (message count, first message, last message, text)
+        self._history_text_cache: Dict[str, Tuple[int, BaseMessage, BaseMessage, str]] = {}
+        
+        logger.info("RAG Chat Service initialized (Embedding: %s, Resume: %s, MultiAgent: %s)", EMBEDDING_AVAILABLE, RESUME_AVAILABLE, MULTI_AGENT_AVAILABLE)
     
     async def _get_ai_service(self) -> AIService:
         """Get or initialize AI service"""
@@ -91,7 +205,7 @@ class RAGChatService:
                 self.multi_agent_service = await get_multi_agent_service()
                 logger.info("Multi-Agent Service initialized for chat service")
             except Exception as e:
-                logger.warning(f"Failed to initialize multi-agent service: {e}")
+                logger.warning("Failed to initialize multi-agent service: %s", e)
                 return None
         
         return self.multi_agent_service
@@ -165,21 +279,177 @@ class RAGChatService:
         }
         return mapping.get(pattern_name, RequestType.CAREER_ADVICE)
     
+    def _register_session(self, session_id: str, session: ChatSession):
+        """Store a session in active_sessions and keep the indexes in sync"""
+        previous = self.active_sessions.get(session_id)
+        if previous is not None:
+            self._active_ids.discard(session_id)
+            self._user_sessions[previous.user_id].discard(session_id)
+            self._message_index.pop(session_id, None)
+            if previous is not session:
+                self._archived_upto.pop(session_id, None)
+        
+        self.active_sessions[session_id] = session
+        self.active_sessions.move_to_end(session_id)
+        if session.is_active:
+            self._active_ids.add(session_id)
+            self._user_sessions[session.user_id].add(session_id)
+        
+        while len(self.active_sessions) > self._max_active:
+            self._evict_session()
+    
+    def _evict_session(self):
+        """Drop the least recently used session, leaving it to the database"""
+        session_id, session = self.active_sessions.popitem(last=False)
+        self._active_ids.discard(session_id)
+        user_bucket = self._user_sessions.get(session.user_id)
+        if user_bucket is not None:
+            user_bucket.discard(session_id)
+            if not user_bucket:
+                del self._user_sessions[session.user_id]
+        self._release_session_memory(session_id)
+        self._message_index.pop(session_id, None)
+        
+        # Make sure unsaved changes reach the database before the session is gone from memory
+        state = self._persisted_state.get(session_id)
+        if session_id in self._dirty_sessions or state is None or state[0] < len(session.messages):
+            self._schedule_persist(session_id, session)
+        else:
+            self._persisted_state.pop(session_id, None)
+            self._archived_upto.pop(session_id, None)
+    
+    def _get_message_index(self, session_id: str, session: ChatSession) -> Tuple[Dict[str, int], Dict[MessageRole, int]]:
+        """Get the message position index and role counts for a session"""
+        entry = self._message_index.get(session_id)
+        if entry is not None and len(entry[0]) == len(session.messages):
+            return entry
+        
+        # Missing or out of sync with the message list - rebuild
+        positions: Dict[str, int] = {}
+        counts: Dict[MessageRole, int] = defaultdict(int)
+        for i, msg in enumerate(session.messages):
+            positions[msg.id] = i
+            counts[msg.role] += 1
+        entry = (positions, counts)
+        self._message_index[session_id] = entry
+        return entry
+    
+    def _append_message(self, session_id: str, session: ChatSession, message: ChatMessage):
+        """Append a message to a session and keep its index in sync"""
+        positions, counts = self._get_message_index(session_id, session)
+        session.messages.append(message)
+        positions[message.id] = len(session.messages) - 1
+        counts[message.role] += 1
+    
+    def _archive_old_messages(self, session_id: str, session: ChatSession):
+        """Drop bodies of old, already stored messages from the in-memory session"""
+        messages = session.messages
+        if len(messages) <= self.archive_after_messages:
+            return
+        
+        # Only messages already in the database can be archived
+        state = self._persisted_state.get(session_id)
+        if state is None:
+            return
+        
+        start = self._archived_upto.get(session_id, 0)
+        end = min(len(messages) - self.archive_keep_recent, state[0])
+        if end <= start:
+            return
+        
+        for msg in messages[start:end]:
+            msg.content = _ARCHIVED_CONTENT
+            msg.metadata["archived"] = True
+        self._archived_upto[session_id] = end
+    
+    async def _restore_archived_messages(self, session_id: str, session: ChatSession) -> ChatSession:
+        """Copy of the session with archived message bodies read back from the database"""
+        if not self._archived_upto.get(session_id):
+            return session
+        
+        stored = await self.db_service.load_chat_session(session_id)
+        if stored is None:
+            raise ValueError(f"Archived chat session {session_id} not found in database")
+        
+        stored_messages = {msg.id: msg for msg in stored.messages}
+        messages = []
+        for msg in session.messages:
+            if msg.metadata.get("archived"):
+                msg = stored_messages.get(msg.id)
+                if msg is None:
+                    raise ValueError(f"Archived message missing from chat session {session_id}")
+            messages.append(msg)
+        return session.model_copy(update={"messages": messages})
+    
+    def _touch_session(self, session_id: str) -> Optional[ChatSession]:
+        """Get an active session and mark it as recently used"""
+        session = self.active_sessions.get(session_id)
+        if session is not None:
+            self.active_sessions.move_to_end(session_id)
+        return session
+    
     def _create_session_memory(self, session_id: str) -> ConversationBufferWindowMemory:
-        """Create LangChain memory for a chat session"""
-        memory = ConversationBufferWindowMemory(
-            k=self.max_memory_messages,
-            return_messages=True,
-            memory_key="chat_history"
-        )
+        """Create LangChain memory for a chat session, reusing a pooled one if available"""
+        if self._memory_pool:
+            memory = self._memory_pool.pop()
+            memory.k = self.max_memory_messages
+        else:
+            memory = ConversationBufferWindowMemory(
+                k=self.max_memory_messages,
+                return_messages=True,
+                memory_key="chat_history"
+            )
         self.session_memories[session_id] = memory
+        
+        # Memories are only rebuilt from history on load, so drop the oldest first
+        while len(self.session_memories) > self._max_active:
+            self._release_session_memory(next(iter(self.session_memories)))
         return memory
     
+    def _get_chat_history(self, memory: ConversationBufferWindowMemory) -> List[BaseMessage]:
+        """Prompt history as an append-only window that periodically resets to the recent tail"""
+        # Appending keeps earlier prompts a prefix of later ones; trimming only when the
+        # window is full keeps that true for many turns at a time
+        messages = memory.chat_memory.messages
+        if len(messages) > self.max_history_messages:
+            del messages[:len(messages) - self.max_memory_messages]
+        return messages
+    
+    def _get_history_text(self, session_id: str, memory: ConversationBufferWindowMemory) -> str:
+        """Prompt history text, formatting only the messages added since the last turn"""
+        messages = self._get_chat_history(memory)
+        if not messages:
+            self._history_text_cache.pop(session_id, None)
+            return ""
+        
+        cached = self._history_text_cache.get(session_id)
+        if cached is not None:
+            count, first, last, text = cached
+            # Still valid while the formatted messages are an untouched prefix of the history
+            if count <= len(messages) and messages[0] is first and messages[count - 1] is last:
+                if count < len(messages):
+                    text = text + "\n" + get_buffer_string(messages[count:])
+                    self._history_text_cache[session_id] = (len(messages), first, messages[-1], text)
+                return text
+        
+        text = get_buffer_string(messages)
+        self._history_text_cache[session_id] = (len(messages), messages[0], messages[-1], text)
+        return text
+    
+    def _release_session_memory(self, session_id: str):
+        """Detach a session's memory and return it to the pool"""
+        self._history_text_cache.pop(session_id, None)
+        memory = self.session_memories.pop(session_id, None)
+        if memory is not None and len(self._memory_pool) < self.memory_pool_size:
+            memory.clear()
+            self._memory_pool.append(memory)
+    
     def _get_session_memory(self, session_id: str) -> ConversationBufferWindowMemory:
         """Get existing memory or create new one"""
-        if session_id not in self.session_memories:
+        try:
+            return self.session_memories[session_id]
+        except KeyError:
             return self._create_session_memory(session_id)
-        return self.session_memories[session_id]
     
     def _load_session_into_memory(self, session: ChatSession) -> ConversationBufferWindowMemory:
         """Load existing chat session into LangChain memory"""
@@ -196,199 +466,296 @@ class RAGChatService:
         
         return memory
     
+    @staticmethod
+    def _build_profile_block(profile: Dict[str, Any]) -> str:
+        """Format the profile section of the user context"""
+        profile_context_parts = []
+        
+        # Add name
+        if profile.get('name'):
+            profile_context_parts.append(f"Name: {profile['name']}")
+        
+        # Add education information
+        if profile.get('education'):
+            edu = profile['education']
+            if isinstance(edu, dict):
+                edu_text = f"Education: {edu.get('degree', '')} in {edu.get('field', '')} from {edu.get('institution', '')} ({edu.get('graduationYear', '')})"
+                profile_context_parts.append(edu_text)
+        
+        # Add career background
+        if profile.get('career_background'):
+            profile_context_parts.append(f"Career Background: {profile['career_background']}")
+        
+        # Add current role
+        if profile.get('current_role'):
+            profile_context_parts.append(f"Current Role: {profile['current_role']}")
+        
+        # Add target roles
+        if profile.get('target_roles'):
+            if isinstance(profile['target_roles'], list):
+                target_roles_text = ", ".join(profile['target_roles'])
+            else:
+                target_roles_text = str(profile['target_roles'])
+            profile_context_parts.append(f"Target Roles: {target_roles_text}")
+        
+        # Add additional details
+        if profile.get('additional_details'):
+            profile_context_parts.append(f"Additional Details: {profile['additional_details']}")
+        
+        if not profile_context_parts:
+            return ""
+        
+        return "Profile Information:\n" + "\n".join(profile_context_parts)
+    
+    def _get_profile_block(self, user_id: str, profile: Dict[str, Any]) -> str:
+        """Get the formatted profile block, rebuilding it only when the profile changes"""
+        version = profile.get('updated_at') or json.dumps(profile, sort_keys=True, default=str)
+        
+        cached = self._profile_block_cache.get(user_id)
+        if cached is not None and cached[1] == version:
+            return cached[0]
+        
+        profile_block = self._build_profile_block(profile)
+        self._profile_block_cache[user_id] = (profile_block, version)
+        return profile_block
+    
     async def _get_user_context(self, user_id: str, query: str) -> Tuple[List[Dict], str]:
         """Retrieve relevant user context using RAG from both resume and profile"""
         try:
-            all_context_chunks = []
-            context_parts = []
-            
-            logger.info(f"Starting user context retrieval for user {user_id}")
+            all_context_chunks, background_parts, query_parts = await self._get_user_context_sections(user_id, query)
+            return all_context_chunks, self._format_context_text(background_parts + query_parts)
             
-            # Always try to get profile data from database first
+        except Exception as e:
+            logger.error("Failed to retrieve user context: %s", e)
+            # Graceful degradation - provide helpful message
+            fallback_context = "No user background information available. Please ask the user to provide relevant details about their background, experience, and goals to give more personalized advice."
+            return [], fallback_context
+    
+    @staticmethod
+    def _format_context_text(context_parts: List[str]) -> str:
+        """Combine context sections into the background block shown to the model"""
+        if context_parts:
+            return "User Background Information:\n\n" + "\n\n".join(context_parts)
+        return "No specific user background information available. Please ask the user to provide relevant details about their background, experience, and goals."
+    
+    @staticmethod
+    def _format_chunk_section(title: str, chunks: List[Dict]) -> str:
+        """Join a section title and its chunk contents in a single pass"""
+        return "\n".join([title] + [chunk['content'] for chunk in chunks])
+    
+    def _is_trivial_query(self, query: str) -> bool:
+        """Check whether a query is too short or generic to benefit from a vector search"""
+        stripped = query.strip()
+        return len(stripped) < self.min_search_query_length or stripped.lower().strip(" .!?") in _TRIVIAL_QUERIES
+    
+    async def _get_profile_chunks(self, user_id: str) -> List[Dict]:
+        """Get a user's stored profile context chunks, cached for profile_chunk_ttl seconds"""
+        now = time.monotonic()
+        cached = self._profile_chunk_cache.get(user_id)
+        if cached and now - cached[0] < self.profile_chunk_ttl:
+            return cached[1]
+        
+        chunks = await asyncio.to_thread(self.embedding_service.get_profile_context, user_id)
+        self._profile_chunk_cache[user_id] = (now, chunks)
+        return chunks
+    
+    async def _search_resume_context(self, user_id: str, query: str) -> List[Dict]:
+        """Search a user's resume chunks, batching concurrent queries into one embedding pass"""
+        if not hasattr(self.embedding_service, "search_resume_embeddings_batch"):
+            return await asyncio.to_thread(
+                self.embedding_service.search_user_context,
+                user_id=user_id,
+                query=query,
+                n_results=self.max_context_chunks,
+                include_profile=False
+            )
+        
+        if self._search_task is None or self._search_task.done():
+            self._search_task = asyncio.create_task(self._search_worker())
+        
+        future = asyncio.get_running_loop().create_future()
+        self._search_queue.put_nowait((user_id, query, future))
+        return await future
+    
+    async def _search_worker(self):
+        """Background task that runs queued context searches in batches"""
+        while True:
+            batch = []
             try:
-                profile = await self.db_service.get_profile(user_id)
-                if profile:
-                    logger.info(f"Found profile data for user {user_id}")
-                    # Create context text from profile data
-                    profile_context_parts = []
-                    
-                    # Add name
-                    if profile.get('name'):
-                        profile_context_parts.append(f"Name: {profile['name']}")
-                    
-                    # Add education information
-                    if profile.get('education'):
-                        edu = profile['education']
-                        if isinstance(edu, dict):
-                            edu_text = f"Education: {edu.get('degree', '')} in {edu.get('field', '')} from {edu.get('institution', '')} ({edu.get('graduationYear', '')})"
-                            profile_context_parts.append(edu_text)
-                    
-                    # Add career background
-                    if profile.get('career_background'):
-                        profile_context_parts.append(f"Career Background: {profile['career_background']}")
-                    
-                    # Add current role
-                    if profile.get('current_role'):
-                        profile_context_parts.append(f"Current Role: {profile['current_role']}")
-                    
-                    # Add target roles
-                    if profile.get('target_roles'):
-                        if isinstance(profile['target_roles'], list):
-                            target_roles_text = ", ".join(profile['target_roles'])
-                        else:
-                            target_roles_text = str(profile['target_roles'])
-                        profile_context_parts.append(f"Target Roles: {target_roles_text}")
+                batch.append(await self._search_queue.get())
+                
+                # Give concurrent turns a short window to join the batch
+                while len(batch) < self.search_batch_size:
+                    try:
+                        batch.append(await asyncio.wait_for(
+                            self._search_queue.get(),
+                            timeout=self.search_flush_interval
+                        ))
+                    except asyncio.TimeoutError:
+                        break
+                
+                # Vector search is blocking - keep it off the event loop
+                results = await asyncio.to_thread(
+                    self.embedding_service.search_resume_embeddings_batch,
+                    [(user_id, query) for user_id, query, _ in batch],
+                    self.max_context_chunks
+                )
+                for (_, _, future), chunks in zip(batch, results):
+                    if not future.done():
+                        future.set_result(chunks)
+                
+            except asyncio.CancelledError:
+                self._fail_search_batch(batch, RuntimeError("Context search worker stopped"))
+                break
+            except Exception as e:
+                logger.error("Context search worker error: %s", e)
+                self._fail_search_batch(batch, e)
+    
+    @staticmethod
+    def _fail_search_batch(batch: List[Tuple[str, str, asyncio.Future]], error: Exception):
+        """Fail the callers waiting on a batch so they fall back to another search"""
+        for _, _, future in batch:
+            if not future.done():
+                future.set_exception(error)
+        batch.clear()
+    
+    async def _get_user_context_sections(self, user_id: str, query: str) -> Tuple[List[Dict], List[str], List[str]]:
+        """Retrieve user context split into stable background sections and query-specific sections"""
+        all_context_chunks = []
+        context_parts = []  # Stable per user: profile and stored resume
+        query_parts = []    # Depend on the question: vector search hits
+        
+        logger.info("Starting user context retrieval for user %s", user_id)
+        
+        # Always try to get profile data from database first
+        has_profile_block = False
+        try:
+            profile = await self.db_service.get_profile(user_id)
+            if profile:
+                logger.info("Found profile data for user %s", user_id)
+                profile_block = self._get_profile_block(user_id, profile)
+                if profile_block:
+                    context_parts.append(profile_block)
+                    has_profile_block = True
+                    logger.info("Added profile context for user %s", user_id)
+            else:
+                logger.warning("No profile found for user %s", user_id)
+        except Exception as profile_error:
+            logger.error("Failed to get profile for user %s: %s", user_id, profile_error)
+        
+        # Try to get resume data from database
+        try:
+            resume = await self.db_service.get_user_resume(user_id)
+            if resume and resume.get('parsed_content'):
+                logger.info("Found resume data for user %s", user_id)
+                
+                # Extract text content from parsed resume
+                parsed_content = resume['parsed_content']
+                if isinstance(parsed_content, dict) and parsed_content.get('text_content'):
+                    resume_text = parsed_content['text_content']
                     
-                    # Add additional details
-                    if profile.get('additional_details'):
-                        profile_context_parts.append(f"Additional Details: {profile['additional_details']}")
+                    # Limit resume text to avoid token overflow (keep first 2000 characters)
+                    if len(resume_text) > 2000:
+                        resume_text = resume_text[:2000] + "... [resume content truncated]"
                     
-                    # Combine profile context
-                    if profile_context_parts:
-                        profile_context = "\n".join(profile_context_parts)
-                        context_parts.append(f"Profile Information:\n{profile_context}")
-                        logger.info(f"Added profile context for user {user_id}")
-                else:
-                    logger.warning(f"No profile found for user {user_id}")
-            except Exception as profile_error:
-                logger.error(f"Failed to get profile for user {user_id}: {profile_error}")
-            
-            # Try to get resume data from database
+                    context_parts.append(f"Resume Content:\n{resume_text}")
+                    logger.info("Added full resume content for user %s", user_id)
+            else:
+                logger.warning("No resume found for user %s", user_id)
+        except Exception as resume_error:
+            logger.error("Failed to get resume for user %s: %s", user_id, resume_error)
+        
+        # Try to get comprehensive user context from embedding service
+        if self.embedding_service:
             try:
-                resume = await self.db_service.get_user_resume(user_id)
-                if resume and resume.get('parsed_content'):
-                    logger.info(f"Found resume data for user {user_id}")
-                    
-                    # Extract text content from parsed resume
-                    parsed_content = resume['parsed_content']
-                    if isinstance(parsed_content, dict) and parsed_content.get('text_content'):
-                        resume_text = parsed_content['text_content']
-                        
-                        # Limit resume text to avoid token overflow (keep first 2000 characters)
-                        if len(resume_text) > 2000:
-                            resume_text = resume_text[:2000] + "... [resume content truncated]"
-                        
-                        context_parts.append(f"Resume Content:\n{resume_text}")
-                        logger.info(f"Added full resume content for user {user_id}")
+                # Profile context changes only on refresh - search the resume per query
+                # Vector search is blocking - keep it off the event loop
+                # The stored profile document repeats the database profile, so it is only a fallback
+                profile_task = self._get_profile_chunks(user_id) if not has_profile_block else asyncio.sleep(0, [])
+                skip_search = self._is_trivial_query(query)
+                if skip_search:
+                    logger.info("Skipping context search for trivial query from user %s", user_id)
+                    profile_chunks, context_chunks = await profile_task, []
                 else:
-                    logger.warning(f"No resume found for user {user_id}")
-            except Exception as resume_error:
-                logger.error(f"Failed to get resume for user {user_id}: {resume_error}")
-            
-            # Try to get comprehensive user context from embedding service
-            if self.embedding_service:
-                try:
-                    # Use the comprehensive search that includes both resume and profile
-                    context_chunks = self.embedding_service.search_user_context(
-                        user_id=user_id,
-                        query=query,
-                        n_results=self.max_context_chunks
+                    profile_chunks, context_chunks = await asyncio.gather(
+                        profile_task,
+                        self._search_resume_context(user_id, query)
                     )
-                    
-                    # Filter by similarity threshold if available
-                    filtered_chunks = []
-                    for chunk in context_chunks:
-                        if chunk.get('distance') is None or chunk['distance'] <= self.context_similarity_threshold:
-                            filtered_chunks.append(chunk)
-                    
-                    all_context_chunks.extend(filtered_chunks)
-                    
-                    # Group context by source for better formatting
-                    resume_chunks = [c for c in filtered_chunks if c.get('source') == 'resume']
-                    embedding_profile_chunks = [c for c in filtered_chunks if c.get('source') == 'profile']
-                    
-                    # Format resume context
-                    if resume_chunks:
-                        resume_context = "\n".join([chunk['content'] for chunk in resume_chunks])
-                        context_parts.append(f"Resume Information:\n{resume_context}")
-                        logger.info(f"Added resume context from embeddings for user {user_id}")
-                    
-                    # Format profile context from embeddings (if different from direct profile)
-                    if embedding_profile_chunks:
-                        embedding_profile_context = "\n".join([chunk['content'] for chunk in embedding_profile_chunks])
-                        context_parts.append(f"Additional Profile Information:\n{embedding_profile_context}")
-                        logger.info(f"Added embedding profile context for user {user_id}")
-                    
-                    logger.info(f"Retrieved {len(filtered_chunks)} context chunks for user {user_id} (resume: {len(resume_chunks)}, profile: {len(embedding_profile_chunks)})")
-                    
-                    # Debug logging
-                    if len(resume_chunks) == 0:
-                        logger.warning(f"No resume chunks found for user {user_id}. This might indicate the resume hasn't been uploaded or processed.")
-                    
-                except Exception as e:
-                    logger.warning(f"Comprehensive context search failed, falling back to resume-only: {e}")
-                    # Fallback to resume-only search if comprehensive search fails
-                    if self.resume_service:
-                        try:
-                            resume_chunks = self.resume_service.search_resume_content(
-                                user_id=user_id,
-                                query=query,
-                                n_results=self.max_context_chunks
-                            )
-                            
-                            filtered_resume_chunks = []
-                            for chunk in resume_chunks:
-                                if chunk.get('distance') is None or chunk['distance'] <= self.context_similarity_threshold:
-                                    filtered_resume_chunks.append(chunk)
-                            
-                            all_context_chunks.extend(filtered_resume_chunks)
-                            
-                            if filtered_resume_chunks:
-                                resume_context = "\n".join([chunk['content'] for chunk in filtered_resume_chunks])
-                                context_parts.append(f"Resume Information:\n{resume_context}")
-                                logger.info(f"Added resume context from fallback for user {user_id}")
-                                
-                            logger.info(f"Retrieved {len(filtered_resume_chunks)} resume chunks for user {user_id}")
+                
+                if profile_chunks:
+                    all_context_chunks.extend(profile_chunks)
+                    context_parts.append(self._format_chunk_section("Additional Profile Information:", profile_chunks))
+                
+                # Filter by similarity threshold and group by source in one pass
+                threshold = self.context_similarity_threshold
+                filtered_chunks = []
+                resume_chunks = []
+                embedding_profile_chunks = []
+                for chunk in context_chunks:
+                    distance = chunk.get('distance')
+                    if distance is not None and distance > threshold:
+                        continue
+                    filtered_chunks.append(chunk)
+                    source = chunk.get('source')
+                    if source == 'resume':
+                        resume_chunks.append(chunk)
+                    elif source == 'profile':
+                        embedding_profile_chunks.append(chunk)
+                
+                all_context_chunks.extend(filtered_chunks)
+                
+                # Format resume context
+                if resume_chunks:
+                    query_parts.append(self._format_chunk_section("Resume Information:", resume_chunks))
+                    logger.info("Added resume context from embeddings for user %s", user_id)
+                
+                # Format profile context from embeddings (if different from direct profile)
+                if embedding_profile_chunks:
+                    query_parts.append(self._format_chunk_section("Additional Profile Information:", embedding_profile_chunks))
+                    logger.info("Added embedding profile context for user %s", user_id)
+                
+                logger.info("Retrieved %s context chunks for user %s (resume: %s, profile: %s)", len(filtered_chunks), user_id, len(resume_chunks), len(embedding_profile_chunks))
+                
+                # Debug logging
+                if len(resume_chunks) == 0 and not skip_search:
+                    logger.warning("No resume chunks found for user %s. This might indicate the resume hasn't been uploaded or processed.", user_id)
+                
+            except Exception as e:
+                logger.warning("Comprehensive context search failed, falling back to resume-only: %s", e)
+                # Fallback to resume-only search if comprehensive search fails
+                if self.resume_service:
+                    try:
+                        resume_chunks = await asyncio.to_thread(
+                            self.resume_service.search_resume_content,
+                            user_id=user_id,
+                            query=query,
+                            n_results=self.max_context_chunks
+                        )
+                        
+                        filtered_resume_chunks = []
+                        for chunk in resume_chunks:
+                            if chunk.get('distance') is None or chunk['distance'] <= self.context_similarity_threshold:
+                                filtered_resume_chunks.append(chunk)
+                        
+                        all_context_chunks.extend(filtered_resume_chunks)
+                        
+                        if filtered_resume_chunks:
+                            query_parts.append(self._format_chunk_section("Resume Information:", filtered_resume_chunks))
+                            logger.info("Added resume context from fallback for user %s", user_id)
                             
-                        except Exception as resume_error:
-                            logger.error(f"Resume context search also failed: {resume_error}")
-            else:
-                logger.warning("Embedding service not available")
-            
-            # Format final context text
-            if context_parts:
-                context_text = f"User Background Information:\n\n" + "\n\n".join(context_parts)
-                logger.info(f"Successfully created context for user {user_id} with {len(context_parts)} sections")
-            else:
-                context_text = "No specific user background information available. Please ask the user to provide relevant details about their background, experience, and goals."
-                logger.warning(f"No context found for user {user_id}")
-            
-            return all_context_chunks, context_text
-            
-        except Exception as e:
-            logger.error(f"Failed to retrieve user context: {e}")
-            # Graceful degradation - provide helpful message
-            fallback_context = "No user background information available. Please ask the user to provide relevant details about their background, experience, and goals to give more personalized advice."
-            return [], fallback_context
-    
-    def _create_chat_prompt_template(self) -> ChatPromptTemplate:
-        """Create LangChain prompt template for career mentoring"""
-        system_prompt = """You are an experienced career mentor and advisor. Your role is to provide personalized, actionable career guidance based on the user's background and goals.
-
-Key guidelines:
-- ALWAYS use the provided user background information to give personalized advice when available
-- Never ask users to re-share information that is already provided in their background
-- If you see profile information, resume content, or other background details, USE THEM immediately in your response
-- When a user asks about their strengths, weaknesses, or career advice, reference their specific background, education, experience, and goals
-- When analyzing their resume, provide specific examples from their actual experience, education, and skills
-- Never provide hypothetical examples when you have access to their real resume content
-- Be encouraging but realistic about career transitions and timelines
-- Provide specific, actionable steps when possible
-- Focus on practical skills, experiences, and strategies
-- Consider industry trends and market demands
-- Be supportive and understanding of career challenges
-- If background information is limited, ask targeted questions to fill specific gaps
-
-CRITICAL: The user background information provided contains their actual resume content and profile data. You have access to their real experience, education, skills, and career history. You must reference and use this specific information in your responses. Do not ask them to provide information that is already available in their background context. When they ask you to analyze or critique their resume, use their actual resume content, not hypothetical examples."""
-
-        prompt = ChatPromptTemplate.from_messages([
-            ("system", system_prompt),
-            ("human", "{context}"),
-            MessagesPlaceholder(variable_name="chat_history"),
-            ("human", "{question}")
-        ])
+                        logger.info("Retrieved %s resume chunks for user %s", len(filtered_resume_chunks), user_id)
+                        
+                    except Exception as resume_error:
+                        logger.error("Resume context search also failed: %s", resume_error)
+        else:
+            logger.warning("Embedding service not available")
+        
+        if context_parts or query_parts:
+            logger.info("Successfully created context for user %s with %s sections", user_id, len(context_parts) + len(query_parts))
+        else:
+            logger.warning("No context found for user %s", user_id)
         
-        return prompt
+        return all_context_chunks, context_parts, query_parts
     
     async def initialize_chat_session(self, request: ChatInitRequest) -> ChatSession:
         """Initialize a new chat session"""
@@ -400,7 +767,7 @@ CRITICAL: The user background information provided contains their actual resume
             )
             
             # Store session
-            self.active_sessions[session.id] = session
+            self._register_session(session.id, session)
             
             # Create memory for session
             self._create_session_memory(session.id)
@@ -411,7 +778,7 @@ CRITICAL: The user background information provided contains their actual resume
                     role=MessageRole.USER,
                     content=request.initial_message
                 )
-                session.messages.append(initial_message)
+                self._append_message(session.id, session, initial_message)
                 
                 # Process initial message
                 response = await self.send_message(ChatMessageRequest(
@@ -419,114 +786,64 @@ CRITICAL: The user background information provided contains their actual resume
                     message=request.initial_message
                 ))
             
-            logger.info(f"Initialized chat session {session.id} for user {request.user_id}")
+            logger.info("Initialized chat session %s for user %s", session.id, request.user_id)
             return session
             
         except Exception as e:
-            logger.error(f"Failed to initialize chat session: {e}")
+            logger.error("Failed to initialize chat session: %s", e)
             raise
     
+    def _get_session_lock(self, session_id: str) -> asyncio.Lock:
+        """Lock that serializes turns within one session"""
+        lock = self._session_locks.get(session_id)
+        if lock is None:
+            lock = asyncio.Lock()
+            self._session_locks[session_id] = lock
+        return lock
+    
     async def send_message(self, request: ChatMessageRequest) -> ChatResponse:
         """Send a message and get AI response with RAG context or workflow routing"""
+        # Concurrent messages to one session would interleave their history
+        async with self._get_session_lock(request.session_id):
+            return await self._send_message(request)
+    
+    async def _send_message(self, request: ChatMessageRequest) -> ChatResponse:
+        """Run one chat turn; callers hold the session lock"""
         try:
-            start_time = datetime.utcnow()
-            
-            # Get session
-            if request.session_id not in self.active_sessions:
-                raise ValueError(f"Chat session {request.session_id} not found")
+            start_time = time.perf_counter()
             
-            session = self.active_sessions[request.session_id]
-            
-            # Add user message to session
-            user_message = ChatMessage(
-                role=MessageRole.USER,
-                content=request.message
+            session, memory, user_message = await self._begin_turn(request)
+        except Exception as e:
+            logger.error("Failed to send message: %s", e)
+            raise
+        
+        try:
+            context_chunks, context_text, background_text, query_context = await self._resolve_turn_context(
+                session, request.message
             )
-            session.messages.append(user_message)
-            session.updated_at = datetime.utcnow()
-            
-            # Get session memory
-            memory = self._get_session_memory(request.session_id)
-            
-            # Add user message to memory
-            memory.chat_memory.add_user_message(request.message)
-            
-            # Always get user context for personalized responses
-            try:
-                context_chunks, context_text = await self._get_user_context(
-                    session.user_id, 
-                    request.message
-                )
-                logger.info(f"Successfully retrieved context for user {session.user_id}")
-            except Exception as rag_error:
-                logger.error(f"RAG context retrieval failed for user {session.user_id}: {rag_error}")
-                # Graceful degradation - continue without context
-                context_chunks = []
-                context_text = "Unable to retrieve user background information at this time. Please provide relevant details about your background and goals for personalized advice."
             
             # Check if request should be routed through workflow
             user_context = {"context_text": context_text, "context_chunks": context_chunks}
             workflow_routing = self._should_use_workflow(request.message, user_context)
-            
-            ai_response = None
-            workflow_used = False
-            
-            if workflow_routing:
-                # Route through Multi-Agent System
-                try:
-                    ai_response = await self._process_with_multi_agent_system(
-                        request.message, 
-                        session.user_id, 
-                        workflow_routing, 
-                        user_context
-                    )
-                    workflow_used = True
-                    logger.info(f"Processed message through multi-agent system: {workflow_routing['request_type']}")
-                except Exception as workflow_error:
-                    logger.warning(f"Multi-agent processing failed, falling back to direct AI: {workflow_error}")
-                    # Fall back to direct AI processing
-                    ai_response = None
+            ai_response = await self._try_multi_agent(request.message, session, workflow_routing, user_context)
+            workflow_used = ai_response is not None
             
             # If no workflow was used or workflow failed, use direct AI processing
             if not ai_response:
                 ai_response = await self._process_with_direct_ai(
                     request.message, 
-                    context_text, 
-                    memory.chat_memory.messages
+                    background_text, 
+                    self._get_history_text(request.session_id, memory),
+                    query_context
                 )
             
-            # Ensure ai_response is a string
-            if isinstance(ai_response, dict):
-                if "error" in ai_response:
-                    ai_response = f"I apologize, but I encountered an issue: {ai_response['error']}"
-                else:
-                    ai_response = str(ai_response)
-            elif not isinstance(ai_response, str):
-                ai_response = str(ai_response)
-            
-            # Create assistant message
-            assistant_message = ChatMessage(
-                role=MessageRole.ASSISTANT,
-                content=ai_response,
-                metadata={
-                    "context_chunks_used": len(context_chunks),
-                    "model_used": ModelType.GEMINI_FLASH.value,
-                    "workflow_used": workflow_used,
-                    "workflow_name": workflow_routing.get("workflow_name") if workflow_routing else None
-                }
+            assistant_message = self._finish_turn(
+                request.session_id, session, memory, ai_response, context_chunks, workflow_routing, workflow_used
             )
             
-            # Add to session and memory
-            session.messages.append(assistant_message)
-            memory.chat_memory.add_ai_message(ai_response)
-            
             # Calculate processing time
-            processing_time = (datetime.utcnow() - start_time).total_seconds()
-            
-            # Persist session to database
-            await self.persist_session_after_message(request.session_id)
-            
-            logger.info(f"Generated response for session {request.session_id} in {processing_time:.2f}s")
+            processing_time = time.perf_counter() - start_time
+            logger.info("Generated response for session %s in %.2fs", request.session_id, processing_time)
             
             return ChatResponse(
                 session_id=session.id,
@@ -535,10 +852,224 @@ CRITICAL: The user background information provided contains their actual resume
                 processing_time=processing_time
             )
             
-        except Exception as e:
-            logger.error(f"Failed to send message: {e}")
+        except BaseException as e:
+            # No reply was recorded, so don't leave the question dangling in the history
+            self._abort_turn(request.session_id, session, memory, user_message)
+            if isinstance(e, Exception):
+                logger.error("Failed to send message: %s", e)
             raise
     
+    async def send_message_stream(self, request: ChatMessageRequest) -> AsyncIterator[str]:
+        """Send a message and yield the AI response in chunks as it is generated"""
+        async with self._get_session_lock(request.session_id):
+            # Close the inner stream right away when the caller stops early, so the turn is settled
+            async with aclosing(self._send_message_stream(request)) as stream:
+                async for chunk in stream:
+                    yield chunk
+    
+    async def _send_message_stream(self, request: ChatMessageRequest) -> AsyncIterator[str]:
+        """Run one streamed chat turn; callers hold the session lock"""
+        session, memory, user_message = await self._begin_turn(request)
+        context_chunks: List[Dict] = []
+        workflow_routing = None
+        workflow_used = False
+        response_parts: List[str] = []
+        try:
+            context_chunks, context_text, background_text, query_context = await self._resolve_turn_context(
+                session, request.message
+            )
+            
+            user_context = {"context_text": context_text, "context_chunks": context_chunks}
+            workflow_routing = self._should_use_workflow(request.message, user_context)
+            ai_response = await self._try_multi_agent(request.message, session, workflow_routing, user_context)
+            workflow_used = ai_response is not None
+            
+            if ai_response:
+                # Multi-agent responses arrive whole
+                response_parts.append(ai_response)
+                yield ai_response
+            else:
+                ai_service = await self._get_ai_service()
+                prompt = self._build_direct_prompt(
+                    request.message, background_text, self._get_history_text(request.session_id, memory), query_context
+                )
+                if hasattr(ai_service, "stream_text"):
+                    async for chunk in ai_service.stream_text(
+                        prompt=prompt,
+                        model_type=ModelType.GEMINI_FLASH,
+                        max_tokens=800,
+                        temperature=0.8
+                    ):
+                        response_parts.append(chunk)
+                        yield chunk
+                else:
+                    text = await ai_service.generate_text(
+                        prompt=prompt,
+                        model_type=ModelType.GEMINI_FLASH,
+                        max_tokens=800,
+                        temperature=0.8
+                    )
+                    response_parts.append(text)
+                    yield text
+                ai_response = "".join(response_parts).strip()
+        except BaseException:
+            # Client disconnected or generation failed - keep whatever the user already saw,
+            # otherwise take the question back out of the history
+            partial = "".join(response_parts).strip()
+            if partial:
+                assistant_message = self._finish_turn(
+                    request.session_id, session, memory, partial, context_chunks, workflow_routing, workflow_used
+                )
+                assistant_message.metadata["incomplete"] = True
+            else:
+                self._abort_turn(request.session_id, session, memory, user_message)
+            logger.warning("Streamed response for session %s did not complete", request.session_id)
+            raise
+        
+        self._finish_turn(
+            request.session_id, session, memory, ai_response, context_chunks, workflow_routing, workflow_used
+        )
+        logger.info("Streamed response for session %s", request.session_id)
+    
+    async def _begin_turn(self, request: ChatMessageRequest) -> Tuple[ChatSession, ConversationBufferWindowMemory, ChatMessage]:
+        """Record the user's message in the session and its memory"""
+        session = await self.get_chat_session(request.session_id)
+        if session is None:
+            raise ValueError(f"Chat session {request.session_id} not found")
+        
+        # Add user message to session, reading the clock once for both timestamps
+        now = datetime.utcnow()
+        user_message = ChatMessage(
+            role=MessageRole.USER,
+            content=request.message,
+            timestamp=now
+        )
+        self._append_message(request.session_id, session, user_message)
+        session.updated_at = now
+        
+        # Add user message to memory
+        memory = self._get_session_memory(request.session_id)
+        memory.chat_memory.add_user_message(request.message)
+        return session, memory, user_message
+    
+    def _abort_turn(
+        self,
+        session_id: str,
+        session: ChatSession,
+        memory: ConversationBufferWindowMemory,
+        user_message: ChatMessage
+    ):
+        """Take back the user message of a turn that produced no reply"""
+        # Turns hold the session lock, so the message is still the newest one
+        if session.messages and session.messages[-1] is user_message:
+            session.messages.pop()
+            self._message_index.pop(session_id, None)
+            # A write during the turn may already have stored the message; the stored
+            # count is no longer a prefix of the list, so the next write must be a snapshot
+            state = self._persisted_state.get(session_id)
+            if state is not None and state[0] > len(session.messages):
+                self._persisted_state.pop(session_id, None)
+        history = memory.chat_memory.messages
+        if history and isinstance(history[-1], HumanMessage) and history[-1].content == user_message.content:
+            history.pop()
+            self._history_text_cache.pop(session_id, None)
+    
+    async def _resolve_turn_context(self, session: ChatSession, message: str) -> Tuple[List[Dict], str, str, str]:
+        """Get (context_chunks, context_text, background_text, query_context) for a turn"""
+        # Always get user context for personalized responses, warming up the AI service meanwhile
+        context_result, _ = await asyncio.gather(
+            self._get_user_context_sections(session.user_id, message),
+            self._get_ai_service(),
+            return_exceptions=True
+        )
+        if isinstance(context_result, Exception):
+            logger.error("RAG context retrieval failed for user %s: %s", session.user_id, context_result)
+            # Graceful degradation - continue without context
+            context_text = "Unable to retrieve user background information at this time. Please provide relevant details about your background and goals for personalized advice."
+            return [], context_text, context_text, ""
+        
+        context_chunks, background_parts, query_parts = context_result
+        if background_parts or not query_parts:
+            # Join each section once and reuse it for the combined context text
+            background_text = self._format_context_text(background_parts)
+            if query_parts:
+                query_text = "\n\n".join(query_parts)
+                query_context = "Relevant Background for This Question:\n\n" + query_text
+                context_text = background_text + "\n\n" + query_text
+            else:
+                query_context = ""
+                context_text = background_text
+        else:
+            # Only search hits available - keep them together with the question
+            context_text = self._format_context_text(query_parts)
+            background_text = ""
+            query_context = context_text
+        logger.info("Successfully retrieved context for user %s", session.user_id)
+        return context_chunks, context_text, background_text, query_context
+    
+    async def _try_multi_agent(
+        self,
+        message: str,
+        session: ChatSession,
+        workflow_routing: Optional[Dict[str, Any]],
+        user_context: Dict[str, Any]
+    ) -> Optional[str]:
+        """Route through the Multi-Agent System when the workflow calls for it, None otherwise"""
+        if not workflow_routing:
+            return None
+        
+        try:
+            ai_response = await self._process_with_multi_agent_system(
+                message, 
+                session.user_id, 
+                workflow_routing, 
+                user_context
+            )
+            logger.info("Processed message through multi-agent system: %s", workflow_routing['request_type'])
+        except Exception as workflow_error:
+            logger.warning("Multi-agent processing failed, falling back to direct AI: %s", workflow_error)
+            return None
+        
+        # Ensure ai_response is a string
+        if isinstance(ai_response, dict):
+            if "error" in ai_response:
+                return f"I apologize, but I encountered an issue: {ai_response['error']}"
+            return str(ai_response)
+        if not ai_response:
+            return None
+        return ai_response if isinstance(ai_response, str) else str(ai_response)
+    
+    def _finish_turn(
+        self,
+        session_id: str,
+        session: ChatSession,
+        memory: ConversationBufferWindowMemory,
+        ai_response: str,
+        context_chunks: List[Dict],
+        workflow_routing: Optional[Dict[str, Any]],
+        workflow_used: bool
+    ) -> ChatMessage:
+        """Record the assistant's reply and schedule the session for persistence"""
+        assistant_message = ChatMessage(
+            role=MessageRole.ASSISTANT,
+            content=ai_response,
+            metadata={
+                "context_chunks_used": len(context_chunks),
+                "model_used": ModelType.GEMINI_FLASH.value,
+                "workflow_used": workflow_used,
+                "workflow_name": workflow_routing.get("workflow_name") if workflow_routing else None
+            }
+        )
+        
+        # Add to session and memory
+        self._append_message(session_id, session, assistant_message)
+        memory.chat_memory.add_ai_message(ai_response)
+        self._archive_old_messages(session_id, session)
+        
+        # Persist session in the background - the writer coalesces rapid messages into one write
+        self._schedule_persist(session_id, session)
+        return assistant_message
+    
     async def _process_with_multi_agent_system(
         self, 
         message: str, 
@@ -592,22 +1123,14 @@ CRITICAL: The user background information provided contains their actual resume
     async def _process_with_direct_ai(
         self, 
         message: str, 
-        context_text: str, 
-        chat_history: List[BaseMessage]
+        background_text: str, 
+        history_text: str,
+        query_context: str = ""
     ) -> str:
         """Process message using direct AI service"""
-        # Create prompt template
-        prompt_template = self._create_chat_prompt_template()
-        
         # Get AI service
         ai_service = await self._get_ai_service()
-        
-        # Format the complete prompt
-        formatted_prompt = prompt_template.format(
-            context=context_text,
-            chat_history=chat_history,
-            question=message
-        )
+        formatted_prompt = self._build_direct_prompt(message, background_text, history_text, query_context)
         
         # Generate AI response
         return await ai_service.generate_text(
@@ -617,13 +1140,33 @@ CRITICAL: The user background information provided contains their actual resume
             temperature=0.8
         )
     
+    def _build_direct_prompt(
+        self,
+        message: str,
+        background_text: str,
+        history_text: str,
+        query_context: str = ""
+    ) -> str:
+        """Format the complete prompt for direct AI processing"""
+        parts = [self._system_prefix]
+        if background_text:
+            parts.append("\n\n")
+            parts.append(background_text)
+        if history_text:
+            parts.append("\n")
+            parts.append(history_text)
+        parts.append("\nHuman: ")
+        if query_context:
+            parts.append(query_context)
+            parts.append("\n\n")
+        parts.append(message)
+        return "".join(parts)
+    
     def _format_multi_agent_response(self, response_data: Dict[str, Any]) -> str:
         """Format multi-agent response data into a readable string"""
         if not response_data:
             return "I apologize, but I wasn't able to generate a comprehensive response. Please try rephrasing your question."
         
-        formatted_parts = []
-        
         # Check for error responses
         if "error" in response_data:
             return f"I encountered an issue while processing your request: {response_data['error']}"
@@ -635,121 +1178,161 @@ CRITICAL: The user background information provided contains their actual resume
         # If it's a dict, try to extract meaningful content
         if isinstance(response_data, dict):
             # Look for common response fields
-            for field in ["content", "advice", "recommendation", "analysis", "response"]:
-                if field in response_data and response_data[field]:
-                    return str(response_data[field])
+            for field in _RESPONSE_FIELDS:
+                value = response_data.get(field, _MISSING)
+                if value is not _MISSING and value:
+                    return str(value)
             
             # If no standard fields, format as a structured response
-            return json.dumps(response_data, indent=2)
+            return _dumps_indent(response_data)
+        
+        formatted_parts = [None] * _MAX_FORMATTED_PARTS
+        idx = 0
         
         # Add skills analysis
         if "skills_analysis" in response_data:
             skills = response_data["skills_analysis"]
             if isinstance(skills, dict):
                 if skills.get("skill_gaps"):
-                    formatted_parts.append("**Key Skill Areas to Develop:**")
-                    for gap in skills["skill_gaps"][:3]:  # Limit to top 3
-                        formatted_parts.append(f"• {gap}")
-                    formatted_parts.append("")
+                    formatted_parts[idx] = "**Key Skill Areas to Develop:**"
+                    idx += 1
+                    for gap in islice(skills["skill_gaps"], 3):  # Limit to top 3
+                        formatted_parts[idx] = f"• {gap}"
+                        idx += 1
+                    formatted_parts[idx] = ""
+                    idx += 1
         
         # Add learning resources
         if "learning_resources" in response_data:
             resources = response_data["learning_resources"]
             if isinstance(resources, dict) and resources.get("recommended_resources"):
-                formatted_parts.append("**Recommended Learning Resources:**")
-                for resource in resources["recommended_resources"][:3]:  # Limit to top 3
+                formatted_parts[idx] = "**Recommended Learning Resources:**"
+                idx += 1
+                for resource in islice(resources["recommended_resources"], 3):  # Limit to top 3
                     if isinstance(resource, dict):
                         title = resource.get("title", "Resource")
                         description = resource.get("description", "")
-                        formatted_parts.append(f"• **{title}**: {description}")
+                        formatted_parts[idx] = f"• **{title}**: {description}"
+                        idx += 1
                     else:
-                        formatted_parts.append(f"• {resource}")
-                formatted_parts.append("")
+                        formatted_parts[idx] = f"• {resource}"
+                        idx += 1
+                formatted_parts[idx] = ""
+                idx += 1
         
         # Add workflow metadata if available
         if "workflow_metadata" in response_data:
-            metadata = response_data["workflow_metadata"]
-            formatted_parts.append(f"*This response was generated using our multi-agent analysis system.*")
+            formatted_parts[idx] = _MULTI_AGENT_FOOTER
+            idx += 1
         
-        return "\n".join(formatted_parts) if formatted_parts else "I've analyzed your request using multiple specialized agents. Please let me know if you'd like me to elaborate on any specific aspect."
+        return "\n".join(formatted_parts[:idx]) if idx else "I've analyzed your request using multiple specialized agents. Please let me know if you'd like me to elaborate on any specific aspect."
     
-    def get_chat_session(self, session_id: str) -> Optional[ChatSession]:
-        """Get a chat session by ID"""
-        return self.active_sessions.get(session_id)
+    async def get_chat_session(self, session_id: str) -> Optional[ChatSession]:
+        """Get an active chat session by ID, reloading it from the database if it was evicted"""
+        session = self._touch_session(session_id)
+        if session is None:
+            # Eviction only drops the in-memory copy; inactive sessions stay in the database
+            session = await self._reload_session(session_id)
+            if session is not None and not session.is_active:
+                return None
+        return session
     
     def get_user_sessions(self, user_id: str) -> List[ChatSession]:
         """Get all chat sessions for a user"""
-        return [
-            session for session in self.active_sessions.values()
-            if session.user_id == user_id and session.is_active
-        ]
+        sessions = []
+        for session_id in self._user_sessions.get(user_id, ()):
+            session = self.active_sessions[session_id]
+            if session.is_active:
+                sessions.append(session)
+        return sessions
     
     def delete_chat_session(self, session_id: str) -> bool:
         """Delete a chat session"""
         try:
-            if session_id in self.active_sessions:
-                # Mark as inactive instead of deleting (for audit trail)
-                self.active_sessions[session_id].is_active = False
-                
-                # Clean up memory
-                if session_id in self.session_memories:
-                    del self.session_memories[session_id]
-                
-                logger.info(f"Deleted chat session {session_id}")
-                return True
-            return False
+            session = self.active_sessions.get(session_id)
+            if session is None:
+                return False
+            
+            # Mark as inactive instead of deleting (for audit trail)
+            session.is_active = False
+            self._active_ids.discard(session_id)
+            self._user_sessions[session.user_id].discard(session_id)
+            
+            # Clean up memory
+            self._release_session_memory(session_id)
+            
+            # The flag only lives in memory until written - eviction and reloads must not revive it
+            self._schedule_persist(session_id, session)
+            
+            logger.info("Deleted chat session %s", session_id)
+            return True
             
         except Exception as e:
-            logger.error(f"Failed to delete chat session {session_id}: {e}")
+            logger.error("Failed to delete chat session %s: %s", session_id, e)
             return False
     
     def clear_session_memory(self, session_id: str) -> bool:
         """Clear memory for a specific session"""
         try:
-            if session_id in self.session_memories:
-                self.session_memories[session_id].clear()
-                logger.info(f"Cleared memory for session {session_id}")
-                return True
-            return False
+            memory = self.session_memories.get(session_id)
+            if memory is None:
+                return False
+            
+            memory.clear()
+            logger.info("Cleared memory for session %s", session_id)
+            return True
             
         except Exception as e:
-            logger.error(f"Failed to clear session memory: {e}")
+            logger.error("Failed to clear session memory: %s", e)
             return False
     
     async def regenerate_response(self, session_id: str, message_id: str) -> Optional[ChatResponse]:
         """Regenerate the last AI response"""
+        async with self._get_session_lock(session_id):
+            return await self._regenerate_response(session_id, message_id)
+    
+    async def _regenerate_response(self, session_id: str, message_id: str) -> Optional[ChatResponse]:
+        """Replace an AI response with a new one; callers hold the session lock"""
         try:
-            if session_id not in self.active_sessions:
+            session = await self.get_chat_session(session_id)
+            if session is None:
                 return None
             
-            session = self.active_sessions[session_id]
-            
             # Find the message and the previous user message
-            message_index = None
-            for i, msg in enumerate(session.messages):
-                if msg.id == message_id and msg.role == MessageRole.ASSISTANT:
-                    message_index = i
-                    break
+            positions, _ = self._get_message_index(session_id, session)
+            message_index = positions.get(message_id)
+            
+            if not message_index or session.messages[message_index].role is not MessageRole.ASSISTANT:
+                return None
             
-            if message_index is None or message_index == 0:
+            # Archived messages no longer have their text in memory
+            if message_index <= self._archived_upto.get(session_id, 0):
                 return None
             
             # Get the user message that prompted this response
             user_message = session.messages[message_index - 1]
-            if user_message.role != MessageRole.USER:
+            if user_message.role is not MessageRole.USER:
                 return None
             
             # Remove the old AI response from session and memory
-            session.messages.pop(message_index)
+            was_last = message_index == len(session.messages) - 1
+            removed = session.messages.pop(message_index)
+            self._message_index.pop(session_id, None)
+            # Stored history no longer matches - next persist must write a full snapshot
+            self._persisted_state.pop(session_id, None)
             memory = self._get_session_memory(session_id)
             
-            # Rebuild memory from remaining messages
-            memory.clear()
-            for msg in session.messages:
-                if msg.role == MessageRole.USER:
-                    memory.chat_memory.add_user_message(msg.content)
-                elif msg.role == MessageRole.ASSISTANT:
-                    memory.chat_memory.add_ai_message(msg.content)
+            memory_messages = memory.chat_memory.messages
+            if (
+                was_last
+                and memory_messages
+                and isinstance(memory_messages[-1], AIMessage)
+                and memory_messages[-1].content == removed.content
+            ):
+                # Common case: the latest reply is regenerated - drop it from the buffer tail
+                memory_messages.pop()
+            else:
+                self._rebuild_session_memory(memory, session)
             
             # Generate new response
             request = ChatMessageRequest(
@@ -758,28 +1341,40 @@ CRITICAL: The user background information provided contains their actual resume
                 include_context=True
             )
             
-            return await self.send_message(request)
+            return await self._send_message(request)
             
         except Exception as e:
-            logger.error(f"Failed to regenerate response: {e}")
+            logger.error("Failed to regenerate response: %s", e)
             return None
     
+    def _rebuild_session_memory(self, memory: ConversationBufferWindowMemory, session: ChatSession):
+        """Rebuild memory from the remaining session messages"""
+        memory.clear()
+        add_user = memory.chat_memory.add_user_message
+        add_ai = memory.chat_memory.add_ai_message
+        user_role = MessageRole.USER
+        assistant_role = MessageRole.ASSISTANT
+        for msg in islice(session.messages, self._archived_upto.get(session.id, 0), None):
+            role = msg.role
+            if role is user_role:
+                add_user(msg.content)
+            elif role is assistant_role:
+                add_ai(msg.content)
+    
     def get_session_stats(self, session_id: str) -> Optional[Dict]:
         """Get statistics for a chat session"""
-        if session_id not in self.active_sessions:
+        session = self.active_sessions.get(session_id)
+        if session is None:
             return None
         
-        session = self.active_sessions[session_id]
-        
-        user_messages = [msg for msg in session.messages if msg.role == MessageRole.USER]
-        assistant_messages = [msg for msg in session.messages if msg.role == MessageRole.ASSISTANT]
+        _, counts = self._get_message_index(session_id, session)
         
         return {
             "session_id": session_id,
             "user_id": session.user_id,
             "total_messages": len(session.messages),
-            "user_messages": len(user_messages),
-            "assistant_messages": len(assistant_messages),
+            "user_messages": counts[MessageRole.USER],
+            "assistant_messages": counts[MessageRole.ASSISTANT],
             "created_at": session.created_at,
             "updated_at": session.updated_at,
             "duration_minutes": (session.updated_at - session.created_at).total_seconds() / 60,
@@ -787,23 +1382,46 @@ CRITICAL: The user background information provided contains their actual resume
         }
     
     async def health_check(self) -> Dict:
-        """Check the health of the chat service"""
+        """Check the health of the chat service, reusing results within the TTL"""
+        cached = self._health_cache
+        if cached and time.monotonic() - cached[0] < self._health_ttl:
+            return cached[1]
+        
+        async with self._health_lock:
+            # Another poller may have refreshed the result while we waited
+            cached = self._health_cache
+            if cached and time.monotonic() - cached[0] < self._health_ttl:
+                return cached[1]
+            
+            result = await self._probe_health()
+            self._health_cache = (time.monotonic(), result)
+            return result
+    
+    async def _probe_health(self) -> Dict:
+        """Probe downstream services for health"""
+        active_count = len(self._active_ids)
+        
         try:
-            # Check AI service
+            # Check AI service and embedding service (if available) concurrently
             ai_service = await self._get_ai_service()
-            ai_health = await ai_service.health_check()
+            checks = [ai_service.health_check()]
+            if self.embedding_service:
+                checks.append(asyncio.to_thread(self.embedding_service.health_check))
+            results = await asyncio.gather(*checks, return_exceptions=True)
+            
+            ai_health = results[0]
+            if isinstance(ai_health, Exception):
+                raise ai_health
             
-            # Check embedding service if available
             embedding_health = {"status": "not_available"}
             if self.embedding_service:
-                try:
-                    embedding_health = self.embedding_service.health_check()
-                except Exception as e:
-                    embedding_health = {"status": "error", "error": str(e)}
+                embedding_health = results[1]
+                if isinstance(embedding_health, Exception):
+                    embedding_health = {"status": "error", "error": str(embedding_health)}
             
             return {
                 "status": "healthy",
-                "active_sessions": len([s for s in self.active_sessions.values() if s.is_active]),
+                "active_sessions": active_count,
                 "total_sessions": len(self.active_sessions),
                 "memory_sessions": len(self.session_memories),
                 "ai_service_status": ai_health.get("status", "unknown"),
@@ -817,57 +1435,318 @@ CRITICAL: The user background information provided contains their actual resume
             }
             
         except Exception as e:
-            logger.error(f"Chat service health check failed: {e}")
+            logger.error("Chat service health check failed: %s", e)
             return {
                 "status": "unhealthy",
                 "error": str(e),
-                "active_sessions": len([s for s in self.active_sessions.values() if s.is_active]),
+                "active_sessions": active_count,
                 "total_sessions": len(self.active_sessions)
             }
     
     # Database persistence methods
     async def save_chat_session(self, session: ChatSession) -> str:
         """Save chat session to database"""
-        session_id = await self.db_service.save_chat_session(session)
+        stored_session = await self._restore_archived_messages(session.id, session)
+        session_id = await self.db_service.save_chat_session(stored_session)
+        self._persisted_state[session_id] = (len(session.messages), 0)
         # Keep in active sessions if it's active
         if session.is_active:
-            self.active_sessions[session_id] = session
+            self._register_session(session_id, session)
         return session_id
     
     async def load_chat_session(self, session_id: str) -> Optional[ChatSession]:
         """Load chat session from database"""
         # Check active sessions first
-        if session_id in self.active_sessions:
-            return self.active_sessions[session_id]
+        session = self._touch_session(session_id)
+        if session is None:
+            session = await self._reload_session(session_id)
+        
+        # Never hand out archive placeholders as history - a failed restore is an error
+        if session is not None and self._archived_upto.get(session_id):
+            return await self._restore_archived_messages(session_id, session)
+        return session
+    
+    async def _reload_session(self, session_id: str) -> Optional[ChatSession]:
+        """Bring a session that is not in memory back from its pending write or the database"""
+        # Evicted before its queued write went out - that copy is newer than the database
+        pending = self._dirty_sessions.get(session_id)
+        if pending is not None and pending.is_active:
+            self._register_session(session_id, pending)
+            self._load_session_into_memory(pending)
+            return pending
         
         # Load from database
         session = await self.db_service.load_chat_session(session_id)
         if session and session.is_active:
             # Load into active sessions and create memory
-            self.active_sessions[session_id] = session
+            self._persisted_state[session_id] = (len(session.messages), 0)
+            self._register_session(session_id, session)
             self._load_session_into_memory(session)
         
         return session
     
+    async def get_session_messages(self, session_id: str, limit: int = 50, offset: int = 0) -> Optional[List[ChatMessage]]:
+        """Page of a session's messages, counting offset back from the newest"""
+        session = self._touch_session(session_id)
+        if session is None:
+            return await self.db_service.load_chat_messages(session_id, limit, offset)
+        
+        end = max(len(session.messages) - offset, 0)
+        start = max(end - limit, 0)
+        if start < self._archived_upto.get(session_id, 0):
+            session = await self._restore_archived_messages(session_id, session)
+        return session.messages[start:end]
+    
     async def load_user_chat_sessions(self, user_id: str, active_only: bool = True) -> List[ChatSession]:
         """Load all chat sessions for a user from database"""
         return await self.db_service.load_user_chat_sessions(user_id, active_only)
     
+    async def load_user_chat_session_summaries(self, user_id: str, active_only: bool = True) -> List[ChatSessionSummary]:
+        """Load a user's chat session listing without the message history"""
+        return await self.db_service.load_user_chat_session_summaries(user_id, active_only)
+    
     async def persist_session_after_message(self, session_id: str) -> bool:
-        """Save session to database after adding a message"""
+        """Queue session for a batched database write after adding a message"""
         try:
-            if session_id in self.active_sessions:
-                session = self.active_sessions[session_id]
-                await self.save_chat_session(session)
-                return True
-            return False
+            session = self.active_sessions.get(session_id)
+            if session is None:
+                return False
+            
+            self._schedule_persist(session_id, session)
+            return True
         except Exception as e:
-            logger.error(f"Failed to persist session {session_id}: {e}")
+            logger.error("Failed to persist session %s: %s", session_id, e)
             return False
     
+    def _schedule_persist(self, session_id: str, session: ChatSession):
+        """Mark a session dirty and wake the background writer"""
+        if self._persist_task is None or self._persist_task.done():
+            self._persist_task = asyncio.create_task(self._persist_worker())
+        
+        # Already pending - the queued write will pick up the latest state
+        already_dirty = session_id in self._dirty_sessions
+        self._dirty_sessions[session_id] = session
+        if already_dirty:
+            return
+        
+        try:
+            self._persist_queue.put_nowait(session_id)
+        except asyncio.QueueFull:
+            # Worker is already behind and drains every dirty session when it wakes
+            pass
+    
+    async def _persist_worker(self):
+        """Background task that coalesces session writes into batches"""
+        while True:
+            try:
+                await self._persist_queue.get()
+                
+                # Give other sessions a short window to join the batch
+                pending = 1
+                while pending < self.persist_batch_size:
+                    try:
+                        await asyncio.wait_for(
+                            self._persist_queue.get(),
+                            timeout=self.persist_flush_interval
+                        )
+                        pending += 1
+                    except asyncio.TimeoutError:
+                        break
+                
+                await self._flush_dirty_sessions()
+                
+            except asyncio.CancelledError:
+                break
+            except Exception as e:
+                logger.error("Session persist worker error: %s", e)
+    
+    async def _flush_dirty_sessions(self):
+        """Write every dirty session to the database in batches"""
+        # Wake-ups for sessions flushed below are no longer needed
+        while not self._persist_queue.empty():
+            self._persist_queue.get_nowait()
+        
+        while self._dirty_sessions:
+            batch_ids = list(self._dirty_sessions)[:self.persist_batch_size]
+            batch = [(session_id, self._dirty_sessions.pop(session_id)) for session_id in batch_ids]
+            
+            try:
+                await self._write_persist_batch(batch)
+            except asyncio.CancelledError:
+                # Put them back so close() can still write them
+                for session_id, session in batch:
+                    self._dirty_sessions.setdefault(session_id, session)
+                raise
+            except Exception as e:
+                logger.error("Failed to persist %s chat sessions: %s", len(batch), e)
+            
+            # Evicted sessions no longer need their write state
+            for session_id, _ in batch:
+                if session_id not in self.active_sessions:
+                    self._persisted_state.pop(session_id, None)
+                    self._archived_upto.pop(session_id, None)
+    
+    async def _write_persist_batch(self, batch: List[Tuple[str, ChatSession]]):
+        """Append new messages where possible, otherwise write full snapshots"""
+        appends: Dict[str, List[ChatMessage]] = {}
+        append_counts: Dict[str, int] = {}
+        snapshots: Dict[str, ChatSession] = {}
+        
+        for session_id, session in batch:
+            count = len(session.messages)
+            state = self._persisted_state.get(session_id)
+            if state is None or state[0] >= count or state[1] >= self.checkpoint_every:
+                snapshots[session_id] = session
+            else:
+                appends[session_id] = session.messages[state[0]:count]
+                append_counts[session_id] = count
+        
+        if appends:
+            try:
+                appended = set(await self.db_service.append_chat_messages_batch(appends))
+            except (Exception, asyncio.CancelledError) as e:
+                # Stored history is unknown now - the next write must be a full snapshot
+                for session_id in appends:
+                    self._persisted_state.pop(session_id, None)
+                if isinstance(e, asyncio.CancelledError):
+                    raise
+                logger.error("Failed to append messages for %s chat sessions: %s", len(appends), e)
+                appended = set()
+            
+            sessions = dict(batch)
+            for session_id in appends:
+                state = self._persisted_state.get(session_id)
+                if session_id in appended and state is not None:
+                    self._persisted_state[session_id] = (append_counts[session_id], state[1] + 1)
+                else:
+                    # Row missing or append failed - write the whole session instead
+                    snapshots[session_id] = sessions[session_id]
+        
+        if snapshots:
+            counts = {session_id: len(session.messages) for session_id, session in snapshots.items()}
+            
+            # Never overwrite stored history with archive placeholders
+            for session_id in [sid for sid in snapshots if self._archived_upto.get(sid)]:
+                try:
+                    snapshots[session_id] = await self._restore_archived_messages(session_id, snapshots[session_id])
+                except Exception as e:
+                    logger.error("Skipping snapshot of chat session %s: %s", session_id, e)
+                    del snapshots[session_id]
+                    del counts[session_id]
+            await self.db_service.save_chat_sessions_batch(list(snapshots.values()))
+            for session_id, count in counts.items():
+                self._persisted_state[session_id] = (count, 0)
+    
+    async def _store_profile_context(self, user_id: str, profile_context: str) -> bool:
+        """Queue profile context for the next embedding batch and wait for the result"""
+        if self._embed_task is None or self._embed_task.done():
+            self._embed_task = asyncio.create_task(self._embed_worker())
+        
+        future = asyncio.get_running_loop().create_future()
+        self._embed_queue.put_nowait((user_id, profile_context, future))
+        return await future
+    
+    async def _embed_worker(self):
+        """Background task that embeds queued profile contexts in batches"""
+        while True:
+            batch = []
+            try:
+                batch.append(await self._embed_queue.get())
+                
+                # Give other users a short window to join the batch
+                while len(batch) < self.embed_batch_size:
+                    try:
+                        batch.append(await asyncio.wait_for(
+                            self._embed_queue.get(),
+                            timeout=self.embed_flush_interval
+                        ))
+                    except asyncio.TimeoutError:
+                        break
+                
+                await self._store_profile_batch(batch)
+                
+            except asyncio.CancelledError:
+                # Don't strand callers whose items were already taken off the queue
+                await self._store_profile_batch(batch)
+                break
+            except Exception as e:
+                logger.error("Profile embedding worker error: %s", e)
+                await self._store_profile_batch(batch)
+    
+    async def _store_profile_batch(self, batch: List[Tuple[str, str, asyncio.Future]]):
+        """Embed a batch of profile contexts off the event loop and resolve the waiting callers"""
+        if not batch:
+            return
+        
+        # Take ownership so a cancelled worker doesn't store the same batch twice
+        pending = list(batch)
+        batch.clear()
+        items = [(user_id, text) for user_id, text, _ in pending]
+        results = {}
+        try:
+            results = await asyncio.to_thread(self._store_profile_items, items)
+        except Exception as e:
+            logger.error("Failed to store %s profile contexts: %s", len(items), e)
+        finally:
+            for user_id, _, future in pending:
+                if not future.done():
+                    future.set_result(results.get(user_id, False))
+    
+    def _store_profile_items(self, items: List[Tuple[str, str]]) -> Dict[str, bool]:
+        """Embed profile contexts with the batch API when the embedding service has one"""
+        store_batch = getattr(self.embedding_service, "store_profile_context_batch", None)
+        if store_batch is not None:
+            return store_batch(items)
+        return {
+            user_id: self.embedding_service.store_profile_context(user_id, text)
+            for user_id, text in items
+        }
+    
+    async def close(self):
+        """Stop background workers and flush pending writes"""
+        if self._persist_task:
+            self._persist_task.cancel()
+            try:
+                await self._persist_task
+            except asyncio.CancelledError:
+                pass
+            self._persist_task = None
+        
+        await self._flush_dirty_sessions()
+        
+        if self._embed_task:
+            self._embed_task.cancel()
+            try:
+                await self._embed_task
+            except asyncio.CancelledError:
+                pass
+            self._embed_task = None
+        
+        pending = []
+        while not self._embed_queue.empty():
+            pending.append(self._embed_queue.get_nowait())
+        await self._store_profile_batch(pending)
+        
+        if self._search_task:
+            self._search_task.cancel()
+            try:
+                await self._search_task
+            except asyncio.CancelledError:
+                pass
+            self._search_task = None
+        
+        pending = []
+        while not self._search_queue.empty():
+            pending.append(self._search_queue.get_nowait())
+        self._fail_search_batch(pending, RuntimeError("Chat service closed"))
+    
     async def refresh_user_context(self, user_id: str) -> bool:
         """Refresh user's RAG context after profile or resume updates"""
         try:
+            # Profile changed - drop the cached prompt block and stored chunks
+            self._profile_block_cache.pop(user_id, None)
+            self._profile_chunk_cache.pop(user_id, None)
+            
             if not self.embedding_service:
                 logger.warning("Embedding service not available for context refresh")
                 return False
@@ -907,36 +1786,58 @@ CRITICAL: The user background information provided contains their actual resume
                     
                     # Store profile context as embeddings for RAG
                     if profile_context.strip():
-                        success = self.embedding_service.store_profile_context(user_id, profile_context)
+                        context_hash = hash(profile_context)
+                        if self._profile_context_cache.get(user_id, (None,))[0] == context_hash:
+                            logger.info("RAG context unchanged for user %s, skipping re-embed", user_id)
+                            return True
+                        
+                        success = await self._store_profile_context(user_id, profile_context)
+                        # Reads made while storing may have cached the old chunks
+                        self._profile_chunk_cache.pop(user_id, None)
                         if success:
-                            logger.info(f"Successfully refreshed RAG context for user {user_id}")
+                            self._profile_context_cache[user_id] = (context_hash, profile_context)
+                            logger.info("Successfully refreshed RAG context for user %s", user_id)
                             return True
                         else:
-                            logger.error(f"Failed to store profile context for user {user_id}")
+                            logger.error("Failed to store profile context for user %s", user_id)
                             return False
                     else:
-                        logger.warning(f"No profile context to store for user {user_id}")
+                        logger.warning("No profile context to store for user %s", user_id)
                         return True
                 else:
-                    logger.warning(f"No profile found for user {user_id}")
+                    logger.warning("No profile found for user %s", user_id)
                     return True
                     
             except Exception as profile_error:
-                logger.error(f"Failed to get profile for user {user_id}: {profile_error}")
+                logger.error("Failed to get profile for user %s: %s", user_id, profile_error)
                 return False
                 
         except Exception as e:
-            logger.error(f"Failed to refresh user context for {user_id}: {e}")
+            logger.error("Failed to refresh user context for %s: %s", user_id, e)
             return False
 
 # Singleton instance for global use
 _chat_service_instance = None
+_chat_service_lock = asyncio.Lock()
 
 async def get_chat_service() -> RAGChatService:
     """Get or create singleton chat service instance"""
     global _chat_service_instance
     
-    if _chat_service_instance is None:
-        _chat_service_instance = RAGChatService()
+    instance = _chat_service_instance
+    if instance is not None:
+        return instance
+    
+    async with _chat_service_lock:
+        if _chat_service_instance is None:
+            _chat_service_instance = RAGChatService()
+    
+    return _chat_service_instance
+
+async def cleanup_chat_service():
+    """Flush pending writes and cleanup singleton chat service instance"""
+    global _chat_service_instance
     
-    return _chat_service_instance
\ No newline at end of file
+    if _chat_service_instance:
+        await _chat_service_instance.close()
+        _chat_service_instance = None
\ No newline at end of file
@@ -2,13 +2,23 @@
 Database connection pooling service for improved performance
 """
 import os
+import json
 import asyncio
 import logging
+import time
 from typing import Optional, Dict, Any
+from collections import deque
 from contextlib import asynccontextmanager
 from datetime import datetime, timedelta
 import asyncpg
 from asyncpg import Pool
+
+# Decode JSON columns with orjson when it is installed
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
 from dataclasses import dataclass, field
 
 logger = logging.getLogger(__name__)
@@ -26,7 +36,9 @@ class PoolMetrics:
     peak_connections: int = 0
     pool_created_at: Optional[datetime] = None
     last_query_time: Optional[datetime] = None
-    query_times: list = field(default_factory=list)
+    # Last 1000 query times and their running sum
+    query_times: deque = field(default_factory=lambda: deque(maxlen=1000))
+    query_time_sum: float = 0.0
 
 class DatabaseConnectionPool:
     """
@@ -39,7 +51,8 @@ class DatabaseConnectionPool:
         min_size: int = 5,
         max_size: int = 20,
         command_timeout: int = 30,
-        server_settings: Optional[Dict[str, str]] = None
+        server_settings: Optional[Dict[str, str]] = None,
+        statement_cache_size: Optional[int] = None
     ):
         """
         Initialize database connection pool
@@ -50,6 +63,8 @@ class DatabaseConnectionPool:
             max_size: Maximum number of connections in pool
             command_timeout: Command timeout in seconds
             server_settings: Additional server settings
+            statement_cache_size: Prepared statements cached per connection
+                (0 disables caching, needed behind a transaction-mode pgbouncer)
         """
         self.database_url = database_url or os.getenv("DATABASE_URL")
         if not self.database_url:
@@ -64,6 +79,10 @@ class DatabaseConnectionPool:
             'timezone': 'UTC'
         }
         
+        if statement_cache_size is None:
+            statement_cache_size = int(os.getenv("DB_STATEMENT_CACHE_SIZE", "256"))
+        self.statement_cache_size = statement_cache_size
+        
         self.pool: Optional[Pool] = None
         self.metrics = PoolMetrics()
         self._lock = asyncio.Lock()
@@ -87,7 +106,9 @@ class DatabaseConnectionPool:
                     min_size=self.min_size,
                     max_size=self.max_size,
                     command_timeout=self.command_timeout,
-                    server_settings=self.server_settings
+                    server_settings=self.server_settings,
+                    statement_cache_size=self.statement_cache_size,
+                    init=self._init_connection
                 )
                 
                 self.metrics.pool_created_at = datetime.utcnow()
@@ -100,6 +121,17 @@ class DatabaseConnectionPool:
             logger.error(f"Failed to initialize database pool: {str(e)}")
             return False
     
+    @staticmethod
+    async def _init_connection(conn):
+        """Decode JSON columns to Python objects and UUIDs to strings, matching PostgREST rows"""
+        if ORJSON_AVAILABLE:
+            encoder, decoder = (lambda value: orjson.dumps(value).decode()), orjson.loads
+        else:
+            encoder, decoder = json.dumps, json.loads
+        for json_type in ("json", "jsonb"):
+            await conn.set_type_codec(json_type, encoder=encoder, decoder=decoder, schema="pg_catalog")
+        await conn.set_type_codec("uuid", encoder=str, decoder=str, schema="pg_catalog", format="text")
+    
     async def close(self):
         """Close the connection pool"""
         try:
@@ -125,7 +157,7 @@ class DatabaseConnectionPool:
         if not self.pool:
             raise RuntimeError("Connection pool not initialized")
         
-        start_time = datetime.utcnow()
+        start_time = time.perf_counter()
         connection = None
         
         try:
@@ -149,7 +181,7 @@ class DatabaseConnectionPool:
                     self.metrics.active_connections -= 1
                     
                     # Update query metrics
-                    query_time = (datetime.utcnow() - start_time).total_seconds()
+                    query_time = time.perf_counter() - start_time
                     self._update_query_metrics(query_time)
                     
                 except Exception as e:
@@ -245,15 +277,15 @@ class DatabaseConnectionPool:
     
     def _update_query_metrics(self, query_time: float):
         """Update query performance metrics"""
-        self.metrics.query_times.append(query_time)
+        query_times = self.metrics.query_times
         
-        # Keep only last 1000 query times for memory efficiency
-        if len(self.metrics.query_times) > 1000:
-            self.metrics.query_times = self.metrics.query_times[-1000:]
+        # The deque drops its oldest entry once full - take it out of the running sum
+        if len(query_times) == query_times.maxlen:
+            self.metrics.query_time_sum -= query_times[0]
+        query_times.append(query_time)
+        self.metrics.query_time_sum += query_time
         
-        # Calculate average query time
-        if self.metrics.query_times:
-            self.metrics.average_query_time = sum(self.metrics.query_times) / len(self.metrics.query_times)
+        self.metrics.average_query_time = self.metrics.query_time_sum / len(query_times)
     
     def get_pool_status(self) -> Dict[str, Any]:
         """Get current pool status and metrics"""
@@ -279,7 +311,8 @@ class DatabaseConnectionPool:
             "configuration": {
                 "min_size": self.min_size,
                 "max_size": self.max_size,
-                "command_timeout": self.command_timeout
+                "command_timeout": self.command_timeout,
+                "statement_cache_size": self.statement_cache_size
             }
         }
     
@@ -293,9 +326,9 @@ class DatabaseConnectionPool:
                 }
             
             # Test connection with simple query
-            start_time = datetime.utcnow()
+            start_time = time.perf_counter()
             result = await self.execute_query("SELECT 1 as test", fetch_type="fetchrow")
-            response_time = (datetime.utcnow() - start_time).total_seconds()
+            response_time = time.perf_counter() - start_time
             
             return {
                 "healthy": True,
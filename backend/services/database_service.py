@@ -1,16 +1,33 @@
 import os
+import copy
 import json
+import asyncio
+import weakref
 import hashlib
 import uuid
-from typing import List, Optional, Dict, Any
+from functools import lru_cache
+from typing import List, Optional, Dict, Any, Tuple
 from datetime import datetime
+import httpx
+from cachetools import TTLCache
 from supabase import create_client, Client
+from postgrest import AsyncPostgrestClient
+from postgrest.types import ReturnMethod
+from pydantic import TypeAdapter, ValidationError
 from dotenv import load_dotenv
 
+# Encode request bodies with orjson when it is installed
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
 # Load environment variables
 load_dotenv()
-from models.roadmap import Roadmap, RoadmapStatus
-from models.chat import ChatSession, ChatMessage
+from models.roadmap import Roadmap, RoadmapStatus, RoadmapResponse
+from services.connection_pool import get_connection_pool, DatabaseConnectionPool
+from models.chat import ChatSession, ChatSessionSummary, ChatMessage
 from models.agent import (
     AgentRequest, AgentResponse, AgentWorkflow, AgentMessage, 
     AgentStatus, AgentCollaboration
@@ -19,15 +36,116 @@ import logging
 
 logger = logging.getLogger(__name__)
 
-# Performance logging for database operations
-db_performance_logger = logging.getLogger("database.performance")
-db_performance_handler = logging.StreamHandler()
-db_performance_formatter = logging.Formatter(
-    '%(asctime)s - DB_PERFORMANCE - %(levelname)s - %(message)s'
+# Validates a whole result set in one pass through pydantic's core
+_ROADMAP_LIST_ADAPTER = TypeAdapter(List[Roadmap])
+_CHAT_SESSION_LIST_ADAPTER = TypeAdapter(List[ChatSession])
+_ROADMAP_SUMMARY_LIST_ADAPTER = TypeAdapter(List[RoadmapResponse])
+_CHAT_SESSION_SUMMARY_LIST_ADAPTER = TypeAdapter(List[ChatSessionSummary])
+_CHAT_MESSAGE_LIST_ADAPTER = TypeAdapter(List[ChatMessage])
+_AGENT_RESPONSE_LIST_ADAPTER = TypeAdapter(List[AgentResponse])
+_AGENT_STATUS_LIST_ADAPTER = TypeAdapter(List[AgentStatus])
+
+# Listing columns; phase_count and message_count are computed columns defined in the schema
+ROADMAP_SUMMARY_COLUMNS = (
+    "id,title,current_role,target_role,status,total_estimated_weeks,phase_count,"
+    "overall_progress_percentage,created_date,updated_date,last_accessed_date"
 )
-db_performance_handler.setFormatter(db_performance_formatter)
-db_performance_logger.addHandler(db_performance_handler)
-db_performance_logger.setLevel(logging.INFO)
+CHAT_SESSION_SUMMARY_COLUMNS = "id,user_id,title,created_at,updated_at,is_active,message_count"
+
+# One keep-alive pool per process, sized for concurrent request handlers
+POSTGREST_LIMITS = httpx.Limits(max_connections=100, max_keepalive_connections=32, keepalive_expiry=30)
+
+class _OrjsonAsyncClient(httpx.AsyncClient):
+    """httpx client that encodes JSON request bodies with orjson instead of the json module"""
+    
+    def build_request(self, method, url, *, content=None, json=None, **kwargs):
+        if json is not None and content is None:
+            # Content-Type is already set in the client's default headers
+            content = orjson.dumps(json)
+            json = None
+        return super().build_request(method, url, content=content, json=json, **kwargs)
+
+class _AsyncPostgrestClient(AsyncPostgrestClient):
+    """AsyncPostgrestClient with a bounded keep-alive pool that serializes payloads with orjson"""
+    
+    def create_session(self, base_url, headers, timeout):
+        session_class = _OrjsonAsyncClient if ORJSON_AVAILABLE else httpx.AsyncClient
+        return session_class(base_url=base_url, headers=headers, timeout=timeout, limits=POSTGREST_LIMITS)
+
+def _validate_rows(adapter: TypeAdapter, rows: List[Dict[str, Any]], table: str) -> list:
+    """Validate a result set in one pass, dropping only the rows pydantic rejects"""
+    try:
+        return adapter.validate_python(rows)
+    except ValidationError as e:
+        # Error locations start with the index of the offending row
+        bad_rows = {error["loc"][0] for error in e.errors() if error["loc"]}
+        logger.error(
+            "Skipping %s malformed %s rows: %s",
+            len(bad_rows), table, [rows[i].get("id", rows[i].get("agent_id")) for i in sorted(bad_rows)]
+        )
+        return adapter.validate_python([row for i, row in enumerate(rows) if i not in bad_rows])
+
+# Result sets at least this large are validated on a worker thread so the event loop stays responsive
+OFFLOAD_VALIDATION_ROWS = 20
+
+async def _validate_rows_off_loop(adapter: TypeAdapter, rows: List[Dict[str, Any]], table: str) -> list:
+    """Validate large result sets in one worker-thread call instead of on the event loop"""
+    if len(rows) < OFFLOAD_VALIDATION_ROWS:
+        return _validate_rows(adapter, rows, table)
+    return await asyncio.to_thread(_validate_rows, adapter, rows, table)
+
+def _returning(query, columns: str = "id"):
+    """Have PostgREST echo back only the given columns of the written rows"""
+    query.params = query.params.add("select", columns)
+    return query
+
+class _DatabaseClients:
+    """Supabase clients and row caches shared by every DatabaseService for one project"""
+    
+    def __init__(self, supabase_url: str, supabase_key: str):
+        # Create Supabase client with service role key for server-side operations
+        self.supabase: Client = create_client(supabase_url, supabase_key)
+        
+        # Async PostgREST client for this service's own queries so they don't block the event loop
+        self.postgrest = _AsyncPostgrestClient(
+            f"{supabase_url}/rest/v1",
+            headers={
+                "Accept": "application/json",
+                "Content-Type": "application/json",
+                "apiKey": supabase_key,
+                "Authorization": f"Bearer {supabase_key}",
+            },
+            timeout=30
+        )
+        
+        # Short-lived caches of rows for hot read-by-key paths, invalidated on write
+        # Keyed by id alone: keying on updated_at would need a lookup per read to learn it
+        self.row_caches: Dict[str, TTLCache] = {
+            name: TTLCache(maxsize=2048, ttl=ROW_CACHE_TTL_SECONDS) for name in ROW_CACHE_NAMES
+        }
+        # (cache name, key) pairs known to be absent, kept briefly to damp lookups of missing ids
+        self.missing_rows: TTLCache = TTLCache(maxsize=10_000, ttl=5)
+        self.load_locks: "weakref.WeakValueDictionary[tuple, asyncio.Lock]" = weakref.WeakValueDictionary()
+        # Bumped after every write so a load that raced it can't cache the old row
+        self.cache_epoch = 0
+
+# Read caches shared by every DatabaseService; resumes are looked up both by owner and by id
+ROW_CACHE_NAMES = ("roadmaps", "chat_sessions", "profiles", "resumes_by_user", "resumes", "agent_requests")
+
+# The caches live in one process and writes only invalidate the worker that made them.
+# Production runs several uvicorn workers per replica, so another worker's write can leave a
+# row here stale for up to this long; keep it to a few seconds to bound that window.
+ROW_CACHE_TTL_SECONDS = 3
+
+# (supabase_url, supabase_key) -> clients reused by every DatabaseService
+_database_clients: Dict[Tuple[str, str], _DatabaseClients] = {}
+
+async def cleanup_database_clients():
+    """Close the shared PostgREST connections"""
+    clients = list(_database_clients.values())
+    _database_clients.clear()
+    for shared in clients:
+        await shared.postgrest.aclose()
 
 class DatabaseService:
     """Service for handling database operations with Supabase"""
@@ -41,19 +159,38 @@ class DatabaseService:
             raise ValueError("SUPABASE_URL and SUPABASE_SERVICE_ROLE_KEY (or SUPABASE_ANON_KEY) must be set in environment variables")
         
         try:
-            # Create Supabase client with service role key for server-side operations
-            self.supabase: Client = create_client(supabase_url, supabase_key)
-            
-            # Initialize performance tracking
-            self.query_count = 0
-            self.total_query_time = 0.0
+            # Services are created per request in some routes, so reuse one set of clients and pools
+            shared = _database_clients.get((supabase_url, supabase_key))
+            if shared is None:
+                shared = _DatabaseClients(supabase_url, supabase_key)
+                _database_clients[(supabase_url, supabase_key)] = shared
+            self._shared = shared
+            self.supabase: Client = shared.supabase
+            self.postgrest = shared.postgrest
+            
+            self._row_caches = shared.row_caches
+            self._missing_rows = shared.missing_rows
+            self._load_locks = shared.load_locks
             
         except Exception as e:
-            logger.error(f"Failed to initialize Supabase client: {str(e)}")
+            logger.error("Failed to initialize Supabase client: %s", e)
             raise
     
-    def _convert_user_id_to_uuid(self, user_id: str) -> str:
+    async def _get_sql_pool(self) -> Optional[DatabaseConnectionPool]:
+        """The shared asyncpg pool when DATABASE_URL is configured, otherwise None"""
+        pool = await get_connection_pool()
+        return pool if pool.pool is not None else None
+    
+    async def _fetch_sql(self, pool: DatabaseConnectionPool, query: str, *args) -> List[Dict[str, Any]]:
+        """Run a read directly against Postgres, returning rows shaped like PostgREST's"""
+        records = await pool.execute_query(query, *args)
+        return [dict(record) for record in records]
+    
+    @staticmethod
+    @lru_cache(maxsize=4096)
+    def _convert_user_id_to_uuid(user_id: str) -> str:
         """Convert string user_id to UUID format if needed"""
+        # Cached because the same few user ids are converted on nearly every query
         # Convert to string first in case it's not a string
         user_id_str = str(user_id) if user_id is not None else ""
         
@@ -68,19 +205,86 @@ class DatabaseService:
                 return str(uuid.UUID(hash_object.hexdigest()))
         return user_id_str
     
-    def _track_query_performance(self, operation: str, query_time: float, success: bool = True):
-        """Track query performance metrics"""
-        self.query_count += 1
-        self.total_query_time += query_time
+    @staticmethod
+    def _copy_row(row):
+        """Callers mutate what they load, so never hand out the cached instance"""
+        return row.model_copy(deep=True) if hasattr(row, "model_copy") else copy.deepcopy(row)
+    
+    async def _cached_load(self, cache_name: str, key: str, loader):
+        """Load a row through a TTL cache, letting only one concurrent miss per key hit the database"""
+        cache = self._row_caches[cache_name]
+        cached = cache.get(key)
+        if cached is not None:
+            return self._copy_row(cached)
+        if (cache_name, key) in self._missing_rows:
+            return None
         
-        # Log performance details
-        db_performance_logger.info(
-            f"Database operation: {operation}, "
-            f"Time: {query_time:.3f}s, "
-            f"Success: {success}, "
-            f"Total queries: {self.query_count}, "
-            f"Avg time: {self.total_query_time / self.query_count:.3f}s"
-        )
+        lock = self._load_locks.get((cache_name, key))
+        if lock is None:
+            lock = asyncio.Lock()
+            self._load_locks[(cache_name, key)] = lock
+        
+        async with lock:
+            cached = cache.get(key)
+            if cached is not None:
+                return self._copy_row(cached)
+            if (cache_name, key) in self._missing_rows:
+                return None
+            
+            epoch = self._shared.cache_epoch
+            result = await loader(key)
+            if epoch != self._shared.cache_epoch:
+                return result
+            if result is None:
+                self._missing_rows[(cache_name, key)] = True
+                return None
+            cache[key] = result
+            return self._copy_row(result)
+    
+    async def _cached_load_many(self, cache_name: str, keys: List[str], fetch_many) -> Dict[str, Any]:
+        """Load several rows through the TTL cache, fetching every miss in one query"""
+        cache = self._row_caches[cache_name]
+        found: Dict[str, Any] = {}
+        misses = []
+        for key in dict.fromkeys(keys):
+            cached = cache.get(key)
+            if cached is not None:
+                found[key] = self._copy_row(cached)
+            elif (cache_name, key) not in self._missing_rows:
+                misses.append(key)
+        
+        if misses:
+            epoch = self._shared.cache_epoch
+            fetched = await fetch_many(misses)
+            cacheable = epoch == self._shared.cache_epoch
+            for key in misses:
+                row = fetched.get(key)
+                if row is None:
+                    if cacheable:
+                        self._missing_rows[(cache_name, key)] = True
+                    continue
+                if cacheable:
+                    cache[key] = row
+                    row = self._copy_row(row)
+                found[key] = row
+        
+        return found
+    
+    def _invalidate_cached(self, cache_name: str, *keys: str):
+        """Drop cached rows once a write has gone through"""
+        self._shared.cache_epoch += 1
+        cache = self._row_caches[cache_name]
+        for key in keys:
+            cache.pop(key, None)
+            self._missing_rows.pop((cache_name, key), None)
+    
+    def _invalidate_resumes(self):
+        """Drop every cached resume; status updates only know the resume id, not its owner"""
+        self._shared.cache_epoch += 1
+        self._row_caches["resumes"].clear()
+        self._row_caches["resumes_by_user"].clear()
+        for key in [key for key in self._missing_rows if key[0] in ("resumes", "resumes_by_user")]:
+            self._missing_rows.pop(key, None)
     
     # Roadmap operations
     async def save_roadmap(self, roadmap: Roadmap) -> str:
@@ -89,62 +293,73 @@ class DatabaseService:
             # Convert string user_id to UUID format if needed
             user_id = self._convert_user_id_to_uuid(roadmap.user_id)
             
-            # Convert roadmap to database format
-            roadmap_data = {
-                "user_id": user_id,
-                "title": roadmap.title,
-                "description": roadmap.description,
-                "current_role": roadmap.current_role,
-                "target_role": roadmap.target_role,
-                "status": roadmap.status.value,
-                "phases": [phase.model_dump() for phase in roadmap.phases],
-                "total_estimated_weeks": roadmap.total_estimated_weeks,
-                "overall_progress_percentage": float(roadmap.overall_progress_percentage),
-                "current_phase": roadmap.current_phase,
-                "generated_with_model": roadmap.generated_with_model,
-                "generation_prompt": roadmap.generation_prompt,
-                "user_context_used": roadmap.user_context_used or {},
-                "created_date": roadmap.created_date.isoformat(),
-                "updated_date": datetime.utcnow().isoformat(),
-                "last_accessed_date": datetime.utcnow().isoformat()
-            }
+            # Convert roadmap to database format in one serializer pass (phases, enums, datetimes)
+            # updated_date and last_accessed_date are left to the column defaults and the BEFORE UPDATE trigger
+            roadmap_data = roadmap.model_dump(mode="json", exclude={"id", "updated_date", "last_accessed_date"})
+            roadmap_data["user_id"] = user_id
+            roadmap_data["user_context_used"] = roadmap_data["user_context_used"] or {}
             
             if roadmap.id:
-                # Update existing roadmap
-                result = self.supabase.table("roadmaps").update(roadmap_data).eq("id", roadmap.id).execute()
-                # For updates, we just need to check if the operation completed without error
-                # Supabase UPDATE operations don't return data by default, but a successful
-                # execution without exception means the update was successful
-                logger.info(f"Updated roadmap {roadmap.id}")
+                # Insert or update in one round trip
+                roadmap_data["id"] = roadmap.id
+                result = await self.postgrest.table("roadmaps").upsert(roadmap_data, on_conflict="id", returning=ReturnMethod.minimal).execute()
+                self._invalidate_cached("roadmaps", roadmap.id)
+                logger.debug("Saved roadmap %s", roadmap.id)
                 return roadmap.id
             else:
                 # Create new roadmap
-                result = self.supabase.table("roadmaps").insert(roadmap_data).execute()
+                result = await _returning(self.postgrest.table("roadmaps").insert(roadmap_data)).execute()
                 if result.data and len(result.data) > 0:
                     roadmap_id = result.data[0]["id"]
-                    logger.info(f"Created new roadmap {roadmap_id}")
+                    logger.debug("Created new roadmap %s", roadmap_id)
                     return roadmap_id
                 else:
-                    logger.error(f"Insert failed - no data returned. Result: {result}")
+                    logger.error("Insert failed - no data returned. Result: %s", result)
                     raise Exception(f"Failed to create roadmap - no data returned")
             
         except Exception as e:
-            logger.error(f"Error saving roadmap: {str(e)}")
+            logger.error("Error saving roadmap: %s", e)
             raise
     
     async def load_roadmap(self, roadmap_id: str) -> Optional[Roadmap]:
         """Load a roadmap by ID"""
+        return await self._cached_load("roadmaps", roadmap_id, self._fetch_roadmap)
+    
+    async def _fetch_roadmap(self, roadmap_id: str) -> Optional[Roadmap]:
+        """Fetch and validate a roadmap row"""
         try:
-            result = self.supabase.table("roadmaps").select("*").eq("id", roadmap_id).execute()
+            pool = await self._get_sql_pool()
+            if pool is not None:
+                rows = await self._fetch_sql(pool, "SELECT * FROM roadmaps WHERE id = $1", roadmap_id)
+            else:
+                rows = (await self.postgrest.table("roadmaps").select("*").eq("id", roadmap_id).execute()).data
             
-            if result.data:
-                data = result.data[0]
-                return self._convert_db_to_roadmap(data)
+            if rows:
+                return Roadmap.model_validate(rows[0])
             
             return None
             
         except Exception as e:
-            logger.error(f"Error loading roadmap {roadmap_id}: {str(e)}")
+            logger.error("Error loading roadmap %s: %s", roadmap_id, e)
+            raise
+    
+    async def load_roadmaps_bulk(self, roadmap_ids: List[str]) -> Dict[str, Roadmap]:
+        """Load several roadmaps by ID, keyed by ID; missing roadmaps are left out"""
+        return await self._cached_load_many("roadmaps", roadmap_ids, self._fetch_roadmaps)
+    
+    async def _fetch_roadmaps(self, roadmap_ids: List[str]) -> Dict[str, Roadmap]:
+        """Fetch and validate several roadmap rows in one query"""
+        try:
+            pool = await self._get_sql_pool()
+            if pool is not None:
+                rows = await self._fetch_sql(pool, "SELECT * FROM roadmaps WHERE id = ANY($1::uuid[])", roadmap_ids)
+            else:
+                rows = (await self.postgrest.table("roadmaps").select("*").in_("id", roadmap_ids).execute()).data
+            
+            return {roadmap.id: roadmap for roadmap in _validate_rows(_ROADMAP_LIST_ADAPTER, rows, "roadmaps")}
+            
+        except Exception as e:
+            logger.error("Error loading %s roadmaps: %s", len(roadmap_ids), e)
             raise
     
     async def load_user_roadmaps(self, user_id: str) -> List[Roadmap]:
@@ -153,28 +368,54 @@ class DatabaseService:
             # Convert string user_id to UUID format if needed
             converted_user_id = self._convert_user_id_to_uuid(user_id)
             
-            result = self.supabase.table("roadmaps").select("*").eq("user_id", converted_user_id).order("updated_date", desc=True).execute()
+            pool = await self._get_sql_pool()
+            if pool is not None:
+                rows = await self._fetch_sql(
+                    pool, "SELECT * FROM roadmaps WHERE user_id = $1 ORDER BY updated_date DESC", converted_user_id
+                )
+            else:
+                rows = (await self.postgrest.table("roadmaps").select("*").eq("user_id", converted_user_id).order("updated_date", desc=True).execute()).data
             
-            roadmaps = []
-            if result.data:
-                for data in result.data:
-                    roadmap = self._convert_db_to_roadmap(data)
-                    if roadmap:
-                        roadmaps.append(roadmap)
+            if not rows:
+                return []
+            
+            return await _validate_rows_off_loop(_ROADMAP_LIST_ADAPTER, rows, "roadmaps")
+            
+        except Exception as e:
+            logger.error("Error loading roadmaps for user %s: %s", user_id, e)
+            raise
+    
+    async def load_user_roadmap_summaries(self, user_id: str) -> List[RoadmapResponse]:
+        """Load a user's roadmap listing without the phases"""
+        try:
+            converted_user_id = self._convert_user_id_to_uuid(user_id)
+            
+            pool = await self._get_sql_pool()
+            if pool is not None:
+                rows = await self._fetch_sql(
+                    pool,
+                    'SELECT id, title, "current_role", "target_role", status, total_estimated_weeks, '
+                    'phase_count(r) AS phase_count, overall_progress_percentage, created_date, updated_date, '
+                    'last_accessed_date FROM roadmaps AS r WHERE user_id = $1 ORDER BY updated_date DESC',
+                    converted_user_id
+                )
+            else:
+                rows = (await self.postgrest.table("roadmaps").select(ROADMAP_SUMMARY_COLUMNS).eq("user_id", converted_user_id).order("updated_date", desc=True).execute()).data
+            
+            if not rows:
+                return []
             
-            return roadmaps
+            return _validate_rows(_ROADMAP_SUMMARY_LIST_ADAPTER, rows, "roadmaps")
             
         except Exception as e:
-            logger.error(f"Error loading roadmaps for user {user_id}: {str(e)}")
+            logger.error("Error loading roadmap summaries for user %s: %s", user_id, e)
             raise
     
     async def update_roadmap_progress(self, roadmap_id: str, progress_data: Dict[str, Any]) -> bool:
         """Update roadmap progress"""
         try:
-            update_data = {
-                "updated_date": datetime.utcnow().isoformat(),
-                "last_accessed_date": datetime.utcnow().isoformat()
-            }
+            # updated_date and last_accessed_date are set by the roadmaps trigger
+            update_data = {}
             
             if "overall_progress_percentage" in progress_data:
                 update_data["overall_progress_percentage"] = float(progress_data["overall_progress_percentage"])
@@ -185,7 +426,11 @@ class DatabaseService:
             if "phases" in progress_data:
                 update_data["phases"] = progress_data["phases"]
             
-            result = self.supabase.table("roadmaps").update(update_data).eq("id", roadmap_id).execute()
+            if not update_data:
+                return True
+            
+            result = await self.postgrest.table("roadmaps").update(update_data, returning=ReturnMethod.minimal).eq("id", roadmap_id).execute()
+            self._invalidate_cached("roadmaps", roadmap_id)
             
             # For updates, we just need to check if the operation completed without error
             # Supabase UPDATE operations don't return data by default, but a successful
@@ -193,71 +438,163 @@ class DatabaseService:
             return True
             
         except Exception as e:
-            logger.error(f"Error updating roadmap progress {roadmap_id}: {str(e)}")
+            logger.error("Error updating roadmap progress %s: %s", roadmap_id, e)
+            raise
+    
+    async def update_phase_progress(
+        self, roadmap_id: str, idx: int, patch: Dict[str, Any], overall_progress: Optional[float] = None
+    ) -> bool:
+        """Merge a progress patch into a single roadmap phase, optionally setting the overall progress"""
+        if idx < 0:
+            return False
+        try:
+            # The JSONB merge runs server-side, so only the patch crosses the wire
+            pool = await self._get_sql_pool()
+            if pool is not None:
+                rows = await self._fetch_sql(
+                    pool,
+                    "SELECT update_phase_progress($1::uuid, $2, $3::jsonb, $4) AS updated",
+                    roadmap_id, idx, patch, overall_progress
+                )
+                updated = bool(rows and rows[0]["updated"])
+            else:
+                result = await self.postgrest.rpc(
+                    "update_phase_progress",
+                    {"r": roadmap_id, "idx": idx, "patch": patch, "overall_progress": overall_progress}
+                ).execute()
+                updated = bool(result.data)
+            self._invalidate_cached("roadmaps", roadmap_id)
+            return updated
+            
+        except Exception as e:
+            logger.error("Error updating phase %s progress for roadmap %s: %s", idx, roadmap_id, e)
             raise
     
     async def delete_roadmap(self, roadmap_id: str) -> bool:
         """Delete a roadmap"""
         try:
-            result = self.supabase.table("roadmaps").delete().eq("id", roadmap_id).execute()
+            result = await _returning(self.postgrest.table("roadmaps").delete().eq("id", roadmap_id)).execute()
+            self._invalidate_cached("roadmaps", roadmap_id)
             return bool(result.data)
             
         except Exception as e:
-            logger.error(f"Error deleting roadmap {roadmap_id}: {str(e)}")
+            logger.error("Error deleting roadmap %s: %s", roadmap_id, e)
             raise
     
     # Chat session operations
     async def save_chat_session(self, chat_session: ChatSession) -> str:
         """Save a chat session to the database"""
         try:
-            # Convert string user_id to UUID format if needed
-            user_id = self._convert_user_id_to_uuid(chat_session.user_id)
-            
             # Convert chat session to database format
-            session_data = {
-                "user_id": user_id,
-                "title": chat_session.title,
-                "messages": [msg.model_dump() for msg in chat_session.messages],
-                "context_version": chat_session.context_version,
-                "created_at": chat_session.created_at.isoformat(),
-                "updated_at": datetime.utcnow().isoformat(),
-                "is_active": chat_session.is_active,
-                "metadata": chat_session.metadata
-            }
+            session_data = self._chat_session_to_db(chat_session)
             
-            if chat_session.id and await self._chat_session_exists(chat_session.id):
-                # Update existing session
-                result = self.supabase.table("chat_sessions").update(session_data).eq("id", chat_session.id).execute()
-                if result.data:
-                    logger.info(f"Updated chat session {chat_session.id}")
-                    return chat_session.id
+            if chat_session.id:
+                # Insert or update in one round trip
+                session_data["id"] = chat_session.id
+                result = await _returning(self.postgrest.table("chat_sessions").upsert(session_data, on_conflict="id")).execute()
+                self._invalidate_cached("chat_sessions", chat_session.id)
             else:
                 # Create new session
-                result = self.supabase.table("chat_sessions").insert(session_data).execute()
-                if result.data:
-                    session_id = result.data[0]["id"]
-                    logger.info(f"Created new chat session {session_id}")
-                    return session_id
+                result = await _returning(self.postgrest.table("chat_sessions").insert(session_data)).execute()
+            
+            if result.data:
+                session_id = result.data[0]["id"]
+                logger.debug("Saved chat session %s", session_id)
+                return session_id
             
             raise Exception("Failed to save chat session")
             
         except Exception as e:
-            logger.error(f"Error saving chat session: {str(e)}")
+            logger.error("Error saving chat session: %s", e)
+            raise
+    
+    async def save_chat_sessions_batch(self, chat_sessions: List[ChatSession]) -> List[str]:
+        """Save several chat sessions in a single upsert"""
+        if not chat_sessions:
+            return []
+        
+        try:
+            rows = []
+            for chat_session in chat_sessions:
+                session_data = self._chat_session_to_db(chat_session)
+                session_data["id"] = chat_session.id
+                rows.append(session_data)
+            
+            result = await _returning(self.postgrest.table("chat_sessions").upsert(rows, on_conflict="id")).execute()
+            self._invalidate_cached("chat_sessions", *(row["id"] for row in rows))
+            
+            session_ids = [row["id"] for row in result.data] if result.data else []
+            logger.debug("Saved %s chat sessions in batch", len(session_ids))
+            return session_ids
+            
+        except Exception as e:
+            logger.error("Error saving chat sessions batch: %s", e)
+            raise
+    
+    async def append_chat_messages_batch(self, appends: Dict[str, List[ChatMessage]]) -> List[str]:
+        """Append new messages to several chat sessions without rewriting their history"""
+        if not appends:
+            return []
+        
+        try:
+            batch = [
+                {"id": session_id, "messages": [msg.model_dump(mode="json") for msg in messages]}
+                for session_id, messages in appends.items()
+            ]
+            
+            pool = await self._get_sql_pool()
+            if pool is not None:
+                # Same server-side JSONB append, without the PostgREST hop
+                rows = await self._fetch_sql(pool, "SELECT id FROM append_chat_messages($1::jsonb)", batch)
+            else:
+                rows = (await self.postgrest.rpc("append_chat_messages", {"p_batch": batch}).execute()).data
+            self._invalidate_cached("chat_sessions", *appends)
+            
+            session_ids = [row["id"] for row in rows] if rows else []
+            logger.debug("Appended messages to %s chat sessions", len(session_ids))
+            return session_ids
+            
+        except Exception as e:
+            logger.error("Error appending chat messages: %s", e)
             raise
     
     async def load_chat_session(self, session_id: str) -> Optional[ChatSession]:
         """Load a chat session by ID"""
+        return await self._cached_load("chat_sessions", session_id, self._fetch_chat_session)
+    
+    async def _fetch_chat_session(self, session_id: str) -> Optional[ChatSession]:
+        """Fetch and validate a chat session row"""
         try:
-            result = self.supabase.table("chat_sessions").select("*").eq("id", session_id).execute()
+            pool = await self._get_sql_pool()
+            if pool is not None:
+                rows = await self._fetch_sql(pool, "SELECT * FROM chat_sessions WHERE id = $1", session_id)
+            else:
+                rows = (await self.postgrest.table("chat_sessions").select("*").eq("id", session_id).execute()).data
             
-            if result.data:
-                data = result.data[0]
-                return self._convert_db_to_chat_session(data)
+            if rows:
+                return ChatSession.model_validate(rows[0])
             
             return None
             
         except Exception as e:
-            logger.error(f"Error loading chat session {session_id}: {str(e)}")
+            logger.error("Error loading chat session %s: %s", session_id, e)
+            raise
+    
+    async def load_chat_messages(self, session_id: str, limit: int = 50, offset: int = 0) -> Optional[List[ChatMessage]]:
+        """Load a page of a chat session's messages, counting offset back from the newest"""
+        try:
+            result = await self.postgrest.rpc(
+                "chat_session_messages",
+                {"p_session_id": session_id, "p_limit": limit, "p_offset": offset}
+            ).execute()
+            
+            if result.data is None:
+                return None
+            
+            return _CHAT_MESSAGE_LIST_ADAPTER.validate_python(result.data)
+            
+        except Exception as e:
+            logger.error("Error loading messages for chat session %s: %s", session_id, e)
             raise
     
     async def load_user_chat_sessions(self, user_id: str, active_only: bool = True) -> List[ChatSession]:
@@ -266,141 +603,114 @@ class DatabaseService:
             # Convert string user_id to UUID format if needed
             converted_user_id = self._convert_user_id_to_uuid(user_id)
             
-            query = self.supabase.table("chat_sessions").select("*").eq("user_id", converted_user_id)
+            pool = await self._get_sql_pool()
+            if pool is not None:
+                active_filter = " AND is_active" if active_only else ""
+                rows = await self._fetch_sql(
+                    pool,
+                    f"SELECT * FROM chat_sessions WHERE user_id = $1{active_filter} ORDER BY updated_at DESC",
+                    converted_user_id
+                )
+            else:
+                query = self.postgrest.table("chat_sessions").select("*").eq("user_id", converted_user_id)
+                
+                if active_only:
+                    query = query.eq("is_active", True)
+                
+                rows = (await query.order("updated_at", desc=True).execute()).data
             
-            if active_only:
-                query = query.eq("is_active", True)
+            if not rows:
+                return []
             
-            result = query.order("updated_at", desc=True).execute()
+            return await _validate_rows_off_loop(_CHAT_SESSION_LIST_ADAPTER, rows, "chat_sessions")
             
-            sessions = []
-            if result.data:
-                for data in result.data:
-                    session = self._convert_db_to_chat_session(data)
-                    if session:
-                        sessions.append(session)
+        except Exception as e:
+            logger.error("Error loading chat sessions for user %s: %s", user_id, e)
+            raise
+    
+    async def load_user_chat_session_summaries(self, user_id: str, active_only: bool = True) -> List[ChatSessionSummary]:
+        """Load a user's chat session listing without the message history"""
+        try:
+            converted_user_id = self._convert_user_id_to_uuid(user_id)
+            
+            pool = await self._get_sql_pool()
+            if pool is not None:
+                active_filter = " AND is_active" if active_only else ""
+                rows = await self._fetch_sql(
+                    pool,
+                    "SELECT id, user_id, title, created_at, updated_at, is_active, message_count(c) AS message_count "
+                    f"FROM chat_sessions AS c WHERE user_id = $1{active_filter} ORDER BY updated_at DESC",
+                    converted_user_id
+                )
+            else:
+                query = self.postgrest.table("chat_sessions").select(CHAT_SESSION_SUMMARY_COLUMNS).eq("user_id", converted_user_id)
+                
+                if active_only:
+                    query = query.eq("is_active", True)
+                
+                rows = (await query.order("updated_at", desc=True).execute()).data
             
-            return sessions
+            if not rows:
+                return []
+            
+            return _validate_rows(_CHAT_SESSION_SUMMARY_LIST_ADAPTER, rows, "chat_sessions")
             
         except Exception as e:
-            logger.error(f"Error loading chat sessions for user {user_id}: {str(e)}")
+            logger.error("Error loading chat session summaries for user %s: %s", user_id, e)
             raise
     
+    async def load_user_dashboard(self, user_id: str) -> Tuple[List[Roadmap], List[ChatSession]]:
+        """Load a user's roadmaps and active chat sessions concurrently"""
+        # No foreign key links the two tables, so overlap the two requests instead of embedding
+        roadmaps, chat_sessions = await asyncio.gather(
+            self.load_user_roadmaps(user_id),
+            self.load_user_chat_sessions(user_id)
+        )
+        return roadmaps, chat_sessions
+    
     async def add_message_to_session(self, session_id: str, message: ChatMessage) -> bool:
         """Add a message to an existing chat session"""
         try:
-            # First load the current session
-            session = await self.load_chat_session(session_id)
-            if not session:
-                return False
-            
-            # Add the new message
-            session.messages.append(message)
-            session.updated_at = datetime.utcnow()
-            
-            # Save the updated session
-            await self.save_chat_session(session)
-            return True
+            # Append server-side instead of loading and rewriting the whole history
+            appended = await self.append_chat_messages_batch({session_id: [message]})
+            return session_id in appended
             
         except Exception as e:
-            logger.error(f"Error adding message to session {session_id}: {str(e)}")
+            logger.error("Error adding message to session %s: %s", session_id, e)
             raise
     
     async def deactivate_chat_session(self, session_id: str) -> bool:
         """Deactivate a chat session"""
         try:
-            result = self.supabase.table("chat_sessions").update({
-                "is_active": False,
-                "updated_at": datetime.utcnow().isoformat()
-            }).eq("id", session_id).execute()
+            result = await _returning(self.postgrest.table("chat_sessions").update({
+                "is_active": False
+            }).eq("id", session_id)).execute()
+            self._invalidate_cached("chat_sessions", session_id)
             
             return bool(result.data)
             
         except Exception as e:
-            logger.error(f"Error deactivating chat session {session_id}: {str(e)}")
+            logger.error("Error deactivating chat session %s: %s", session_id, e)
             raise
     
     # Helper methods
-    def _convert_db_to_roadmap(self, data: Dict[str, Any]) -> Optional[Roadmap]:
-        """Convert database row to Roadmap model"""
-        try:
-            from models.roadmap import RoadmapPhase, Skill, LearningResource, Milestone
-            
-            # Convert phases from JSON to Pydantic models
-            phases = []
-            for phase_data in data.get("phases", []):
-                # Convert nested objects
-                skills = [Skill(**skill) for skill in phase_data.get("skills_to_develop", [])]
-                resources = [LearningResource(**resource) for resource in phase_data.get("learning_resources", [])]
-                milestones = [Milestone(**milestone) for milestone in phase_data.get("milestones", [])]
-                
-                phase_data["skills_to_develop"] = skills
-                phase_data["learning_resources"] = resources
-                phase_data["milestones"] = milestones
-                
-                phases.append(RoadmapPhase(**phase_data))
-            
-            return Roadmap(
-                id=data["id"],
-                user_id=data["user_id"],
-                title=data["title"],
-                description=data.get("description"),
-                current_role=data["current_role"],
-                target_role=data["target_role"],
-                status=RoadmapStatus(data["status"]),
-                phases=phases,
-                total_estimated_weeks=data["total_estimated_weeks"],
-                overall_progress_percentage=float(data["overall_progress_percentage"]),
-                current_phase=data.get("current_phase"),
-                generated_with_model=data.get("generated_with_model"),
-                generation_prompt=data.get("generation_prompt"),
-                user_context_used=data.get("user_context_used", {}),
-                created_date=datetime.fromisoformat(data["created_date"].replace("Z", "+00:00")),
-                updated_date=datetime.fromisoformat(data["updated_date"].replace("Z", "+00:00")),
-                last_accessed_date=datetime.fromisoformat(data["last_accessed_date"].replace("Z", "+00:00")) if data.get("last_accessed_date") else None
-            )
-            
-        except Exception as e:
-            logger.error(f"Error converting database row to roadmap: {str(e)}")
-            return None
+    def _chat_session_to_db(self, chat_session: ChatSession) -> Dict[str, Any]:
+        """Convert ChatSession model to database row format (without id)"""
+        # One pass through pydantic's serializer covers messages, datetimes and enums
+        # updated_at is left to the column default and the BEFORE UPDATE trigger
+        session_data = chat_session.model_dump(mode="json", exclude={"id", "updated_at"})
+        # Convert string user_id to UUID format if needed
+        session_data["user_id"] = self._convert_user_id_to_uuid(chat_session.user_id)
+        return session_data
     
-    def _convert_db_to_chat_session(self, data: Dict[str, Any]) -> Optional[ChatSession]:
-        """Convert database row to ChatSession model"""
-        try:
-            # Convert messages from JSON to ChatMessage models
-            messages = []
-            for msg_data in data.get("messages", []):
-                messages.append(ChatMessage(**msg_data))
-            
-            return ChatSession(
-                id=data["id"],
-                user_id=data["user_id"],
-                title=data.get("title"),
-                messages=messages,
-                context_version=data["context_version"],
-                created_at=datetime.fromisoformat(data["created_at"].replace("Z", "+00:00")),
-                updated_at=datetime.fromisoformat(data["updated_at"].replace("Z", "+00:00")),
-                is_active=data["is_active"],
-                metadata=data.get("metadata", {})
-            )
-            
-        except Exception as e:
-            logger.error(f"Error converting database row to chat session: {str(e)}")
-            return None
-    
-    async def _chat_session_exists(self, session_id: str) -> bool:
-        """Check if a chat session exists"""
-        try:
-            result = self.supabase.table("chat_sessions").select("id").eq("id", session_id).execute()
-            return bool(result.data)
-        except:
-            return False
-    
-    # Profile operations
     async def get_profile(self, user_id: str) -> Optional[Dict[str, Any]]:
         """Get user profile by user ID"""
+        return await self._cached_load("profiles", user_id, self._fetch_profile)
+    
+    async def _fetch_profile(self, user_id: str) -> Optional[Dict[str, Any]]:
+        """Fetch a profile row"""
         try:
-            result = self.supabase.table("profiles").select("*").eq("user_id", user_id).execute()
+            result = await self.postgrest.table("profiles").select("*").eq("user_id", user_id).execute()
             
             if result.data:
                 return result.data[0]
@@ -408,66 +718,76 @@ class DatabaseService:
             return None
             
         except Exception as e:
-            logger.error(f"Error getting profile for user {user_id}: {str(e)}")
+            logger.error("Error getting profile for user %s: %s", user_id, e)
+            raise
+    
+    async def get_profiles_bulk(self, user_ids: List[str]) -> Dict[str, Dict[str, Any]]:
+        """Get several user profiles, keyed by user ID; users without a profile are left out"""
+        return await self._cached_load_many("profiles", user_ids, self._fetch_profiles)
+    
+    async def _fetch_profiles(self, user_ids: List[str]) -> Dict[str, Dict[str, Any]]:
+        """Fetch several profile rows in one request"""
+        try:
+            result = await self.postgrest.table("profiles").select("*").in_("user_id", user_ids).execute()
+            return {row["user_id"]: row for row in result.data}
+            
+        except Exception as e:
+            logger.error("Error getting profiles for %s users: %s", len(user_ids), e)
             raise
     
     async def create_profile(self, user_id: str, profile_data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
         """Create a new user profile"""
         try:
-            # Add user_id and timestamps
+            # Timestamps come from the column defaults
             insert_data = {
                 "user_id": user_id,
-                **profile_data,
-                "created_at": datetime.utcnow().isoformat(),
-                "updated_at": datetime.utcnow().isoformat()
+                **profile_data
             }
             
-            result = self.supabase.table("profiles").insert(insert_data).execute()
+            result = await self.postgrest.table("profiles").insert(insert_data).execute()
+            self._invalidate_cached("profiles", user_id)
             
             if result.data:
-                logger.info(f"Created profile for user {user_id}")
+                logger.debug("Created profile for user %s", user_id)
                 return result.data[0]
             
             return None
             
         except Exception as e:
-            logger.error(f"Error creating profile for user {user_id}: {str(e)}")
+            logger.error("Error creating profile for user %s: %s", user_id, e)
             raise
     
     async def update_profile(self, user_id: str, profile_data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
         """Update user profile"""
         try:
-            # Add updated timestamp
-            update_data = {
-                **profile_data,
-                "updated_at": datetime.utcnow().isoformat()
-            }
-            
-            result = self.supabase.table("profiles").update(update_data).eq("user_id", user_id).execute()
+            # updated_at is set by the profiles trigger
+            result = await self.postgrest.table("profiles").update(profile_data).eq("user_id", user_id).execute()
+            self._invalidate_cached("profiles", user_id)
             
             if result.data:
-                logger.info(f"Updated profile for user {user_id}")
+                logger.debug("Updated profile for user %s", user_id)
                 return result.data[0]
             
             return None
             
         except Exception as e:
-            logger.error(f"Error updating profile for user {user_id}: {str(e)}")
+            logger.error("Error updating profile for user %s: %s", user_id, e)
             raise
     
     async def delete_profile(self, user_id: str) -> bool:
         """Delete user profile"""
         try:
-            result = self.supabase.table("profiles").delete().eq("user_id", user_id).execute()
+            result = await _returning(self.postgrest.table("profiles").delete().eq("user_id", user_id)).execute()
+            self._invalidate_cached("profiles", user_id)
             
             if result.data:
-                logger.info(f"Deleted profile for user {user_id}")
+                logger.debug("Deleted profile for user %s", user_id)
                 return True
             
             return False
             
         except Exception as e:
-            logger.error(f"Error deleting profile for user {user_id}: {str(e)}")
+            logger.error("Error deleting profile for user %s: %s", user_id, e)
             raise
     
     # Resume operations
@@ -478,6 +798,7 @@ class DatabaseService:
             user_id = self._convert_user_id_to_uuid(resume_data["user_id"])
             
             # Prepare resume data for database
+            now = datetime.utcnow().isoformat()
             db_data = {
                 "id": resume_data.get("id", str(uuid.uuid4())),
                 "user_id": user_id,
@@ -489,28 +810,33 @@ class DatabaseService:
                 "text_chunks": resume_data.get("text_chunks", []),
                 "processing_status": resume_data.get("processing_status", "completed"),
                 "error_message": resume_data.get("error_message"),
-                "upload_date": resume_data.get("upload_date", datetime.utcnow().isoformat()),
-                "processed_date": resume_data.get("processed_date", datetime.utcnow().isoformat())
+                "upload_date": resume_data.get("upload_date", now),
+                "processed_date": resume_data.get("processed_date", now)
             }
             
             # Use upsert to handle updates to existing resumes
-            result = self.supabase.table("resumes").upsert(db_data, on_conflict="user_id").execute()
+            result = await _returning(self.postgrest.table("resumes").upsert(db_data, on_conflict="user_id")).execute()
+            self._invalidate_resumes()
             
             if result.data:
                 resume_id = result.data[0]["id"]
-                logger.info(f"Saved resume {resume_id} for user {user_id}")
+                logger.debug("Saved resume %s for user %s", resume_id, user_id)
                 return resume_id
             
             raise Exception("No data returned from resume save operation")
             
         except Exception as e:
-            logger.error(f"Error saving resume: {str(e)}")
+            logger.error("Error saving resume: %s", e)
             raise
     
     async def get_user_resume(self, user_id: str) -> Optional[Dict[str, Any]]:
         """Get user's resume by user ID"""
+        return await self._cached_load("resumes_by_user", user_id, self._fetch_user_resume)
+    
+    async def _fetch_user_resume(self, user_id: str) -> Optional[Dict[str, Any]]:
+        """Fetch a user's resume row"""
         try:
-            result = self.supabase.table("resumes").select("*").eq("user_id", user_id).execute()
+            result = await self.postgrest.table("resumes").select("*").eq("user_id", user_id).execute()
             
             if result.data:
                 return result.data[0]
@@ -518,13 +844,17 @@ class DatabaseService:
             return None
             
         except Exception as e:
-            logger.error(f"Error getting resume for user {user_id}: {str(e)}")
+            logger.error("Error getting resume for user %s: %s", user_id, e)
             raise
     
     async def get_resume_by_id(self, resume_id: str) -> Optional[Dict[str, Any]]:
         """Get resume by resume ID"""
+        return await self._cached_load("resumes", resume_id, self._fetch_resume)
+    
+    async def _fetch_resume(self, resume_id: str) -> Optional[Dict[str, Any]]:
+        """Fetch a resume row by id"""
         try:
-            result = self.supabase.table("resumes").select("*").eq("id", resume_id).execute()
+            result = await self.postgrest.table("resumes").select("*").eq("id", resume_id).execute()
             
             if result.data:
                 return result.data[0]
@@ -532,15 +862,15 @@ class DatabaseService:
             return None
             
         except Exception as e:
-            logger.error(f"Error getting resume {resume_id}: {str(e)}")
+            logger.error("Error getting resume %s: %s", resume_id, e)
             raise
     
     async def update_resume_status(self, resume_id: str, status: str, error_message: Optional[str] = None) -> bool:
         """Update resume processing status"""
         try:
+            # updated_at is set by the resumes trigger
             update_data = {
-                "processing_status": status,
-                "updated_at": datetime.utcnow().isoformat()
+                "processing_status": status
             }
             
             if error_message:
@@ -549,66 +879,63 @@ class DatabaseService:
             if status == "completed":
                 update_data["processed_date"] = datetime.utcnow().isoformat()
             
-            result = self.supabase.table("resumes").update(update_data).eq("id", resume_id).execute()
+            result = await _returning(self.postgrest.table("resumes").update(update_data).eq("id", resume_id)).execute()
+            self._invalidate_resumes()
             
             if result.data:
-                logger.info(f"Updated resume {resume_id} status to {status}")
+                logger.debug("Updated resume %s status to %s", resume_id, status)
                 return True
             
             return False
             
         except Exception as e:
-            logger.error(f"Error updating resume status: {str(e)}")
+            logger.error("Error updating resume status: %s", e)
             raise
     
     async def delete_user_resume(self, user_id: str) -> bool:
         """Delete user's resume"""
         try:
-            result = self.supabase.table("resumes").delete().eq("user_id", user_id).execute()
+            result = await _returning(self.postgrest.table("resumes").delete().eq("user_id", user_id)).execute()
+            self._invalidate_resumes()
             
             if result.data:
-                logger.info(f"Deleted resume for user {user_id}")
+                logger.debug("Deleted resume for user %s", user_id)
                 return True
             
             return False
             
         except Exception as e:
-            logger.error(f"Error deleting resume for user {user_id}: {str(e)}")
+            logger.error("Error deleting resume for user %s: %s", user_id, e)
             raise
     
     # Agent system operations
     async def save_agent_request(self, request: AgentRequest) -> str:
         """Save an agent request to the database"""
         try:
-            request_data = {
-                "id": request.id,
-                "user_id": request.user_id,
-                "request_type": request.request_type.value,
-                "content": request.content,
-                "context": request.context,
-                "priority": request.priority.value,
-                "status": request.status.value,
-                "assigned_agents": request.assigned_agents,
-                "metadata": request.metadata,
-                "created_at": request.created_at.isoformat()
-            }
+            # Enums, datetimes and nested models are converted in one serializer pass
+            request_data = request.model_dump(mode="json")
             
-            result = self.supabase.table("agent_requests").insert(request_data).execute()
+            result = await _returning(self.postgrest.table("agent_requests").insert(request_data)).execute()
+            self._invalidate_cached("agent_requests", request.id)
             
             if result.data:
-                logger.info(f"Saved agent request {request.id}")
+                logger.debug("Saved agent request %s", request.id)
                 return result.data[0]["id"]
             
             raise Exception("No data returned from agent request save operation")
             
         except Exception as e:
-            logger.error(f"Error saving agent request: {str(e)}")
+            logger.error("Error saving agent request: %s", e)
             raise
     
     async def get_agent_request(self, request_id: str) -> Optional[AgentRequest]:
         """Get an agent request by ID"""
+        return await self._cached_load("agent_requests", request_id, self._fetch_agent_request)
+    
+    async def _fetch_agent_request(self, request_id: str) -> Optional[AgentRequest]:
+        """Fetch and validate an agent request row"""
         try:
-            result = self.supabase.table("agent_requests").select("*").eq("id", request_id).execute()
+            result = await self.postgrest.table("agent_requests").select("*").eq("id", request_id).execute()
             
             if result.data:
                 data = result.data[0]
@@ -617,7 +944,7 @@ class DatabaseService:
             return None
             
         except Exception as e:
-            logger.error(f"Error getting agent request {request_id}: {str(e)}")
+            logger.error("Error getting agent request %s: %s", request_id, e)
             raise
     
     async def update_agent_request_status(self, request_id: str, status: str, assigned_agents: Optional[List[str]] = None) -> bool:
@@ -631,98 +958,95 @@ class DatabaseService:
             if assigned_agents is not None:
                 update_data["assigned_agents"] = assigned_agents
             
-            result = self.supabase.table("agent_requests").update(update_data).eq("id", request_id).execute()
+            result = await self.postgrest.table("agent_requests").update(update_data, returning=ReturnMethod.minimal).eq("id", request_id).execute()
+            self._invalidate_cached("agent_requests", request_id)
             
-            logger.info(f"Updated agent request {request_id} status to {status}")
+            logger.debug("Updated agent request %s status to %s", request_id, status)
             return True
             
         except Exception as e:
-            logger.error(f"Error updating agent request status: {str(e)}")
+            logger.error("Error updating agent request status: %s", e)
             raise
     
     async def save_agent_response(self, response: AgentResponse) -> str:
         """Save an agent response to the database"""
         try:
-            response_data = {
-                "id": response.id,
-                "request_id": response.request_id,
-                "agent_id": response.agent_id,
-                "agent_type": response.agent_type.value,
-                "response_content": response.response_content,
-                "confidence_score": response.confidence_score,
-                "processing_time": response.processing_time,
-                "metadata": response.metadata,
-                "created_at": response.created_at.isoformat()
-            }
+            # Enums, datetimes and nested models are converted in one serializer pass
+            response_data = response.model_dump(mode="json")
             
-            result = self.supabase.table("agent_responses").insert(response_data).execute()
+            result = await _returning(self.postgrest.table("agent_responses").insert(response_data)).execute()
             
             if result.data:
-                logger.info(f"Saved agent response {response.id}")
+                logger.debug("Saved agent response %s", response.id)
                 return result.data[0]["id"]
             
             raise Exception("No data returned from agent response save operation")
             
         except Exception as e:
-            logger.error(f"Error saving agent response: {str(e)}")
+            logger.error("Error saving agent response: %s", e)
             raise
     
     async def get_agent_responses(self, request_id: str) -> List[AgentResponse]:
         """Get all agent responses for a request"""
         try:
-            result = self.supabase.table("agent_responses").select("*").eq("request_id", request_id).execute()
+            result = await self.postgrest.table("agent_responses").select("*").eq("request_id", request_id).execute()
             
-            responses = []
-            if result.data:
-                for data in result.data:
-                    response = self._convert_db_to_agent_response(data)
-                    if response:
-                        responses.append(response)
+            if not result.data:
+                return []
+            
+            return _validate_rows(_AGENT_RESPONSE_LIST_ADAPTER, result.data, "agent_responses")
+            
+        except Exception as e:
+            logger.error("Error getting agent responses for request %s: %s", request_id, e)
+            raise
+    
+    async def get_agent_responses_bulk(self, request_ids: List[str]) -> Dict[str, List[AgentResponse]]:
+        """Get agent responses for several requests in one query, bucketed by request ID"""
+        try:
+            request_ids = list(dict.fromkeys(request_ids))
+            responses: Dict[str, List[AgentResponse]] = {request_id: [] for request_id in request_ids}
+            if not request_ids:
+                return responses
+            
+            pool = await self._get_sql_pool()
+            if pool is not None:
+                rows = await self._fetch_sql(
+                    pool, "SELECT * FROM agent_responses WHERE request_id = ANY($1::uuid[])", request_ids
+                )
+            else:
+                rows = (await self.postgrest.table("agent_responses").select("*").in_("request_id", request_ids).execute()).data
+            
+            for response in _validate_rows(_AGENT_RESPONSE_LIST_ADAPTER, rows, "agent_responses"):
+                responses.setdefault(response.request_id, []).append(response)
             
             return responses
             
         except Exception as e:
-            logger.error(f"Error getting agent responses for request {request_id}: {str(e)}")
+            logger.error("Error getting agent responses for %s requests: %s", len(request_ids), e)
             raise
     
     async def save_agent_workflow(self, workflow: AgentWorkflow) -> str:
         """Save an agent workflow to the database"""
         try:
-            workflow_data = {
-                "id": workflow.id,
-                "request_id": workflow.request_id,
-                "orchestrator_id": workflow.orchestrator_id,
-                "participating_agents": workflow.participating_agents,
-                "workflow_steps": [step.model_dump() for step in workflow.workflow_steps],
-                "current_step": workflow.current_step,
-                "status": workflow.status.value,
-                "metadata": workflow.metadata,
-                "created_at": workflow.created_at.isoformat(),
-                "completed_at": workflow.completed_at.isoformat() if workflow.completed_at else None
-            }
+            # Enums, datetimes and nested models are converted in one serializer pass
+            workflow_data = workflow.model_dump(mode="json")
             
-            if await self._workflow_exists(workflow.id):
-                # Update existing workflow
-                result = self.supabase.table("agent_workflows").update(workflow_data).eq("id", workflow.id).execute()
-                logger.info(f"Updated agent workflow {workflow.id}")
-                return workflow.id
-            else:
-                # Create new workflow
-                result = self.supabase.table("agent_workflows").insert(workflow_data).execute()
-                if result.data:
-                    logger.info(f"Saved agent workflow {workflow.id}")
-                    return result.data[0]["id"]
+            # Insert or update in one round trip
+            result = await _returning(self.postgrest.table("agent_workflows").upsert(workflow_data, on_conflict="id")).execute()
+            if result.data:
+                logger.debug("Saved agent workflow %s", workflow.id)
+                return result.data[0]["id"]
             
             raise Exception("No data returned from agent workflow save operation")
             
         except Exception as e:
-            logger.error(f"Error saving agent workflow: {str(e)}")
+            logger.error("Error saving agent workflow: %s", e)
             raise
     
     async def get_agent_workflow(self, workflow_id: str) -> Optional[AgentWorkflow]:
         """Get an agent workflow by ID"""
         try:
-            result = self.supabase.table("agent_workflows").select("*").eq("id", workflow_id).execute()
+            result = await self.postgrest.table("agent_workflows").select("*").eq("id", workflow_id).execute()
             
             if result.data:
                 data = result.data[0]
@@ -731,66 +1055,50 @@ class DatabaseService:
             return None
             
         except Exception as e:
-            logger.error(f"Error getting agent workflow {workflow_id}: {str(e)}")
+            logger.error("Error getting agent workflow %s: %s", workflow_id, e)
             raise
     
     async def save_agent_message(self, message: AgentMessage) -> str:
         """Save an agent message to the database"""
         try:
-            message_data = {
-                "id": message.id,
-                "sender_agent_id": message.sender_agent_id,
-                "recipient_agent_id": message.recipient_agent_id,
-                "message_type": message.message_type.value,
-                "content": message.content,
-                "acknowledged": message.acknowledged,
-                "metadata": message.metadata,
-                "timestamp": message.timestamp.isoformat()
-            }
+            # Enums, datetimes and nested models are converted in one serializer pass
+            message_data = message.model_dump(mode="json")
             
-            result = self.supabase.table("agent_messages").insert(message_data).execute()
+            result = await _returning(self.postgrest.table("agent_messages").insert(message_data)).execute()
             
             if result.data:
-                logger.debug(f"Saved agent message {message.id}")
+                logger.debug("Saved agent message %s", message.id)
                 return result.data[0]["id"]
             
             raise Exception("No data returned from agent message save operation")
             
         except Exception as e:
-            logger.error(f"Error saving agent message: {str(e)}")
+            logger.error("Error saving agent message: %s", e)
             raise
     
     async def update_agent_status(self, status: AgentStatus) -> bool:
         """Update or insert agent status"""
         try:
-            status_data = {
-                "agent_id": status.agent_id,
-                "agent_type": status.agent_type.value,
-                "is_active": status.is_active,
-                "current_load": status.current_load,
-                "max_concurrent_requests": status.max_concurrent_requests,
-                "capabilities": [cap.model_dump() for cap in status.capabilities],
-                "performance_metrics": status.performance_metrics,
-                "last_heartbeat": status.last_heartbeat.isoformat()
-            }
+            # Enums, datetimes and nested models are converted in one serializer pass
+            status_data = status.model_dump(mode="json")
             
             # Use upsert to handle both insert and update
-            result = self.supabase.table("agent_status").upsert(status_data, on_conflict="agent_id").execute()
+            result = await _returning(self.postgrest.table("agent_status").upsert(status_data, on_conflict="agent_id"), "agent_id").execute()
             
             if result.data:
-                logger.debug(f"Updated agent status for {status.agent_id}")
+                logger.debug("Updated agent status for %s", status.agent_id)
                 return True
             
             return False
             
         except Exception as e:
-            logger.error(f"Error updating agent status: {str(e)}")
+            logger.error("Error updating agent status: %s", e)
             raise
     
     async def get_agent_status(self, agent_id: str) -> Optional[AgentStatus]:
         """Get agent status by ID"""
         try:
-            result = self.supabase.table("agent_status").select("*").eq("agent_id", agent_id).execute()
+            result = await self.postgrest.table("agent_status").select("*").eq("agent_id", agent_id).execute()
             
             if result.data:
                 data = result.data[0]
@@ -799,127 +1107,49 @@ class DatabaseService:
             return None
             
         except Exception as e:
-            logger.error(f"Error getting agent status {agent_id}: {str(e)}")
+            logger.error("Error getting agent status %s: %s", agent_id, e)
             raise
     
     async def get_all_agent_statuses(self) -> List[AgentStatus]:
         """Get all agent statuses"""
         try:
-            result = self.supabase.table("agent_status").select("*").execute()
+            result = await self.postgrest.table("agent_status").select("*").execute()
             
-            statuses = []
-            if result.data:
-                for data in result.data:
-                    status = self._convert_db_to_agent_status(data)
-                    if status:
-                        statuses.append(status)
+            if not result.data:
+                return []
             
-            return statuses
+            return _validate_rows(_AGENT_STATUS_LIST_ADAPTER, result.data, "agent_status")
             
         except Exception as e:
-            logger.error(f"Error getting all agent statuses: {str(e)}")
+            logger.error("Error getting all agent statuses: %s", e)
             raise
     
     # Helper methods for agent system
     def _convert_db_to_agent_request(self, data: Dict[str, Any]) -> Optional[AgentRequest]:
         """Convert database row to AgentRequest model"""
         try:
-            from models.agent import RequestType, RequestPriority, RequestStatus
-            
-            return AgentRequest(
-                id=data["id"],
-                user_id=data["user_id"],
-                request_type=RequestType(data["request_type"]),
-                content=data["content"],
-                context=data["context"],
-                priority=RequestPriority(data["priority"]),
-                created_at=datetime.fromisoformat(data["created_at"].replace("Z", "+00:00")),
-                status=RequestStatus(data["status"]),
-                assigned_agents=data["assigned_agents"],
-                metadata=data["metadata"]
-            )
+            return AgentRequest.model_validate(data)
             
         except Exception as e:
-            logger.error(f"Error converting database row to agent request: {str(e)}")
-            return None
-    
-    def _convert_db_to_agent_response(self, data: Dict[str, Any]) -> Optional[AgentResponse]:
-        """Convert database row to AgentResponse model"""
-        try:
-            from models.agent import AgentType
-            
-            return AgentResponse(
-                id=data["id"],
-                request_id=data["request_id"],
-                agent_id=data["agent_id"],
-                agent_type=AgentType(data["agent_type"]),
-                response_content=data["response_content"],
-                confidence_score=data["confidence_score"],
-                processing_time=data["processing_time"],
-                metadata=data["metadata"],
-                created_at=datetime.fromisoformat(data["created_at"].replace("Z", "+00:00"))
-            )
-            
-        except Exception as e:
-            logger.error(f"Error converting database row to agent response: {str(e)}")
+            logger.error("Error converting database row to agent request: %s", e)
             return None
     
     def _convert_db_to_agent_workflow(self, data: Dict[str, Any]) -> Optional[AgentWorkflow]:
         """Convert database row to AgentWorkflow model"""
         try:
-            from models.agent import WorkflowStatus, WorkflowStep
-            
-            # Convert workflow steps
-            steps = []
-            for step_data in data.get("workflow_steps", []):
-                steps.append(WorkflowStep(**step_data))
-            
-            return AgentWorkflow(
-                id=data["id"],
-                request_id=data["request_id"],
-                orchestrator_id=data["orchestrator_id"],
-                participating_agents=data["participating_agents"],
-                workflow_steps=steps,
-                current_step=data["current_step"],
-                status=WorkflowStatus(data["status"]),
-                created_at=datetime.fromisoformat(data["created_at"].replace("Z", "+00:00")),
-                completed_at=datetime.fromisoformat(data["completed_at"].replace("Z", "+00:00")) if data.get("completed_at") else None,
-                metadata=data["metadata"]
-            )
+            # workflow_steps is declared as plain dicts, so the stored JSON is kept as-is
+            return AgentWorkflow.model_validate(data)
             
         except Exception as e:
-            logger.error(f"Error converting database row to agent workflow: {str(e)}")
+            logger.error("Error converting database row to agent workflow: %s", e)
             return None
     
     def _convert_db_to_agent_status(self, data: Dict[str, Any]) -> Optional[AgentStatus]:
         """Convert database row to AgentStatus model"""
         try:
-            from models.agent import AgentType, AgentCapability
-            
-            # Convert capabilities
-            capabilities = []
-            for cap_data in data.get("capabilities", []):
-                capabilities.append(AgentCapability(**cap_data))
-            
-            return AgentStatus(
-                agent_id=data["agent_id"],
-                agent_type=AgentType(data["agent_type"]),
-                is_active=data["is_active"],
-                current_load=data["current_load"],
-                max_concurrent_requests=data["max_concurrent_requests"],
-                capabilities=capabilities,
-                last_heartbeat=datetime.fromisoformat(data["last_heartbeat"].replace("Z", "+00:00")),
-                performance_metrics=data["performance_metrics"]
-            )
+            # Nested capabilities, enums and ISO timestamps are validated natively
+            return AgentStatus.model_validate(data)
             
         except Exception as e:
-            logger.error(f"Error converting database row to agent status: {str(e)}")
-            return None
-    
-    async def _workflow_exists(self, workflow_id: str) -> bool:
-        """Check if a workflow exists"""
-        try:
-            result = self.supabase.table("agent_workflows").select("id").eq("id", workflow_id).execute()
-            return bool(result.data)
-        except:
-            return False
\ No newline at end of file
+            logger.error("Error converting database row to agent status: %s", e)
+            return None
\ No newline at end of file
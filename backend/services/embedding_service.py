@@ -1,6 +1,6 @@
 import os
 import logging
-from typing import List, Dict, Optional, Any
+from typing import List, Dict, Optional, Any, Tuple
 from sentence_transformers import SentenceTransformer
 import chromadb
 from chromadb.config import Settings
@@ -12,6 +12,15 @@ from models.resume import ResumeChunk
 
 logger = logging.getLogger(__name__)
 
+# HNSW settings for new collections. Space stays l2 so the chat similarity threshold keeps its meaning;
+# a higher search_ef keeps recall up when a user filter leaves few candidates in a shared index
+HNSW_COLLECTION_METADATA = {
+    "hnsw:space": "l2",
+    "hnsw:M": 16,
+    "hnsw:construction_ef": 100,
+    "hnsw:search_ef": 64,
+}
+
 class EmbeddingService:
     """Service for generating embeddings and managing ChromaDB collections"""
     
@@ -111,7 +120,10 @@ class EmbeddingService:
             # Collection doesn't exist, create it
             try:
                 # Ensure metadata is not empty for ChromaDB
-                collection_metadata = metadata or {"description": f"Collection for {collection_name}"}
+                collection_metadata = {
+                    **HNSW_COLLECTION_METADATA,
+                    **(metadata or {"description": f"Collection for {collection_name}"})
+                }
                 
                 collection = self.chroma_client.create_collection(
                     name=collection_name,
@@ -208,6 +220,47 @@ class EmbeddingService:
             logger.error(f"Failed to search resume embeddings: {e}")
             return []
     
+    def search_resume_embeddings_batch(self, queries: List[Tuple[str, str]], n_results: int = 5) -> List[List[Dict]]:
+        """Search resume chunks for several (user_id, query) pairs with a single embedding pass"""
+        if not queries:
+            return []
+        
+        collection = self.chroma_client.get_collection(name=self.resume_collection_name)
+        query_embeddings = self.generate_embeddings([query for _, query in queries])
+        
+        # ChromaDB applies one where filter per query call - group the queries by user
+        positions_by_user: Dict[str, List[int]] = {}
+        for position, (user_id, _) in enumerate(queries):
+            positions_by_user.setdefault(user_id, []).append(position)
+        
+        all_results: List[List[Dict]] = [[] for _ in queries]
+        for user_id, positions in positions_by_user.items():
+            try:
+                results = collection.query(
+                    query_embeddings=[query_embeddings[position] for position in positions],
+                    n_results=n_results,
+                    where={"user_id": user_id}
+                )
+            except Exception as e:
+                logger.error(f"Failed to search resume embeddings for user {user_id}: {e}")
+                continue
+            
+            for row, position in enumerate(positions):
+                documents = results['documents'][row] if results['documents'] else []
+                all_results[position] = [
+                    {
+                        "content": doc,
+                        "metadata": results['metadatas'][row][i] if results['metadatas'] else {},
+                        "distance": results['distances'][row][i] if results['distances'] else None,
+                        "id": results['ids'][row][i] if results['ids'] else None,
+                        "source": "resume"
+                    }
+                    for i, doc in enumerate(documents)
+                ]
+        
+        logger.info(f"Searched resume embeddings for {len(queries)} queries across {len(positions_by_user)} users")
+        return all_results
+    
     def delete_user_embeddings(self, user_id: str) -> bool:
         """Delete all embeddings for a specific user"""
         try:
@@ -294,6 +347,58 @@ class EmbeddingService:
             logger.error(f"Failed to store profile context: {e}")
             return False
     
+    def store_profile_context_batch(self, items: List[Tuple[str, str]]) -> Dict[str, bool]:
+        """Store profile context for several users with a single embedding pass"""
+        # Last text wins when a user appears more than once
+        profiles = {user_id: text for user_id, text in items if text.strip()}
+        results = {user_id: False for user_id, _ in items}
+        if not profiles:
+            return results
+        
+        try:
+            collection = self.get_or_create_collection(
+                "profile_context",
+                metadata={"description": "User profile context embeddings for RAG"}
+            )
+            
+            user_ids = list(profiles)
+            texts = list(profiles.values())
+            
+            # Delete existing profile context for these users first
+            try:
+                existing_results = collection.get(where={"user_id": {"$in": user_ids}})
+                if existing_results['ids']:
+                    collection.delete(ids=existing_results['ids'])
+            except Exception as e:
+                logger.warning(f"Could not delete existing profile context: {e}")
+            
+            embeddings = self.generate_embeddings(texts)
+            created_at = datetime.utcnow().isoformat()
+            
+            collection.add(
+                embeddings=embeddings,
+                documents=texts,
+                metadatas=[
+                    {
+                        "user_id": user_id,
+                        "content_type": "profile_context",
+                        "created_at": created_at,
+                        "char_count": len(text)
+                    }
+                    for user_id, text in profiles.items()
+                ],
+                ids=[f"{user_id}_profile_context" for user_id in user_ids]
+            )
+            
+            for user_id in user_ids:
+                results[user_id] = True
+            logger.info(f"Stored profile context for {len(user_ids)} users")
+            
+        except Exception as e:
+            logger.error(f"Failed to store profile context batch: {e}")
+        
+        return results
+    
     def get_user_embedding_stats(self, user_id: str, collection_name: str) -> Dict:
         """Get embedding statistics for a specific user and collection"""
         try:
@@ -323,7 +428,7 @@ class EmbeddingService:
             logger.error(f"Failed to get user embedding stats: {e}")
             return {"count": 0, "collection": collection_name, "error": str(e)}
     
-    def search_user_context(self, user_id: str, query: str, n_results: int = 5) -> List[Dict]:
+    def search_user_context(self, user_id: str, query: str, n_results: int = 5, include_profile: bool = True) -> List[Dict]:
         """Search across all user context (resume + profile) for relevant information"""
         try:
             logger.info(f"Searching user context for user_id: {user_id} with query: {query[:50]}...")
@@ -345,29 +450,30 @@ class EmbeddingService:
                 all_results.append(result)
             
             # Search profile context
-            try:
-                collection = self.chroma_client.get_collection(name="profile_context")
-                query_embedding = self.generate_embeddings([query])[0]
-                
-                profile_results = collection.query(
-                    query_embeddings=[query_embedding],
-                    n_results=n_results,
-                    where={"user_id": user_id}
-                )
-                
-                if profile_results['documents'] and profile_results['documents'][0]:
-                    for i, doc in enumerate(profile_results['documents'][0]):
-                        result = {
-                            "content": doc,
-                            "metadata": profile_results['metadatas'][0][i] if profile_results['metadatas'] else {},
-                            "distance": profile_results['distances'][0][i] if profile_results['distances'] else None,
-                            "id": profile_results['ids'][0][i] if profile_results['ids'] else None,
-                            "source": "profile"
-                        }
-                        all_results.append(result)
-                        
-            except Exception as e:
-                logger.warning(f"Could not search profile context: {e}")
+            if include_profile:
+                try:
+                    collection = self.chroma_client.get_collection(name="profile_context")
+                    query_embedding = self.generate_embeddings([query])[0]
+                    
+                    profile_results = collection.query(
+                        query_embeddings=[query_embedding],
+                        n_results=n_results,
+                        where={"user_id": user_id}
+                    )
+                    
+                    if profile_results['documents'] and profile_results['documents'][0]:
+                        for i, doc in enumerate(profile_results['documents'][0]):
+                            result = {
+                                "content": doc,
+                                "metadata": profile_results['metadatas'][0][i] if profile_results['metadatas'] else {},
+                                "distance": profile_results['distances'][0][i] if profile_results['distances'] else None,
+                                "id": profile_results['ids'][0][i] if profile_results['ids'] else None,
+                                "source": "profile"
+                            }
+                            all_results.append(result)
+                            
+                except Exception as e:
+                    logger.warning(f"Could not search profile context: {e}")
             
             # Sort by relevance (distance)
             all_results.sort(key=lambda x: x.get('distance', float('inf')))
@@ -379,6 +485,27 @@ class EmbeddingService:
             logger.error(f"Failed to search user context: {e}")
             return []
     
+    def get_profile_context(self, user_id: str) -> List[Dict]:
+        """Get the stored profile context documents for a user"""
+        try:
+            collection = self.chroma_client.get_collection(name="profile_context")
+            results = collection.get(where={"user_id": user_id})
+            
+            return [
+                {
+                    "content": doc,
+                    "metadata": results['metadatas'][i] if results.get('metadatas') else {},
+                    "distance": None,
+                    "id": results['ids'][i],
+                    "source": "profile"
+                }
+                for i, doc in enumerate(results.get('documents') or [])
+            ]
+            
+        except Exception as e:
+            logger.warning(f"Could not get profile context: {e}")
+            return []
+    
     def health_check(self) -> Dict:
         """Check the health of the embedding service"""
         try:
@@ -8,7 +8,7 @@ import uuid
 
 from models.roadmap import (
     Roadmap, RoadmapPhase, Skill, LearningResource, Milestone,
-    RoadmapRequest, RoadmapGenerationResult, SkillLevel, ResourceType
+    RoadmapRequest, RoadmapResponse, RoadmapGenerationResult, SkillLevel, ResourceType
 )
 from services.ai_service import get_ai_service, ModelType
 from services.roadmap_scraper import get_roadmap_scraper
@@ -1484,10 +1484,20 @@ Only provide the role names, no additional explanation."""
         """Load all roadmaps for a user"""
         return await self.db_service.load_user_roadmaps(user_id)
     
+    async def load_user_roadmap_summaries(self, user_id: str) -> List[RoadmapResponse]:
+        """Load a user's roadmap listing without the phases"""
+        return await self.db_service.load_user_roadmap_summaries(user_id)
+    
     async def update_roadmap_progress(self, roadmap_id: str, progress_data: Dict[str, Any]) -> bool:
         """Update roadmap progress"""
         return await self.db_service.update_roadmap_progress(roadmap_id, progress_data)
     
+    async def update_phase_progress(
+        self, roadmap_id: str, idx: int, patch: Dict[str, Any], overall_progress: Optional[float] = None
+    ) -> bool:
+        """Update progress for a single roadmap phase"""
+        return await self.db_service.update_phase_progress(roadmap_id, idx, patch, overall_progress)
+    
     async def delete_roadmap(self, roadmap_id: str) -> bool:
         """Delete a roadmap"""
         return await self.db_service.delete_roadmap(roadmap_id)
@@ -433,19 +433,8 @@ class TaskService:
             if not data:
                 return None
             
-            # Parse due_date if it exists
-            due_date = None
-            if data.get('due_date'):
-                due_date = datetime.fromisoformat(data['due_date'].replace('Z', '+00:00'))
-            
-            # Parse timestamps
-            created_at = datetime.fromisoformat(data['created_at'].replace('Z', '+00:00'))
-            updated_at = datetime.fromisoformat(data['updated_at'].replace('Z', '+00:00'))
-            
-            completed_at = None
-            if data.get('completed_at'):
-                completed_at = datetime.fromisoformat(data['completed_at'].replace('Z', '+00:00'))
-            
+            # Timestamps arrive as ISO strings from PostgREST or datetimes from asyncpg;
+            # the Task model parses either natively
             return Task(
                 id=str(data['id']),
                 user_id=data['user_id'],
@@ -458,14 +447,14 @@ class TaskService:
                 phase_number=data.get('phase_number'),
                 milestone_index=data.get('milestone_index'),
                 skill_name=data.get('skill_name'),
-                due_date=due_date,
+                due_date=data.get('due_date'),
                 estimated_hours=data.get('estimated_hours'),
                 actual_hours=data.get('actual_hours'),
                 tags=data.get('tags', []),
                 metadata=data.get('metadata', {}),
-                created_at=created_at,
-                updated_at=updated_at,
-                completed_at=completed_at
+                created_at=data['created_at'],
+                updated_at=data['updated_at'],
+                completed_at=data.get('completed_at')
             )
             
         except Exception as e:
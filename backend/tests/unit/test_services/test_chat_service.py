@@ -0,0 +1,884 @@
+"""
+Unit tests for the RAG chat service hot paths
+"""
+import asyncio
+import json
+import threading
+import pytest
+
+import services.chat_service as chat_service_module
+from services.chat_service import RAGChatService
+from models.chat import ChatSession, ChatMessage, ChatMessageRequest, MessageRole
+
+class MockDatabaseService:
+    """Mock database service for testing"""
+
+    def __init__(self):
+        self.profiles = {}
+        self.profile_reads = 0
+        self.saved_sessions = []
+        self.saved_batches = []
+        self.appended = []
+        self.stored_sessions = {}
+
+    async def get_profile(self, user_id):
+        self.profile_reads += 1
+        return self.profiles.get(user_id)
+
+    async def get_user_resume(self, user_id):
+        return None
+
+    async def save_chat_session(self, session):
+        self.saved_sessions.append(session.id)
+        self.stored_sessions[session.id] = session.model_copy(deep=True)
+        return session.id
+
+    async def save_chat_sessions_batch(self, sessions):
+        self.saved_batches.append([session.id for session in sessions])
+        for session in sessions:
+            self.stored_sessions[session.id] = session.model_copy(deep=True)
+        return [session.id for session in sessions]
+
+    async def append_chat_messages_batch(self, appends):
+        self.appended.append({
+            session_id: [msg.content for msg in messages]
+            for session_id, messages in appends.items()
+        })
+        return list(appends)
+
+    async def load_chat_session(self, session_id):
+        return self.stored_sessions.get(session_id)
+
+    async def load_chat_messages(self, session_id, limit=50, offset=0):
+        session = self.stored_sessions.get(session_id)
+        if session is None:
+            return None
+        end = max(len(session.messages) - offset, 0)
+        return session.messages[max(end - limit, 0):end]
+
+@pytest.fixture
+def chat_service(monkeypatch):
+    """Chat service wired to the mock database and no optional services"""
+    monkeypatch.setattr(chat_service_module, "DatabaseService", MockDatabaseService)
+    monkeypatch.setattr(chat_service_module, "EMBEDDING_AVAILABLE", False)
+    monkeypatch.setattr(chat_service_module, "RESUME_AVAILABLE", False)
+    return RAGChatService()
+
+@pytest.mark.asyncio
+async def test_profile_block_is_cached_until_profile_changes(chat_service):
+    """Profile block is rebuilt only when the profile version changes"""
+    profile = {
+        "name": "Ada",
+        "current_role": "Analyst",
+        "target_roles": ["Data Scientist"],
+        "updated_at": "2024-01-01T00:00:00"
+    }
+    chat_service.db_service.profiles["user-1"] = profile
+
+    _, first = await chat_service._get_user_context("user-1", "what next?")
+    assert "Name: Ada" in first
+    assert "Target Roles: Data Scientist" in first
+
+    cached_block = chat_service._profile_block_cache["user-1"][0]
+    _, second = await chat_service._get_user_context("user-1", "and then?")
+    assert chat_service._profile_block_cache["user-1"][0] is cached_block
+    assert first == second
+
+    chat_service.db_service.profiles["user-1"] = {
+        **profile,
+        "current_role": "Engineer",
+        "updated_at": "2024-02-01T00:00:00"
+    }
+    _, third = await chat_service._get_user_context("user-1", "now?")
+    assert "Current Role: Engineer" in third
+
+def test_session_stats_counts_roles(chat_service):
+    """Session stats split messages by role"""
+    session = ChatSession(user_id="user-1")
+    session.messages.extend([
+        ChatMessage(role=MessageRole.USER, content="hi"),
+        ChatMessage(role=MessageRole.ASSISTANT, content="hello"),
+        ChatMessage(role=MessageRole.SYSTEM, content="note"),
+        ChatMessage(role=MessageRole.USER, content="help"),
+    ])
+    chat_service.active_sessions[session.id] = session
+
+    stats = chat_service.get_session_stats(session.id)
+    assert stats["total_messages"] == 4
+    assert stats["user_messages"] == 2
+    assert stats["assistant_messages"] == 1
+
+@pytest.mark.asyncio
+async def test_user_sessions_index_tracks_deletes(chat_service):
+    """Per-user index follows registration and deletion"""
+    first = ChatSession(user_id="user-1")
+    second = ChatSession(user_id="user-1")
+    other = ChatSession(user_id="user-2")
+    for session in (first, second, other):
+        await chat_service.save_chat_session(session)
+
+    assert {s.id for s in chat_service.get_user_sessions("user-1")} == {first.id, second.id}
+    assert chat_service.get_user_sessions("user-3") == []
+
+    assert chat_service.delete_chat_session(first.id)
+    assert [s.id for s in chat_service.get_user_sessions("user-1")] == [second.id]
+
+    health = await chat_service.health_check()
+    assert health["active_sessions"] == 2
+
+def test_format_multi_agent_response_prefers_known_fields(chat_service):
+    """First non-empty standard field wins"""
+    formatted = chat_service._format_multi_agent_response({
+        "content": "",
+        "advice": "Learn SQL",
+        "analysis": "ignored"
+    })
+    assert formatted == "Learn SQL"
+
+@pytest.mark.asyncio
+async def test_persist_coalesces_writes_into_one_batch(chat_service):
+    """Repeated persists for the same sessions produce one batched write"""
+    first = ChatSession(user_id="user-1")
+    second = ChatSession(user_id="user-2")
+    chat_service._register_session(first.id, first)
+    chat_service._register_session(second.id, second)
+
+    for _ in range(3):
+        assert await chat_service.persist_session_after_message(first.id)
+    assert await chat_service.persist_session_after_message(second.id)
+    assert not await chat_service.persist_session_after_message("missing")
+
+    await chat_service.close()
+
+    assert chat_service.db_service.saved_batches == [[first.id, second.id]]
+    assert chat_service._dirty_sessions == {}
+
+@pytest.mark.asyncio
+async def test_persist_worker_flushes_in_background(chat_service):
+    """Writer task flushes dirty sessions without close()"""
+    session = ChatSession(user_id="user-1")
+    chat_service._register_session(session.id, session)
+
+    await chat_service.persist_session_after_message(session.id)
+    await asyncio.sleep(chat_service.persist_flush_interval * 4)
+
+    assert chat_service.db_service.saved_batches == [[session.id]]
+    await chat_service.close()
+
+class MockEmbeddingService:
+    """Mock embedding service that records profile stores"""
+
+    def __init__(self):
+        self.stored = []
+
+    def store_profile_context(self, user_id, context):
+        self.stored.append((user_id, context))
+        return True
+
+class MockBatchEmbeddingService(MockEmbeddingService):
+    """Mock embedding service with a batch API"""
+
+    def __init__(self):
+        super().__init__()
+        self.batches = []
+        self.threads = []
+
+    def store_profile_context_batch(self, items):
+        self.batches.append([user_id for user_id, _ in items])
+        self.threads.append(threading.current_thread())
+        return {user_id: True for user_id, _ in items}
+
+@pytest.mark.asyncio
+async def test_refresh_user_context_batches_concurrent_users(chat_service):
+    """Concurrent refreshes share one batched embedding call"""
+    chat_service.embedding_service = MockBatchEmbeddingService()
+    user_ids = ["user-1", "user-2", "user-3"]
+    for index, user_id in enumerate(user_ids):
+        chat_service.db_service.profiles[user_id] = {"current_role": f"Role {index}"}
+
+    results = await asyncio.gather(*(chat_service.refresh_user_context(u) for u in user_ids))
+
+    assert results == [True, True, True]
+    assert chat_service.embedding_service.batches == [user_ids]
+    assert chat_service.embedding_service.stored == []
+    assert chat_service.embedding_service.threads[0] is not threading.main_thread()
+    await chat_service.close()
+
+@pytest.mark.asyncio
+async def test_refresh_user_context_skips_unchanged_profile(chat_service):
+    """Unchanged profile text is not re-embedded"""
+    chat_service.embedding_service = MockEmbeddingService()
+    chat_service.db_service.profiles["user-1"] = {"current_role": "Analyst"}
+
+    assert await chat_service.refresh_user_context("user-1")
+    assert await chat_service.refresh_user_context("user-1")
+    assert len(chat_service.embedding_service.stored) == 1
+
+    chat_service.db_service.profiles["user-1"] = {"current_role": "Engineer"}
+    assert await chat_service.refresh_user_context("user-1")
+    assert len(chat_service.embedding_service.stored) == 2
+    await chat_service.close()
+
+def test_format_multi_agent_response_falls_back_to_json(chat_service):
+    """Dicts without a standard field are rendered as indented JSON"""
+    formatted = chat_service._format_multi_agent_response({"skills": ["SQL"]})
+    assert json.loads(formatted) == {"skills": ["SQL"]}
+    assert "\n  " in formatted
+
+class MockAIService:
+    """Mock AI service that counts health probes"""
+
+    def __init__(self):
+        self.health_calls = 0
+        self.prompts = []
+
+    async def health_check(self):
+        self.health_calls += 1
+        await asyncio.sleep(0)
+        return {"status": "healthy"}
+
+    async def generate_text(self, prompt, **kwargs):
+        self.prompts.append(prompt)
+        return "Focus on SQL next."
+
+@pytest.mark.asyncio
+async def test_health_check_is_cached_and_single_flight(chat_service):
+    """Concurrent and repeated polls share one downstream probe per TTL"""
+    ai_service = MockAIService()
+    chat_service.ai_service = ai_service
+
+    results = await asyncio.gather(*(chat_service.health_check() for _ in range(5)))
+    assert all(result["status"] == "healthy" for result in results)
+    assert ai_service.health_calls == 1
+
+    await chat_service.health_check()
+    assert ai_service.health_calls == 1
+
+    chat_service._health_ttl = 0
+    await chat_service.health_check()
+    assert ai_service.health_calls == 2
+
+@pytest.mark.asyncio
+async def test_deleted_session_memory_is_recycled(chat_service):
+    """Memory of a deleted session is cleared and reused for the next session"""
+    first = ChatSession(user_id="user-1")
+    await chat_service.save_chat_session(first)
+    memory = chat_service._get_session_memory(first.id)
+    memory.chat_memory.add_user_message("hello")
+
+    assert chat_service.delete_chat_session(first.id)
+    assert first.id not in chat_service.session_memories
+    assert chat_service._memory_pool == [memory]
+
+    second = ChatSession(user_id="user-1")
+    assert chat_service._get_session_memory(second.id) is memory
+    assert memory.chat_memory.messages == []
+    assert chat_service._memory_pool == []
+
+@pytest.mark.asyncio
+async def test_active_sessions_evict_least_recently_used(chat_service):
+    """Overflowing the active set evicts the coldest session to the persist queue"""
+    chat_service._max_active = 2
+    first = ChatSession(user_id="user-1")
+    second = ChatSession(user_id="user-1")
+    third = ChatSession(user_id="user-2")
+
+    await chat_service.save_chat_session(first)
+    await chat_service.save_chat_session(second)
+    chat_service._get_session_memory(second.id)
+    second.messages.append(ChatMessage(role=MessageRole.USER, content="not saved yet"))
+    assert await chat_service.get_chat_session(first.id) is first
+
+    await chat_service.save_chat_session(third)
+
+    assert list(chat_service.active_sessions) == [first.id, third.id]
+    assert second.id not in chat_service.session_memories
+    assert [s.id for s in chat_service.get_user_sessions("user-1")] == [first.id]
+    assert chat_service._active_ids == {first.id, third.id}
+
+    await chat_service.close()
+    assert chat_service.db_service.appended == [{second.id: ["not saved yet"]}]
+
+@pytest.mark.asyncio
+async def test_evicted_sessions_are_reloaded_from_the_database(chat_service):
+    """Eviction is not deletion - clean sessions are dropped without a write and come back on demand"""
+    chat_service._max_active = 1
+    first = ChatSession(user_id="user-1")
+    await chat_service.save_chat_session(first)
+    await chat_service.save_chat_session(ChatSession(user_id="user-1"))
+
+    assert first.id not in chat_service.active_sessions
+    assert chat_service._dirty_sessions == {}
+
+    reloaded = await chat_service.get_chat_session(first.id)
+
+    assert reloaded.id == first.id
+    assert first.id in chat_service.active_sessions
+    await chat_service.close()
+    assert chat_service.db_service.saved_batches == []
+
+@pytest.mark.asyncio
+async def test_deleted_session_stays_deleted_after_eviction(chat_service):
+    """Deleting writes the inactive flag, so an evicted session is not revived from a stale row"""
+    chat_service._max_active = 1
+    first = ChatSession(user_id="user-1")
+    await chat_service.save_chat_session(first)
+
+    assert chat_service.delete_chat_session(first.id)
+    await chat_service.save_chat_session(ChatSession(user_id="user-2"))
+    await chat_service._flush_dirty_sessions()
+
+    assert chat_service.db_service.stored_sessions[first.id].is_active is False
+    assert await chat_service.get_chat_session(first.id) is None
+    assert chat_service.get_user_sessions("user-1") == []
+    await chat_service.close()
+
+@pytest.mark.asyncio
+async def test_session_evicted_before_its_write_comes_back_with_unsaved_messages(chat_service):
+    """A session still waiting on its queued write is revived from memory, not the stale database row"""
+    chat_service._max_active = 1
+    first = ChatSession(user_id="user-1")
+    await chat_service.save_chat_session(first)
+    first.messages.append(ChatMessage(role=MessageRole.USER, content="not saved yet"))
+    await chat_service.save_chat_session(ChatSession(user_id="user-1"))
+    assert first.id in chat_service._dirty_sessions
+
+    reloaded = await chat_service.get_chat_session(first.id)
+
+    assert reloaded is first
+    await chat_service.close()
+    assert chat_service.db_service.appended == [{first.id: ["not saved yet"]}]
+
+@pytest.mark.asyncio
+async def test_persist_appends_only_new_messages_until_checkpoint(chat_service):
+    """Saved sessions get delta appends, with a full snapshot every checkpoint"""
+    chat_service.checkpoint_every = 2
+    session = ChatSession(user_id="user-1")
+    session.messages.append(ChatMessage(role=MessageRole.USER, content="first"))
+    await chat_service.save_chat_session(session)
+
+    for content in ("second", "third", "fourth"):
+        session.messages.append(ChatMessage(role=MessageRole.USER, content=content))
+        await chat_service.persist_session_after_message(session.id)
+        await chat_service._flush_dirty_sessions()
+
+    assert chat_service.db_service.appended == [
+        {session.id: ["second"]},
+        {session.id: ["third"]},
+    ]
+    assert chat_service.db_service.saved_batches == [[session.id]]
+    assert chat_service._persisted_state[session.id] == (4, 0)
+
+    # Shrinking the history cannot be expressed as an append
+    session.messages.pop()
+    await chat_service.persist_session_after_message(session.id)
+    await chat_service.close()
+    assert chat_service.db_service.saved_batches == [[session.id], [session.id]]
+
+@pytest.mark.asyncio
+async def test_send_message_survives_context_failure(chat_service, monkeypatch):
+    """A failing RAG lookup falls back to a generic context and still answers"""
+    async def failing_context(user_id, query):
+        raise RuntimeError("vector store down")
+
+    monkeypatch.setattr(chat_service_module, "MULTI_AGENT_AVAILABLE", False)
+    monkeypatch.setattr(chat_service, "_get_user_context_sections", failing_context)
+    chat_service.ai_service = MockAIService()
+    session = ChatSession(user_id="user-1")
+    await chat_service.save_chat_session(session)
+
+    response = await chat_service.send_message(
+        ChatMessageRequest(session_id=session.id, message="What should I learn?")
+    )
+
+    assert response.message.content == "Focus on SQL next."
+    assert response.context_used == []
+    assert "Unable to retrieve user background" in chat_service.ai_service.prompts[0]
+    assert session.id in chat_service._dirty_sessions
+    await chat_service.close()
+
+@pytest.mark.asyncio
+async def test_user_context_search_runs_off_event_loop(chat_service):
+    """Blocking vector search is executed in a worker thread"""
+    search_threads = []
+
+    class ThreadRecordingEmbeddingService:
+        def search_user_context(self, user_id, query, n_results=5, include_profile=True):
+            search_threads.append(threading.current_thread())
+            return [{"content": "Built ETL pipelines", "source": "resume", "distance": 0.1}]
+
+        def get_profile_context(self, user_id):
+            return []
+
+    chat_service.embedding_service = ThreadRecordingEmbeddingService()
+    chunks, context_text = await chat_service._get_user_context("user-1", "How do I build data pipelines?")
+
+    assert search_threads and search_threads[0] is not threading.main_thread()
+    assert "Built ETL pipelines" in context_text
+    assert len(chunks) == 1
+
+@pytest.mark.asyncio
+async def test_user_context_groups_chunks_by_source(chat_service):
+    """Chunks above the distance threshold are dropped and the rest grouped by source"""
+    class StaticEmbeddingService:
+        def get_profile_context(self, user_id):
+            return []
+
+        def search_user_context(self, user_id, query, n_results=5, include_profile=True):
+            return [
+                {"content": "Resume line", "source": "resume", "distance": 0.2},
+                {"content": "Profile line", "source": "profile", "distance": None},
+                {"content": "Too far", "source": "resume", "distance": 0.9},
+                {"content": "Other line", "source": "notes", "distance": 0.1},
+            ]
+
+    chat_service.embedding_service = StaticEmbeddingService()
+    chunks, context_text = await chat_service._get_user_context("user-1", "Which skills should I improve?")
+
+    assert [chunk["content"] for chunk in chunks] == ["Resume line", "Profile line", "Other line"]
+    assert "Resume Information:\nResume line" in context_text
+    assert "Additional Profile Information:\nProfile line" in context_text
+    assert "Too far" not in context_text
+
+@pytest.mark.asyncio
+async def test_regenerate_response_uses_message_index(chat_service, monkeypatch):
+    """Regenerating replaces the assistant message found through the id index"""
+    monkeypatch.setattr(chat_service_module, "MULTI_AGENT_AVAILABLE", False)
+    chat_service.ai_service = MockAIService()
+    session = ChatSession(user_id="user-1")
+    await chat_service.save_chat_session(session)
+
+    first = await chat_service.send_message(
+        ChatMessageRequest(session_id=session.id, message="What should I learn?")
+    )
+    assert chat_service.get_session_stats(session.id)["assistant_messages"] == 1
+
+    assert await chat_service.regenerate_response(session.id, "unknown-id") is None
+    regenerated = await chat_service.regenerate_response(session.id, first.message.id)
+
+    assert regenerated is not None
+    memory_messages = chat_service.session_memories[session.id].chat_memory.messages
+    assert [msg.type for msg in memory_messages].count("ai") == 1
+    assert memory_messages[-1].content == "Focus on SQL next."
+    message_ids = [msg.id for msg in session.messages]
+    assert first.message.id not in message_ids
+    assert regenerated.message.id == message_ids[-1]
+
+    # Messages appended outside the service are picked up on the next read
+    session.messages.append(ChatMessage(role=MessageRole.ASSISTANT, content="extra"))
+    stats = chat_service.get_session_stats(session.id)
+    assert stats["assistant_messages"] == 2
+    assert stats["total_messages"] == len(session.messages)
+    await chat_service.close()
+
+@pytest.mark.asyncio
+async def test_regenerate_response_reloads_evicted_session(chat_service, monkeypatch):
+    """Regenerating works for a session that was evicted to the database"""
+    monkeypatch.setattr(chat_service_module, "MULTI_AGENT_AVAILABLE", False)
+    chat_service.ai_service = MockAIService()
+    session = ChatSession(user_id="user-1")
+    await chat_service.save_chat_session(session)
+    first = await chat_service.send_message(
+        ChatMessageRequest(session_id=session.id, message="What should I learn?")
+    )
+    await chat_service.save_chat_session(session)
+
+    chat_service._max_active = 1
+    await chat_service.save_chat_session(ChatSession(user_id="user-2"))
+    assert session.id not in chat_service.active_sessions
+
+    regenerated = await chat_service.regenerate_response(session.id, first.message.id)
+
+    assert regenerated is not None
+    assert regenerated.session_id == session.id
+    await chat_service.close()
+
+def test_session_memories_are_capped(chat_service):
+    """Creating memories past the cap releases the oldest one to the pool"""
+    chat_service._max_active = 2
+    for session_id in ("a", "b", "c"):
+        chat_service._get_session_memory(session_id)
+
+    assert list(chat_service.session_memories) == ["b", "c"]
+    assert len(chat_service._memory_pool) == 1
+
+@pytest.mark.asyncio
+async def test_old_message_bodies_are_archived_but_never_lost(chat_service):
+    """Stored messages past the window are archived in memory and restored for reads and snapshots"""
+    chat_service.archive_after_messages = 4
+    chat_service.archive_keep_recent = 2
+    session = ChatSession(user_id="user-1")
+    session.messages.extend(
+        ChatMessage(role=MessageRole.USER, content=f"message {i}") for i in range(6)
+    )
+    await chat_service.save_chat_session(session)
+
+    chat_service._archive_old_messages(session.id, session)
+    assert [msg.content for msg in session.messages[:4]] == ["[archived]"] * 4
+    assert session.messages[4].content == "message 4"
+
+    loaded = await chat_service.load_chat_session(session.id)
+    assert [msg.content for msg in loaded.messages] == [f"message {i}" for i in range(6)]
+
+    # A forced snapshot writes the full history, not the placeholders
+    chat_service._persisted_state.pop(session.id)
+    await chat_service.persist_session_after_message(session.id)
+    await chat_service.close()
+    stored = chat_service.db_service.stored_sessions[session.id]
+    assert [msg.content for msg in stored.messages] == [f"message {i}" for i in range(6)]
+
+@pytest.mark.asyncio
+async def test_failed_archive_restore_is_an_error_not_placeholder_history(chat_service):
+    """Archive placeholders are never served as the session's real messages"""
+    chat_service.archive_after_messages = 2
+    chat_service.archive_keep_recent = 1
+    session = ChatSession(user_id="user-1")
+    session.messages.extend(
+        ChatMessage(role=MessageRole.USER, content=f"message {i}") for i in range(3)
+    )
+    await chat_service.save_chat_session(session)
+    chat_service._archive_old_messages(session.id, session)
+    del chat_service.db_service.stored_sessions[session.id]
+
+    with pytest.raises(ValueError):
+        await chat_service.load_chat_session(session.id)
+    assert await chat_service.get_chat_session(session.id) is session
+    await chat_service.close()
+
+@pytest.mark.asyncio
+async def test_session_messages_are_paged_from_the_newest(chat_service):
+    """Pages come from memory for active sessions, restoring archived bodies when needed"""
+    chat_service.archive_after_messages = 4
+    chat_service.archive_keep_recent = 2
+    session = ChatSession(user_id="user-1")
+    session.messages.extend(
+        ChatMessage(role=MessageRole.USER, content=f"message {i}") for i in range(6)
+    )
+    await chat_service.save_chat_session(session)
+    chat_service._archive_old_messages(session.id, session)
+
+    page = await chat_service.get_session_messages(session.id, limit=2)
+    assert [msg.content for msg in page] == ["message 4", "message 5"]
+
+    page = await chat_service.get_session_messages(session.id, limit=3, offset=2)
+    assert [msg.content for msg in page] == ["message 1", "message 2", "message 3"]
+
+    chat_service.active_sessions.pop(session.id)
+    page = await chat_service.get_session_messages(session.id, limit=2, offset=5)
+    assert [msg.content for msg in page] == ["message 0"]
+    assert await chat_service.get_session_messages("missing") is None
+    await chat_service.close()
+
+@pytest.mark.asyncio
+async def test_prompt_keeps_background_ahead_of_question_context(chat_service, monkeypatch):
+    """Stable background sits in the system prefix and search hits sit next to the question"""
+    class StaticEmbeddingService:
+        def get_profile_context(self, user_id):
+            return []
+
+        def search_user_context(self, user_id, query, n_results=5, include_profile=True):
+            return [{"content": f"Hit for {query}", "source": "resume", "distance": 0.1}]
+
+    monkeypatch.setattr(chat_service_module, "MULTI_AGENT_AVAILABLE", False)
+    chat_service.embedding_service = StaticEmbeddingService()
+    chat_service.ai_service = MockAIService()
+    chat_service.db_service.profiles["user-1"] = {"name": "Ada", "updated_at": "v1"}
+    session = ChatSession(user_id="user-1")
+    await chat_service.save_chat_session(session)
+
+    for question in ("What is my first question?", "What is my second question?"):
+        await chat_service.send_message(ChatMessageRequest(session_id=session.id, message=question))
+
+    first, second = chat_service.ai_service.prompts
+    prefix = first.split("Human:")[0]
+    assert "Name: Ada" in prefix
+    assert "Hit for" not in prefix
+    assert second.startswith(prefix)
+    assert "Hit for What is my second question?" in second.split("Human:")[-1]
+    await chat_service.close()
+
+def test_chat_history_expands_then_resets(chat_service):
+    """History grows append-only up to the max, then drops back to the recent tail"""
+    memory = chat_service._get_session_memory("session-1")
+    for i in range(chat_service.max_history_messages):
+        memory.chat_memory.add_user_message(f"message {i}")
+
+    history = chat_service._get_chat_history(memory)
+    assert len(history) == chat_service.max_history_messages
+
+    memory.chat_memory.add_user_message("one more")
+    history = chat_service._get_chat_history(memory)
+    assert len(history) == chat_service.max_memory_messages
+    assert history[-1].content == "one more"
+
+@pytest.mark.asyncio
+async def test_health_check_reports_embedding_errors(chat_service):
+    """Embedding failures are reported per component without failing the whole check"""
+    class FailingEmbeddingService:
+        def health_check(self):
+            raise RuntimeError("chroma unreachable")
+
+    chat_service.ai_service = MockAIService()
+    chat_service.embedding_service = FailingEmbeddingService()
+
+    health = await chat_service.health_check()
+    assert health["status"] == "healthy"
+    assert health["ai_service_status"] == "healthy"
+    assert health["components"]["embedding_service"] == {"status": "error", "error": "chroma unreachable"}
+
+@pytest.mark.asyncio
+async def test_profile_chunks_are_cached_until_refresh(chat_service):
+    """Stored profile chunks are fetched once per TTL and dropped on refresh"""
+    class CountingEmbeddingService(MockEmbeddingService):
+        def __init__(self):
+            super().__init__()
+            self.profile_reads = 0
+            self.include_profile = []
+
+        def get_profile_context(self, user_id):
+            self.profile_reads += 1
+            return [{"content": "Current Role: Analyst", "source": "profile", "distance": None}]
+
+        def search_user_context(self, user_id, query, n_results=5, include_profile=True):
+            self.include_profile.append(include_profile)
+            return []
+
+    embedding_service = CountingEmbeddingService()
+    chat_service.embedding_service = embedding_service
+
+    for query in ("What should I learn first?", "What should I learn second?"):
+        chunks, context_text = await chat_service._get_user_context("user-1", query)
+    assert embedding_service.profile_reads == 1
+    assert embedding_service.include_profile == [False, False]
+    assert "Additional Profile Information:\nCurrent Role: Analyst" in context_text
+
+    await chat_service.refresh_user_context("user-1")
+    await chat_service._get_user_context("user-1", "What should I learn third?")
+    assert embedding_service.profile_reads == 2
+    await chat_service.close()
+
+@pytest.mark.asyncio
+async def test_stored_profile_document_is_skipped_when_database_profile_exists(chat_service):
+    """The stored profile document only stands in for a missing database profile"""
+    class CountingEmbeddingService(MockEmbeddingService):
+        def __init__(self):
+            super().__init__()
+            self.profile_reads = 0
+
+        def get_profile_context(self, user_id):
+            self.profile_reads += 1
+            return [{"content": "Current Role: Analyst", "source": "profile", "distance": None}]
+
+        def search_user_context(self, user_id, query, n_results=5, include_profile=True):
+            return []
+
+    embedding_service = CountingEmbeddingService()
+    chat_service.embedding_service = embedding_service
+    chat_service.db_service.profiles["user-1"] = {"current_role": "Engineer"}
+
+    chunks, context_text = await chat_service._get_user_context("user-1", "What should I learn first?")
+    assert embedding_service.profile_reads == 0
+    assert "Current Role: Engineer" in context_text
+    assert "Additional Profile Information" not in context_text
+    await chat_service.close()
+
+@pytest.mark.asyncio
+async def test_trivial_queries_skip_vector_search(chat_service):
+    """Short acknowledgements use cached profile context without a vector search"""
+    class CountingEmbeddingService(MockEmbeddingService):
+        def __init__(self):
+            super().__init__()
+            self.searches = 0
+
+        def get_profile_context(self, user_id):
+            return [{"content": "Current Role: Analyst", "source": "profile", "distance": None}]
+
+        def search_user_context(self, user_id, query, n_results=5, include_profile=True):
+            self.searches += 1
+            return [{"content": "Resume line", "source": "resume", "distance": 0.1}]
+
+    embedding_service = CountingEmbeddingService()
+    chat_service.embedding_service = embedding_service
+
+    chunks, context_text = await chat_service._get_user_context("user-1", "Thanks!")
+    assert embedding_service.searches == 0
+    assert "Current Role: Analyst" in context_text
+    assert "Resume line" not in context_text
+
+    await chat_service._get_user_context("user-1", "How do I move into data engineering?")
+    assert embedding_service.searches == 1
+
+@pytest.mark.asyncio
+async def test_send_message_stream_yields_chunks_then_records_reply(chat_service, monkeypatch):
+    """Streamed chunks reach the caller first and are stored as one assistant message"""
+    class StreamingAIService(MockAIService):
+        async def stream_text(self, prompt, **kwargs):
+            self.prompts.append(prompt)
+            for chunk in ("Focus ", "on ", "SQL next."):
+                yield chunk
+
+    monkeypatch.setattr(chat_service_module, "MULTI_AGENT_AVAILABLE", False)
+    chat_service.ai_service = StreamingAIService()
+    session = ChatSession(user_id="user-1")
+    await chat_service.save_chat_session(session)
+
+    stream = chat_service.send_message_stream(
+        ChatMessageRequest(session_id=session.id, message="What should I learn?")
+    )
+    first = await stream.__anext__()
+    assert first == "Focus "
+    assert [msg.role for msg in session.messages] == [MessageRole.USER]
+
+    rest = [chunk async for chunk in stream]
+    assert first + "".join(rest) == "Focus on SQL next."
+    assert session.messages[-1].role == MessageRole.ASSISTANT
+    assert session.messages[-1].content == "Focus on SQL next."
+    assert session.id in chat_service._dirty_sessions
+    await chat_service.close()
+
+@pytest.mark.asyncio
+async def test_turn_failing_after_a_mid_turn_write_is_taken_back_from_storage(chat_service, monkeypatch):
+    """A question already appended to storage is removed again when its turn fails"""
+    class FlushThenFailAIService(MockAIService):
+        async def stream_text(self, prompt, **kwargs):
+            # Another write for this session goes out while the turn is in flight
+            chat_service._schedule_persist(session.id, session)
+            await chat_service._flush_dirty_sessions()
+            raise RuntimeError("provider dropped the stream")
+            yield
+
+    monkeypatch.setattr(chat_service_module, "MULTI_AGENT_AVAILABLE", False)
+    chat_service.ai_service = MockAIService()
+    session = ChatSession(user_id="user-1")
+    await chat_service.save_chat_session(session)
+    await chat_service.send_message(ChatMessageRequest(session_id=session.id, message="first question"))
+    await chat_service._flush_dirty_sessions()
+
+    chat_service.ai_service = FlushThenFailAIService()
+    with pytest.raises(RuntimeError):
+        _ = [chunk async for chunk in chat_service.send_message_stream(
+            ChatMessageRequest(session_id=session.id, message="question that fails")
+        )]
+    assert chat_service.db_service.appended[-1] == {session.id: ["question that fails"]}
+
+    chat_service.ai_service = MockAIService()
+    await chat_service.send_message(ChatMessageRequest(session_id=session.id, message="next question"))
+    await chat_service.close()
+
+    stored = chat_service.db_service.stored_sessions[session.id]
+    assert [msg.content for msg in stored.messages] == [
+        "first question", "Focus on SQL next.", "next question", "Focus on SQL next."
+    ]
+
+@pytest.mark.asyncio
+async def test_concurrent_context_searches_share_one_batch(chat_service):
+    """Queries arriving together are embedded and searched as a single batch"""
+    class BatchSearchEmbeddingService(MockEmbeddingService):
+        def __init__(self):
+            super().__init__()
+            self.search_batches = []
+
+        def get_profile_context(self, user_id):
+            return []
+
+        def search_resume_embeddings_batch(self, queries, n_results=5):
+            self.search_batches.append(list(queries))
+            return [
+                [{"content": f"Hit for {user_id}", "source": "resume", "distance": 0.1}]
+                for user_id, _ in queries
+            ]
+
+    embedding_service = BatchSearchEmbeddingService()
+    chat_service.embedding_service = embedding_service
+
+    results = await asyncio.gather(*(
+        chat_service._get_user_context(f"user-{i}", "How do I move into data engineering?")
+        for i in range(3)
+    ))
+
+    assert len(embedding_service.search_batches) == 1
+    assert [user_id for user_id, _ in embedding_service.search_batches[0]] == ["user-0", "user-1", "user-2"]
+    for i, (chunks, context_text) in enumerate(results):
+        assert f"Hit for user-{i}" in context_text
+    await chat_service.close()
+
+def test_history_text_appends_new_turns_and_rebuilds_after_trim(chat_service):
+    """Formatted history grows incrementally and matches a full rebuild after the window resets"""
+    from langchain.schema import get_buffer_string
+
+    memory = chat_service._get_session_memory("session-1")
+    memory.chat_memory.add_user_message("first")
+    memory.chat_memory.add_ai_message("reply")
+    assert chat_service._get_history_text("session-1", memory) == "Human: first\nAI: reply"
+
+    memory.chat_memory.add_user_message("second")
+    assert chat_service._get_history_text("session-1", memory) == "Human: first\nAI: reply\nHuman: second"
+
+    for i in range(chat_service.max_history_messages):
+        memory.chat_memory.add_user_message(f"message {i}")
+    text = chat_service._get_history_text("session-1", memory)
+    assert text == get_buffer_string(memory.chat_memory.messages)
+    assert not text.startswith("Human: first")
+
+    memory.chat_memory.messages.pop()
+    assert chat_service._get_history_text("session-1", memory) == get_buffer_string(memory.chat_memory.messages)
+
+@pytest.mark.asyncio
+async def test_concurrent_messages_to_one_session_do_not_interleave(chat_service, monkeypatch):
+    """Turns on the same session run one after another"""
+    class SlowAIService(MockAIService):
+        async def generate_text(self, prompt, **kwargs):
+            self.prompts.append(prompt)
+            await asyncio.sleep(0.01)
+            return f"Reply {len(self.prompts)}"
+
+    monkeypatch.setattr(chat_service_module, "MULTI_AGENT_AVAILABLE", False)
+    chat_service.ai_service = SlowAIService()
+    session = ChatSession(user_id="user-1")
+    await chat_service.save_chat_session(session)
+
+    await asyncio.gather(*(
+        chat_service.send_message(ChatMessageRequest(session_id=session.id, message=f"Question number {i}?"))
+        for i in range(3)
+    ))
+
+    roles = [msg.role for msg in session.messages]
+    assert roles == [MessageRole.USER, MessageRole.ASSISTANT] * 3
+    assert "Reply 1" in chat_service.ai_service.prompts[1]
+    await chat_service.close()
+
+@pytest.mark.asyncio
+async def test_failed_stream_keeps_partial_reply_or_takes_back_the_question(chat_service, monkeypatch):
+    """A broken stream never leaves a user message without a reply"""
+    class BrokenStreamAIService(MockAIService):
+        def __init__(self, chunks):
+            super().__init__()
+            self.chunks = chunks
+
+        async def stream_text(self, prompt, **kwargs):
+            for chunk in self.chunks:
+                yield chunk
+            raise RuntimeError("provider dropped the stream")
+
+    monkeypatch.setattr(chat_service_module, "MULTI_AGENT_AVAILABLE", False)
+    session = ChatSession(user_id="user-1")
+    await chat_service.save_chat_session(session)
+
+    chat_service.ai_service = BrokenStreamAIService([])
+    with pytest.raises(RuntimeError):
+        _ = [chunk async for chunk in chat_service.send_message_stream(
+            ChatMessageRequest(session_id=session.id, message="First question")
+        )]
+    assert session.messages == []
+    assert chat_service.session_memories[session.id].chat_memory.messages == []
+
+    chat_service.ai_service = BrokenStreamAIService(["Start with ", "SQL"])
+    stream = chat_service.send_message_stream(ChatMessageRequest(session_id=session.id, message="Second question"))
+    assert await stream.__anext__() == "Start with "
+    await stream.aclose()
+
+    assert [msg.role for msg in session.messages] == [MessageRole.USER, MessageRole.ASSISTANT]
+    assert session.messages[-1].content == "Start with"
+    assert session.messages[-1].metadata["incomplete"] is True
+    assert session.id in chat_service._dirty_sessions
+    await chat_service.close()
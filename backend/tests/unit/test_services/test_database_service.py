@@ -0,0 +1,247 @@
+"""
+Unit tests for the database service client and read cache
+"""
+import asyncio
+from datetime import datetime
+from types import SimpleNamespace
+
+import httpx
+import pytest
+import pytest_asyncio
+
+import services.database_service as database_service_module
+from models.chat import ChatMessage, MessageRole
+from services.database_service import (
+    DatabaseService, cleanup_database_clients, _validate_rows, _validate_rows_off_loop, _CHAT_SESSION_LIST_ADAPTER
+)
+
+class FakeQuery:
+    """Chainable stand-in for a PostgREST request builder"""
+
+    def __init__(self, client, table):
+        self.client = client
+        self.table = table
+        self.filters = {}
+        self.payload = None
+        self.params = httpx.QueryParams()
+
+    def select(self, *args):
+        return self
+
+    def update(self, payload, **kwargs):
+        self.payload = payload
+        return self
+
+    def upsert(self, payload, **kwargs):
+        self.payload = payload
+        return self
+
+    def eq(self, column, value):
+        self.filters[column] = value
+        return self
+
+    async def execute(self):
+        self.client.requests.append((self.table, self.payload is not None))
+        await asyncio.sleep(0)
+        if self.payload is not None:
+            row = self.client.rows[self.filters.get("id", self.payload.get("id"))]
+            row.update(self.payload)
+            columns = self.params.get("select")
+            self.client.last_write = [{column: row[column] for column in columns.split(",")}] if columns else [row]
+            return SimpleNamespace(data=self.client.last_write)
+        row = self.client.rows.get(self.filters["id"])
+        return SimpleNamespace(data=[dict(row)] if row else [])
+
+class FakePostgrest:
+    def __init__(self, rows):
+        self.rows = rows
+        self.requests = []
+        self.last_write = None
+
+    def table(self, name):
+        return FakeQuery(self, name)
+
+def _session_row(session_id):
+    now = datetime.utcnow().isoformat()
+    return {
+        "id": session_id,
+        "user_id": "user-1",
+        "title": "Career chat",
+        "messages": [],
+        "created_at": now,
+        "updated_at": now,
+        "is_active": True,
+        "metadata": {},
+    }
+
+@pytest_asyncio.fixture
+async def db_service(supabase_env):
+    """Database service whose PostgREST client is replaced by an in-memory fake"""
+    service = DatabaseService()
+    service.postgrest = FakePostgrest({"s1": _session_row("s1")})
+    yield service
+    await cleanup_database_clients()
+
+@pytest.mark.asyncio
+async def test_concurrent_loads_share_one_request(db_service):
+    sessions = await asyncio.gather(*(db_service.load_chat_session("s1") for _ in range(5)))
+
+    assert len(db_service.postgrest.requests) == 1
+    assert all(session.title == "Career chat" for session in sessions)
+    # Every caller gets its own copy to mutate
+    assert len({id(session) for session in sessions}) == 5
+
+@pytest.mark.asyncio
+async def test_write_invalidates_cached_session(db_service):
+    session = await db_service.load_chat_session("s1")
+    session.title = "Renamed"
+    assert (await db_service.load_chat_session("s1")).title == "Career chat"
+
+    await db_service.deactivate_chat_session("s1")
+    reloaded = await db_service.load_chat_session("s1")
+
+    assert reloaded.is_active is False
+    assert db_service.postgrest.last_write == [{"id": "s1"}]
+    assert db_service.postgrest.requests == [
+        ("chat_sessions", False),
+        ("chat_sessions", True),
+        ("chat_sessions", False),
+    ]
+
+@pytest.mark.asyncio
+async def test_postgrest_bodies_are_encoded_with_orjson(supabase_env):
+    service = DatabaseService()
+
+    request = service.postgrest.session.build_request("POST", "/roadmaps", json={"title": "Path", "phases": []})
+
+    assert request.content == b'{"title":"Path","phases":[]}'
+    assert request.headers["content-type"] == "application/json"
+    await cleanup_database_clients()
+
+@pytest.mark.asyncio
+async def test_services_share_clients_and_caches(supabase_env):
+    first, second = DatabaseService(), DatabaseService()
+
+    assert first.postgrest is second.postgrest
+    assert first._row_caches is second._row_caches
+    await cleanup_database_clients()
+    assert DatabaseService().postgrest is not first.postgrest
+    await cleanup_database_clients()
+
+def test_batch_validation_drops_only_malformed_rows(caplog):
+    rows = [_session_row("s1"), {**_session_row("s2"), "messages": "not a list"}, _session_row("s3")]
+
+    sessions = _validate_rows(_CHAT_SESSION_LIST_ADAPTER, rows, "chat_sessions")
+
+    assert [session.id for session in sessions] == ["s1", "s3"]
+    assert "['s2']" in caplog.text
+
+@pytest.mark.asyncio
+async def test_reads_go_straight_to_postgres_when_pool_is_configured(db_service, sql_pool):
+    def handler(query, session_id):
+        row = _session_row(session_id)
+        row["created_at"] = row["updated_at"] = datetime.utcnow()
+        return [row]
+
+    sql_pool.handler = handler
+
+    session = await db_service.load_chat_session("s9")
+
+    assert session.id == "s9"
+    assert sql_pool.queries == [("SELECT * FROM chat_sessions WHERE id = $1", ("s9",))]
+    assert db_service.postgrest.requests == []
+
+@pytest.mark.asyncio
+async def test_message_appends_use_one_sql_statement_when_pool_is_configured(db_service, sql_pool):
+    sql_pool.handler = lambda query, batch: [{"id": entry["id"]} for entry in batch]
+
+    added = await db_service.add_message_to_session("s1", ChatMessage(role=MessageRole.USER, content="hi"))
+
+    assert added is True
+    assert len(sql_pool.queries) == 1
+    query, (batch,) = sql_pool.queries[0]
+    assert query == "SELECT id FROM append_chat_messages($1::jsonb)"
+    assert batch[0]["id"] == "s1" and batch[0]["messages"][0]["content"] == "hi"
+
+@pytest.mark.asyncio
+async def test_missing_rows_are_remembered_briefly(db_service):
+    assert await db_service.load_chat_session("missing") is None
+    assert await db_service.load_chat_session("missing") is None
+    assert db_service.postgrest.requests == [("chat_sessions", False)]
+
+    db_service._invalidate_cached("chat_sessions", "missing")
+    assert await db_service.load_chat_session("missing") is None
+    assert len(db_service.postgrest.requests) == 2
+
+@pytest.mark.asyncio
+async def test_large_result_sets_are_validated_off_the_event_loop(monkeypatch):
+    calls = []
+
+    async def fake_to_thread(func, *args):
+        calls.append(func)
+        return func(*args)
+
+    monkeypatch.setattr(database_service_module.asyncio, "to_thread", fake_to_thread)
+    rows = [_session_row(f"s{i}") for i in range(database_service_module.OFFLOAD_VALIDATION_ROWS)]
+
+    assert len(await _validate_rows_off_loop(_CHAT_SESSION_LIST_ADAPTER, rows[:1], "chat_sessions")) == 1
+    assert calls == []
+    assert len(await _validate_rows_off_loop(_CHAT_SESSION_LIST_ADAPTER, rows, "chat_sessions")) == len(rows)
+    assert calls == [_validate_rows]
+
+@pytest.mark.asyncio
+async def test_session_summaries_skip_the_message_history(db_service, sql_pool):
+    row = _session_row("s1")
+    del row["messages"], row["metadata"]
+    sql_pool.handler = lambda query, *args: [{**row, "message_count": 12}]
+
+    summaries = await db_service.load_user_chat_session_summaries("user-1")
+
+    assert [(summary.id, summary.message_count) for summary in summaries] == [("s1", 12)]
+    assert "messages" not in sql_pool.queries[0][0].split("FROM")[0]
+
+@pytest.mark.asyncio
+async def test_bulk_loads_fetch_only_uncached_rows_in_one_query(db_service):
+    fetched = []
+
+    async def fetch_many(keys):
+        fetched.append(keys)
+        return {key: _session_row(key) for key in keys if key != "gone"}
+
+    await db_service.load_chat_session("s1")
+    rows = await db_service._cached_load_many("chat_sessions", ["s1", "s2", "gone", "s2"], fetch_many)
+
+    assert sorted(rows) == ["s1", "s2"]
+    assert fetched == [["s2", "gone"]]
+    assert await db_service._cached_load_many("chat_sessions", ["s2", "gone"], fetch_many) == {"s2": rows["s2"]}
+    assert len(fetched) == 1
+
+@pytest.mark.asyncio
+async def test_agent_responses_are_fetched_for_many_requests_at_once(db_service, sql_pool):
+    sql_pool.handler = lambda query, *args: [
+        {
+            "id": f"resp-{i}", "request_id": request_id, "agent_id": "a1", "agent_type": "career_strategy",
+            "response_content": {}, "confidence_score": 0.9, "processing_time": 1.0,
+        }
+        for i, request_id in enumerate(["r1", "r1", "r2"])
+    ]
+
+    responses = await db_service.get_agent_responses_bulk(["r1", "r2", "r3", "r1"])
+
+    assert {request_id: len(items) for request_id, items in responses.items()} == {"r1": 2, "r2": 1, "r3": 0}
+    assert sql_pool.queries == [("SELECT * FROM agent_responses WHERE request_id = ANY($1::uuid[])", (["r1", "r2", "r3"],))]
+
+@pytest.mark.asyncio
+async def test_phase_progress_and_overall_progress_update_in_one_statement(db_service, sql_pool):
+    sql_pool.handler = lambda query, *args: [{"updated": True}]
+
+    assert await db_service.update_phase_progress("r1", 2, {"is_completed": True}, overall_progress=40.0) is True
+    assert sql_pool.queries == [(
+        "SELECT update_phase_progress($1::uuid, $2, $3::jsonb, $4) AS updated",
+        ("r1", 2, {"is_completed": True}, 40.0),
+    )]
+
+@pytest.mark.asyncio
+async def test_negative_phase_index_updates_nothing(db_service, sql_pool):
+    assert await db_service.update_phase_progress("r1", -1, {"is_completed": True}, overall_progress=40.0) is False
+    assert sql_pool.queries == []
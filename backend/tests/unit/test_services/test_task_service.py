@@ -0,0 +1,74 @@
+"""
+Unit tests for the task service
+"""
+import uuid
+from types import SimpleNamespace
+
+import pytest
+
+from models.roadmap import Roadmap, RoadmapPhase, Milestone
+from models.task import TaskType
+from services.task_service import TaskService
+
+pytestmark = pytest.mark.asyncio
+
+class FakeTasksTable:
+    """Records inserted task rows and echoes them back with an id"""
+
+    def __init__(self):
+        self.inserted = []
+
+    def insert(self, row):
+        self.inserted.append(row)
+        self.row = {**row, "id": str(uuid.uuid4()), "status": "pending"}
+        return self
+
+    def execute(self):
+        return SimpleNamespace(data=[self.row])
+
+class MockDatabaseService:
+    """Mock database service for testing"""
+
+    def __init__(self, roadmap):
+        self.roadmap = roadmap
+        self.tasks = FakeTasksTable()
+        self.supabase = SimpleNamespace(table=lambda name: self.tasks)
+
+    async def load_roadmap(self, roadmap_id):
+        return self.roadmap
+
+    @staticmethod
+    def _convert_user_id_to_uuid(user_id):
+        return user_id
+
+@pytest.fixture
+def roadmap():
+    return Roadmap(
+        id="r1",
+        user_id="user-1",
+        title="Backend path",
+        current_role="Analyst",
+        target_role="Backend Engineer",
+        phases=[
+            RoadmapPhase(
+                phase_number=1,
+                title="Foundations",
+                description="Learn the basics",
+                duration_weeks=4,
+                milestones=[
+                    Milestone(title="Ship an API", estimated_completion_weeks=2),
+                    Milestone(title="Done already", is_completed=True),
+                ],
+            )
+        ],
+    )
+
+async def test_generate_tasks_from_roadmap_creates_milestone_tasks_with_due_dates(roadmap):
+    service = TaskService.__new__(TaskService)
+    service.db_service = MockDatabaseService(roadmap)
+
+    tasks = await service.generate_tasks_from_roadmap("r1", "user-1")
+
+    assert [(task.title, task.task_type) for task in tasks] == [("Ship an API", TaskType.MILESTONE)]
+    assert tasks[0].due_date is not None
+    assert service.db_service.tasks.inserted[0]["milestone_index"] == 0